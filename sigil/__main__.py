@@ -0,0 +1,4 @@
+from sigil.main.cli.app import run_cli
+
+if __name__ == "__main__":
+    run_cli()
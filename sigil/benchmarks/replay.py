@@ -0,0 +1,286 @@
+import asyncio
+import json
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+from sigil.benchmarks.runner import WARMUP_REQUESTS, environment, summarize, with_model
+from sigil.core.config.settings import Settings
+from sigil.core.providers.factory import make_container
+from sigil.main.api.factory import APIFactory
+
+DEFAULT_PATH = "/api/v1/captchas/slide"
+MODES = ("closed", "open")
+HISTOGRAM_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+@dataclass
+class Capture:
+    body: Dict[str, Any]
+    path: str = DEFAULT_PATH
+
+
+@dataclass
+class ReplayResult:
+    mode: str
+    concurrency: Optional[int]
+    rate: Optional[float]
+    requests: int
+    errors: int
+    error_rate: float
+    duration_s: float
+    throughput_rps: float
+    # Service time, measured from when each request was actually sent
+    latency_ms: Dict[str, float]
+    # Measured from when each request should have been sent, see ``correct_coordinated_omission``
+    corrected_latency_ms: Dict[str, float]
+    statuses: Dict[str, int] = field(default_factory=dict)
+    histogram: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def load_captures(path: Path) -> List[Capture]:
+    """Read captured requests, one JSON object per line.
+
+    A line is either a bare slide request body or ``{"path": ..., "body": ...}`` for other endpoints.
+    Blank lines are skipped.
+    """
+    captures = []
+    for number, line in enumerate(path.read_text().splitlines(), start=1):
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            msg = f"{path}:{number}: invalid JSON: {e}"
+            raise ValueError(msg)
+
+        if not isinstance(record, dict):
+            msg = f"{path}:{number}: expected a JSON object"
+            raise ValueError(msg)
+
+        if isinstance(record.get("body"), dict):
+            captures.append(Capture(body=record["body"], path=record.get("path", DEFAULT_PATH)))
+        else:
+            captures.append(Capture(body=record))
+
+    return captures
+
+
+def correct_coordinated_omission(latencies: Sequence[float], interval: float) -> List[float]:
+    """Add the samples a closed-loop client never took while it was stuck waiting on a slow response.
+
+    A client that sends every ``interval`` seconds would have sent ``latency // interval - 1`` more
+    requests during a stall, and each of those would have waited out the rest of it. As in
+    HdrHistogram, those are recorded as ``latency - interval``, ``latency - 2 * interval``, ...
+    """
+    corrected = list(latencies)
+    if interval <= 0:
+        return corrected
+
+    for latency in latencies:
+        missed = int(latency // interval) - 1
+        if missed > 0:
+            corrected.extend((latency - interval * np.arange(1, missed + 1)).tolist())
+
+    return corrected
+
+
+def histogram(samples: Sequence[float]) -> List[Dict[str, Any]]:
+    """Counts of ``samples`` (seconds) per latency bucket, the last bucket catching everything slower."""
+    values = np.asarray(samples) * 1000
+    counts = np.bincount(np.searchsorted(HISTOGRAM_BUCKETS_MS, values), minlength=len(HISTOGRAM_BUCKETS_MS) + 1)
+    bounds: List[Any] = [*HISTOGRAM_BUCKETS_MS, "+Inf"]
+    return [{"le_ms": bound, "count": int(count)} for bound, count in zip(bounds, counts, strict=True)]
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    captures: Sequence[Capture],
+    requests: int,
+    mode: str = "closed",
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+) -> ReplayResult:
+    """Send ``requests`` captures in order, cycling through them, and measure every response.
+
+    ``open`` sends at a constant ``rate`` per second regardless of how fast the server answers, like
+    independent production clients. ``closed`` keeps ``concurrency`` requests in flight, each client
+    sending its next request as soon as the previous one returns.
+    """
+    if mode not in MODES:
+        msg = f"Unknown mode {mode!r}, expected one of {', '.join(MODES)}"
+        raise ValueError(msg)
+    if mode == "open" and not rate:
+        msg = "Open-loop replay needs a rate"
+        raise ValueError(msg)
+
+    for index in range(min(WARMUP_REQUESTS, requests)):
+        await _send(client, captures[index % len(captures)])
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    if mode == "open":
+        samples = await _replay_open(client, captures, requests, rate=float(rate or 0))
+        corrected = [total for _, total, _ in samples]
+    else:
+        samples = await _replay_closed(client, captures, requests, concurrency=concurrency)
+        latencies = [service for service, _, _ in samples]
+        # Without a target rate, assume clients meant to send as often as the average response allowed
+        interval = concurrency / rate if rate else float(np.mean(latencies)) if latencies else 0.0
+        corrected = correct_coordinated_omission(latencies, interval)
+
+    duration = loop.time() - started
+
+    statuses: Dict[str, int] = {}
+    for _, _, status in samples:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    return ReplayResult(
+        mode=mode,
+        concurrency=concurrency if mode == "closed" else None,
+        rate=rate,
+        requests=requests,
+        errors=errors,
+        error_rate=round(errors / requests, 4) if requests else 0.0,
+        duration_s=round(duration, 3),
+        throughput_rps=round(requests / duration, 2) if duration else 0.0,
+        latency_ms=summarize([service for service, _, _ in samples]),
+        corrected_latency_ms=summarize(corrected),
+        statuses=dict(sorted(statuses.items())),
+        histogram=histogram(corrected),
+    )
+
+
+async def run_replay(
+    settings: Settings,
+    captures: Sequence[Capture],
+    requests: Optional[int] = None,
+    mode: str = "closed",
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    url: Optional[str] = None,
+    use_stub: Optional[bool] = None,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """Replay ``captures`` against the server at ``url``, or against the app in-process when it is ``None``.
+
+    ``requests`` defaults to one pass over the captures. In-process replays use the configured
+    settings, with the generated stand-in model when the weights are missing or ``use_stub`` is set.
+    """
+    requests = requests or len(captures)
+    config: Dict[str, Any] = {
+        "target": url or "in-process",
+        "mode": mode,
+        "concurrency": concurrency if mode == "closed" else None,
+        "rate": rate,
+        "requests": requests,
+        "captures": len(captures),
+    }
+
+    if url is not None:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+            result = await replay(client, captures, requests, mode=mode, concurrency=concurrency, rate=rate)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            settings, config["model"] = with_model(settings, directory=Path(directory), use_stub=use_stub)
+            container = make_container(settings=settings)
+            app = APIFactory(container=container, settings=settings).make()
+            try:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=timeout) as client:
+                    result = await replay(client, captures, requests, mode=mode, concurrency=concurrency, rate=rate)
+            finally:
+                await container.close()
+
+    return {"environment": environment(), "config": config, "result": asdict(result)}
+
+
+def format_replay_report(report: Dict[str, Any]) -> str:
+    result = report["result"]
+    load = f"rate {result['rate']}/s" if result["mode"] == "open" else f"concurrency {result['concurrency']}"
+    lines = [
+        (
+            f"{result['mode']} loop, {load}: {result['requests']} requests in {result['duration_s']:.2f}s, "
+            f"{result['throughput_rps']:.1f} req/s, {result['errors']} errors ({result['error_rate']:.2%})"
+        ),
+        f"statuses: {', '.join(f'{status}={count}' for status, count in result['statuses'].items())}",
+        f"{'':<11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}",
+    ]
+    for name, key in [("service", "latency_ms"), ("corrected", "corrected_latency_ms")]:
+        summary = result[key]
+        if summary["count"]:
+            lines.append(
+                f"{name:<11}{summary['p50']:>9.2f}{summary['p95']:>9.2f}{summary['p99']:>9.2f}{summary['max']:>9.2f}"
+            )
+
+    total = sum(bucket["count"] for bucket in result["histogram"]) or 1
+    for bucket in result["histogram"]:
+        bar = "#" * round(40 * bucket["count"] / total)
+        lines.append(f"<= {bucket['le_ms']!s:>6} ms {bucket['count']:>7}  {bar}")
+
+    return "\n".join(lines)
+
+
+async def _replay_open(
+    client: httpx.AsyncClient,
+    captures: Sequence[Capture],
+    requests: int,
+    rate: float,
+) -> List[Tuple[float, float, str]]:
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async def send(index: int, scheduled: float) -> Tuple[float, float, str]:
+        sent = loop.time()
+        status = await _send(client, captures[index % len(captures)])
+        finished = loop.time()
+        return finished - sent, finished - scheduled, status
+
+    tasks = []
+    for index in range(requests):
+        # Requests go out on schedule even while earlier ones are still waiting for a response
+        scheduled = started + index / rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        tasks.append(asyncio.create_task(send(index, scheduled)))
+
+    return list(await asyncio.gather(*tasks))
+
+
+async def _replay_closed(
+    client: httpx.AsyncClient,
+    captures: Sequence[Capture],
+    requests: int,
+    concurrency: int,
+) -> List[Tuple[float, float, str]]:
+    loop = asyncio.get_running_loop()
+    samples: List[Tuple[float, float, str]] = []
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for index in counter:
+            sent = loop.time()
+            status = await _send(client, captures[index % len(captures)])
+            latency = loop.time() - sent
+            samples.append((latency, latency, status))
+
+    await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    return samples
+
+
+async def _send(client: httpx.AsyncClient, capture: Capture) -> str:
+    """Status code of the response, or the exception name when there is none."""
+    try:
+        response = await client.post(capture.path, json=capture.body)
+    except httpx.HTTPError as e:
+        return type(e).__name__
+
+    return str(response.status_code)
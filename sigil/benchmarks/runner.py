@@ -0,0 +1,252 @@
+import asyncio
+import base64
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+import onnxruntime as ort
+
+from sigil.benchmarks.stub import make_stub_models
+from sigil.core.config.settings import Settings
+from sigil.core.providers.factory import make_container
+from sigil.core.timing import stage_timer
+from sigil.main.api.factory import APIFactory
+from sigil.services.images import decode_image
+from sigil.services.recognizer import RecognizerService
+from sigil.services.registry import ModelRegistry
+
+TARGETS = ("recognizer", "api")
+STAGES = ("decode", "preprocess", "inference", "postprocess", "serialize")
+WARMUP_REQUESTS = 5
+
+
+@dataclass
+class BenchResult:
+    target: str
+    concurrency: int
+    requests: int
+    errors: int
+    duration_s: float
+    throughput_rps: float
+    latency_ms: Dict[str, float]
+    # Per-call timings of each stage; batched stages (preprocess, inference, postprocess) run once per batch
+    stages_ms: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """Count and p50/p95/p99/mean/max of ``samples`` given in seconds, in milliseconds."""
+    if not len(samples):
+        return {"count": 0}
+
+    values = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "mean": round(float(values.mean()), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def bench_recognizer(
+    recognizer: RecognizerService,
+    images: Sequence[bytes],
+    concurrency: int,
+    requests: int,
+) -> BenchResult:
+    """Call ``identify_gap`` on encoded ``images`` from ``concurrency`` threads, ``requests`` times in total."""
+
+    def solve(index: int) -> float:
+        started = time.perf_counter()
+        with stage_timer.stage("decode"):
+            image = decode_image(images[index % len(images)])
+
+        recognizer.identify_gap(source=image)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(solve, range(WARMUP_REQUESTS)))
+
+        stage_timer.reset()
+        started = time.perf_counter()
+        latencies = list(pool.map(solve, range(requests)))
+        duration = time.perf_counter() - started
+
+    return _result("recognizer", concurrency, requests, 0, duration, latencies)
+
+
+async def bench_api(
+    client: httpx.AsyncClient,
+    payloads: Sequence[Dict[str, Any]],
+    concurrency: int,
+    requests: int,
+) -> BenchResult:
+    """POST ``payloads`` to the slide endpoint from ``concurrency`` concurrent clients."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            response = await client.post("/api/v1/captchas/slide", json=payloads[index % len(payloads)])
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    for index in range(WARMUP_REQUESTS):
+        await client.post("/api/v1/captchas/slide", json=payloads[index % len(payloads)])
+
+    stage_timer.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    duration = time.perf_counter() - started
+
+    return _result("api", concurrency, requests, errors, duration, latencies)
+
+
+async def run_benchmarks(
+    settings: Settings,
+    images: Sequence[bytes],
+    concurrency_levels: Sequence[int] = (1, 4, 16),
+    requests: int = 200,
+    targets: Sequence[str] = TARGETS,
+    use_stub: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Run every target at every concurrency level and return a JSON-serializable report.
+
+    The result cache is disabled so every request exercises the whole pipeline. When the model weights
+    are missing (or ``use_stub`` is set) a generated stand-in model is used, so the suite runs offline.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        settings, model = with_model(settings, directory=Path(directory), use_stub=use_stub)
+        recognizer_settings = settings.recognizer_settings
+        settings = settings.model_copy(
+            update={"cache_settings": settings.cache_settings.model_copy(update={"enabled": False})}
+        )
+
+        results: List[BenchResult] = []
+        stage_timer.enabled = True
+        try:
+            if "recognizer" in targets:
+                recognizer = ModelRegistry(settings=recognizer_settings).build()
+                for concurrency in concurrency_levels:
+                    results.append(await asyncio.to_thread(bench_recognizer, recognizer, images, concurrency, requests))
+
+            if "api" in targets:
+                payloads = [{"puzzle_image_b64": base64.b64encode(image).decode()} for image in images]
+                container = make_container(settings=settings)
+                app = APIFactory(container=container, settings=settings).make()
+                try:
+                    transport = httpx.ASGITransport(app=app)
+                    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                        for concurrency in concurrency_levels:
+                            results.append(await bench_api(client, payloads, concurrency, requests))
+                finally:
+                    await container.close()
+        finally:
+            stage_timer.enabled = False
+            stage_timer.reset()
+
+    return {
+        "environment": environment(),
+        "config": {
+            "model": model,
+            "engine": recognizer_settings.engine,
+            "precision": recognizer_settings.precision,
+            "imgsz": recognizer_settings.imgsz,
+            "cascade": recognizer_settings.cascade,
+            "inference_workers": settings.inference_settings.workers,
+            "batch_max_size": settings.inference_settings.batch_max_size,
+            "requests": requests,
+            "concurrency": list(concurrency_levels),
+            "images": len(images),
+        },
+        "results": [asdict(result) for result in results],
+    }
+
+
+def with_model(settings: Settings, directory: Path, use_stub: Optional[bool] = None) -> Tuple[Settings, str]:
+    """``settings`` pointed at the generated stand-in model in ``directory`` when needed, and the model's label.
+
+    The stub is used when ``use_stub`` is set, or when it is ``None`` and ``models_dir`` holds no versions.
+    """
+    if not use_stub and (use_stub is not None or ModelRegistry(settings=settings.recognizer_settings).versions()):
+        return settings, str(settings.recognizer_settings.models_dir)
+
+    models_dir = make_stub_models(directory, imgsz=settings.recognizer_settings.imgsz)
+    recognizer_settings = settings.recognizer_settings.model_copy(
+        update={"models_dir": models_dir, "model_version": None, "precision": "fp32"}
+    )
+    return settings.model_copy(update={"recognizer_settings": recognizer_settings}), "stub"
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"{'target':<11}{'conc':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}  stage p50 ms",
+    ]
+    for result in report["results"]:
+        latency = result["latency_ms"]
+        stages = " ".join(
+            f"{name}={summary['p50']:.2f}" for name, summary in result["stages_ms"].items() if summary["count"]
+        )
+        lines.append(
+            f"{result['target']:<11}{result['concurrency']:>5}{result['throughput_rps']:>9.1f}"
+            f"{latency['p50']:>9.2f}{latency['p95']:>9.2f}{latency['p99']:>9.2f}{result['errors']:>8}  {stages}"
+        )
+
+    return "\n".join(lines)
+
+
+def _result(
+    target: str,
+    concurrency: int,
+    requests: int,
+    errors: int,
+    duration: float,
+    latencies: Sequence[float],
+) -> BenchResult:
+    samples = stage_timer.samples()
+    return BenchResult(
+        target=target,
+        concurrency=concurrency,
+        requests=requests,
+        errors=errors,
+        duration_s=round(duration, 3),
+        throughput_rps=round(requests / duration, 2) if duration else 0.0,
+        latency_ms=summarize(latencies),
+        stages_ms={stage: summarize(samples.get(stage, [])) for stage in STAGES},
+    )
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit: Optional[str] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "onnxruntime": ort.__version__,
+    }
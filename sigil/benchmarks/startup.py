@@ -0,0 +1,81 @@
+"""Cold start of one serving process: importing the app, then loading and warming up the models.
+
+Run as ``python -m sigil.benchmarks.startup`` to print the measurement as JSON. It only imports the
+standard library before timing the import of the serving entry point, so the numbers match what a new
+uvicorn worker pays.
+"""
+
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+SERVING_ENTRYPOINT = "sigil.main.api.native"
+
+# Only the ``ultralytics`` engine, the CLI or the first HEIF upload load these, a fresh ONNX serving process never does
+HEAVY_MODULES = ("torch", "ultralytics", "onnx", "typer", "nest_asyncio", "pillow_heif", "matplotlib", "cv2")
+
+
+def measure_startup(env: Optional[Dict[str, str]] = None, timeout: float = 300.0) -> Dict[str, Any]:
+    """Measure a fresh interpreter starting the serving app, configured by ``env`` on top of ``os.environ``."""
+    completed = subprocess.run(
+        [sys.executable, "-m", __name__],
+        env={**os.environ, **(env or {})},
+        cwd=Path(__file__).resolve().parents[2],
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _measure() -> Dict[str, Any]:
+    started = time.perf_counter()
+    module = importlib.import_module(SERVING_ENTRYPOINT)
+    import_seconds = time.perf_counter() - started
+    rss_after_import = _rss_mb()
+
+    import asyncio
+
+    status = asyncio.run(_until_ready(module.app))
+    return {
+        "import_seconds": import_seconds,
+        "ready_seconds": time.perf_counter() - started,
+        "status": status,
+        "rss_after_import_mb": rss_after_import,
+        "rss_mb": _rss_mb(),
+        "heavy_modules": sorted(name for name in HEAVY_MODULES if name in sys.modules),
+    }
+
+
+async def _until_ready(app: Any) -> str:
+    import asyncio
+
+    async with app.router.lifespan_context(app):
+        while app.state.readiness.status == "starting":
+            await asyncio.sleep(0.01)
+
+        return app.state.readiness.status
+
+
+def _rss_mb() -> float:
+    """Resident set size of this process, in MiB."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+    # No procfs: fall back to the peak, which is what ``getrusage`` reports (in KiB on Linux, bytes on macOS)
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+if __name__ == "__main__":
+    sys.stdout.write(json.dumps(_measure()) + "\n")
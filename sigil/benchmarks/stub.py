@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+STUB_BOX = (200.0, 150.0, 80.0, 80.0)  # constant prediction, (cx, cy, w, h) in model input pixels
+
+
+def make_stub_model(path: Path, num_classes: int, imgsz: int = 416, confidence: float = 0.9) -> None:
+    """Write a YOLO-shaped ONNX model that always predicts the same gap box.
+
+    It stands in for the real weights in tests and offline benchmarks: input and output shapes match a
+    YOLOv8 export with a dynamic batch, so the whole pipeline runs unchanged around it.
+    """
+    anchors = sum((imgsz // stride) ** 2 for stride in (8, 16, 32))
+    prediction = np.zeros((1, 4 + num_classes, anchors), dtype=np.float32)
+    prediction[0, :5, 0] = [*STUB_BOX, confidence]
+
+    # A small convolution gives quantization and graph optimization something real to work on
+    weights = np.random.default_rng(0).normal(size=(4, 3, 3, 3)).astype(np.float32)
+    nodes = [
+        helper.make_node("Conv", ["images", "weights"], ["features"], pads=[1, 1, 1, 1], strides=[2, 2]),
+        helper.make_node("ReduceMean", ["features"], ["mean"], axes=[1, 2, 3], keepdims=0),
+        helper.make_node("Unsqueeze", ["mean", "axes"], ["batch"]),
+        helper.make_node("Mul", ["batch", "zero"], ["zeros"]),
+        helper.make_node("Add", ["zeros", "prediction"], ["output0"]),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "stub",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, imgsz, imgsz])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, ["batch", 4 + num_classes, anchors])],
+        [
+            numpy_helper.from_array(weights, "weights"),
+            numpy_helper.from_array(prediction, "prediction"),
+            numpy_helper.from_array(np.zeros((1, 1, 1), dtype=np.float32), "zero"),
+            numpy_helper.from_array(np.array([1, 2], dtype=np.int64), "axes"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+def make_stub_models(directory: Path, imgsz: int = 416) -> Path:
+    """Write stand-in ``multi_cls.onnx`` and ``single_cls.onnx`` models to ``directory``."""
+    directory.mkdir(parents=True, exist_ok=True)
+    make_stub_model(directory / "multi_cls.onnx", num_classes=2, imgsz=imgsz)
+    make_stub_model(directory / "single_cls.onnx", num_classes=1, imgsz=imgsz)
+    return directory
@@ -3,12 +3,9 @@ import inspect
 from functools import wraps
 from typing import Any, Callable, Coroutine, cast
 
-import nest_asyncio
 from typer import Typer
 from typer.models import CommandFunctionType
 
-nest_asyncio.apply()
-
 
 class AsyncTyper(Typer):
     @staticmethod
@@ -20,6 +17,11 @@ class AsyncTyper(Typer):
 
             @wraps(func)
             def runner(*args: Any, **kwargs: Any) -> Any:
+                # Patched only for async commands: ``sigil api`` serves from this process and the patch
+                # swaps asyncio's C tasks for pure-Python ones
+                import nest_asyncio
+
+                nest_asyncio.apply()
                 return asyncio.run(cast(Callable[..., Coroutine[Any, Any, Any]], func)(*args, **kwargs))
 
             decorator(cast(CommandFunctionType, runner))
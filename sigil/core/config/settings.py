@@ -1,7 +1,9 @@
+import tempfile
 from functools import lru_cache
-from typing import Optional, Tuple, Type
+from pathlib import Path
+from typing import Literal, Optional, Tuple, Type
 
-from pydantic import Field
+from pydantic import Field, SecretStr
 from pydantic_settings import (
     BaseSettings,
     DotEnvSettingsSource,
@@ -26,6 +28,161 @@ class AnthropicSettings(BaseAISettings):
     model: str = "claude-opus-4-1-20250805"
 
 
+class RecognizerSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_file=".env",
+        env_prefix="SIGIL_RECOGNIZER_",
+        env_file_encoding="utf-8",
+    )
+
+    engine: Literal["onnx", "ultralytics"] = "onnx"
+    models_dir: Path = Path(__file__).resolve().parents[2] / "models" / "yolo"
+    model_version: Optional[str] = None  # subdirectory of ``models_dir``, see ``ModelRegistry``
+    precision: Literal["fp32", "fp16", "int8"] = "fp32"  # variants are built with ``sigil quantize``
+    imgsz: int = 416
+    conf: float = 0.25
+    iou: float = 0.7
+    intra_op_num_threads: int = 0  # 0 lets ONNX Runtime pick
+    inter_op_num_threads: int = 1
+    execution_mode: Literal["sequential", "parallel"] = "parallel"
+    graph_optimization_level: Literal["disabled", "basic", "extended", "all"] = "all"
+
+    # Load the optimized models and session settings ``sigil tune`` saved for this host; settings set
+    # explicitly still win over the tuned ones
+    tuned: bool = True
+
+    # Run a cheaper first stage and only escalate to multi_cls at ``imgsz`` when it is unsure. Off by
+    # default, so deployments without single_cls keep starting and keep their multi_cls answers
+    cascade: bool = False
+    cascade_model: Literal["single_cls", "multi_cls"] = "single_cls"
+    cascade_imgsz: Optional[int] = None  # defaults to ``imgsz``
+    cascade_min_confidence: float = 0.8
+
+    # Large JPEGs are decoded at a reduced DCT scale that still covers the model input size
+    decode_draft: bool = True
+
+
+class InferenceSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_file=".env",
+        env_prefix="SIGIL_INFERENCE_",
+        env_file_encoding="utf-8",
+    )
+
+    workers: int = 2
+    max_queue_size: int = 64
+    stream_max_in_flight: int = 16  # solves a WebSocket connection can have running before reads pause
+    batch_max_size: int = 8
+    batch_max_wait_ms: float = 2.0
+
+    # Warm-up runs every batch size up to ``batch_max_size`` at startup, before the pod reports ready
+    warmup: bool = True
+    warmup_images_dir: Optional[Path] = None  # synthetic images are used when unset
+    warmup_rounds: int = 1
+
+    # With ``servers`` > 0 the HTTP workers load no models: they hand decoded images over shared memory
+    # to that many inference server processes, which own the models and batch across all workers
+    servers: int = 0
+    server_dir: Path = Path(tempfile.gettempdir()) / "sigil"  # holds the servers' Unix sockets
+    server_connect_timeout: float = 120.0  # servers only listen once their models are warmed up
+    ring_slots: int = 64  # images each HTTP worker can have in flight
+    ring_slot_bytes: int = 4 * 1024 * 1024  # largest decoded image, height * width * 3
+
+
+class CacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_file=".env",
+        env_prefix="SIGIL_CACHE_",
+        env_file_encoding="utf-8",
+    )
+
+    enabled: bool = True
+    max_entries: int = 10_000
+    max_bytes: int = 32 * 1024 * 1024
+    ttl_seconds: float = 3600.0
+    sqlite_path: Optional[Path] = None
+
+
+class BackgroundSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_file=".env",
+        env_prefix="SIGIL_BACKGROUNDS_",
+        env_file_encoding="utf-8",
+    )
+
+    index_dir: Optional[Path] = None  # background matching is disabled when unset
+    learn: bool = True
+    min_confidence: float = 0.9
+    learn_min_confidence: float = 0.8
+    max_hash_distance: int = 10
+    flush_every: int = 32  # learnt puzzles written to the index at once
+    flush_interval: float = 10.0  # seconds between syncs with the index other workers write
+
+
+class MatcherSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_file=".env",
+        env_prefix="SIGIL_MATCHER_",
+        env_file_encoding="utf-8",
+    )
+
+    enabled: bool = True
+    band: int = 12  # pixels searched around the detected gap when refining
+    min_score: float = 0.2  # refinements scoring below this keep the detector's box
+    fast_path_min_score: float = 0.4
+    fast_path_min_margin: float = 0.1  # lead of the peak over the runner-up to skip the model
+
+
+class FetcherSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_file=".env",
+        env_prefix="SIGIL_FETCHER_",
+        env_file_encoding="utf-8",
+    )
+
+    limit: int = 100
+    limit_per_host: int = 16
+    dns_cache_ttl: int = 300
+    connect_timeout: float = 3.0
+    read_timeout: float = 10.0
+    total_timeout: float = 30.0  # whole download, cut shorter by the request's deadline
+    max_bytes: int = 5 * 1024 * 1024
+
+
+class AdminSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_file=".env",
+        env_prefix="SIGIL_ADMIN_",
+        env_file_encoding="utf-8",
+    )
+
+    key: Optional[SecretStr] = None  # the admin API is disabled when unset
+
+
+class LoggingSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_file=".env",
+        env_prefix="SIGIL_LOGGING_",
+        env_file_encoding="utf-8",
+    )
+
+    format: Literal["text", "json"] = "text"
+    background: bool = True  # lines are written by a separate thread, never on the event loop
+    queue_size: int = 10_000  # lines waiting for the writer thread, beyond that they are dropped
+
+    # Info and debug lines only, warnings and errors are always written
+    sample_rate: float = 1.0  # share of requests whose lines are kept, decided per correlation id
+    rate_limit: float = 0.0  # lines per second, 0 for no limit
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         case_sensitive=True,
@@ -41,6 +198,14 @@ class Settings(BaseSettings):
 
     openai_settings: OpenAISettings = Field(default_factory=OpenAISettings, alias="openai")
     anthropic_settings: AnthropicSettings = Field(default_factory=AnthropicSettings, alias="anthropic")
+    recognizer_settings: RecognizerSettings = Field(default_factory=RecognizerSettings, alias="recognizer")
+    inference_settings: InferenceSettings = Field(default_factory=InferenceSettings, alias="inference")
+    cache_settings: CacheSettings = Field(default_factory=CacheSettings, alias="cache")
+    background_settings: BackgroundSettings = Field(default_factory=BackgroundSettings, alias="backgrounds")
+    matcher_settings: MatcherSettings = Field(default_factory=MatcherSettings, alias="matcher")
+    fetcher_settings: FetcherSettings = Field(default_factory=FetcherSettings, alias="fetcher")
+    logging_settings: LoggingSettings = Field(default_factory=LoggingSettings, alias="logging")
+    admin_settings: AdminSettings = Field(default_factory=AdminSettings, alias="admin")
 
     @classmethod
     def settings_customise_sources(
@@ -64,6 +229,3 @@ class Settings(BaseSettings):
 @lru_cache
 def get_settings() -> Settings:
     return Settings()
-
-
-settings = get_settings()
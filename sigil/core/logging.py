@@ -1,15 +1,29 @@
+import atexit
+import json
 import logging
+import queue
 import sys
+import threading
+import time
+import traceback
+import zlib
 from types import FrameType
-from typing import Optional, cast
+from typing import Any, Dict, Optional, TextIO, cast
 
 from loguru import logger
+from starlette_context import context
+from starlette_context.errors import ContextDoesNotExistError
+from starlette_context.header_keys import HeaderKeys
+
+from sigil.core import metrics
+from sigil.core.config.settings import LoggingSettings
 
 LOGURU_FORMAT = (
     "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | "
     "<level>{level: <8}</level> | "
     "<level>{process.name}</level> | "
     "<level>{thread.name}</level> | "
+    "{extra[correlation_id]} | "
     "<cyan>{name}</cyan>:<cyan>{function}</cyan>:"
     "<cyan>{line}</cyan> - <level>{message}</level>"
 )
@@ -44,7 +58,96 @@ class InterceptHandler(logging.Handler):
         )
 
 
-def init_logger(debug: Optional[bool] = False, loguru_format: str = LOGURU_FORMAT) -> None:
+class BackgroundSink:
+    """Loguru sink handing formatted lines to a writer thread, so logging never waits on the stream.
+
+    When more than ``max_size`` lines are waiting, new ones are dropped and counted instead of blocking.
+    """
+
+    def __init__(self, stream: TextIO, max_size: int = 10_000) -> None:
+        self._stream = stream
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_size)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def write(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            metrics.LOG_LINES_DROPPED.inc(reason="queue_full")
+
+    def isatty(self) -> bool:
+        return self._stream.isatty()
+
+    def stop(self) -> None:
+        """Write out the queued lines and end the writer thread, called by loguru when the sink is removed."""
+        atexit.unregister(self.stop)
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            lines = [self._queue.get()]
+            # Everything queued meanwhile goes out in one write
+            while len(lines) < 1024:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = None in lines
+            try:
+                self._stream.write("".join(line for line in lines if line is not None))
+                self._stream.flush()
+            except (OSError, ValueError):
+                continue
+
+
+class HotPathFilter:
+    """Loguru filter thinning out info and debug lines, warnings and errors always pass.
+
+    Requests are sampled by their correlation id, so a sampled request keeps all of its lines. The rate
+    limit is a token bucket checked without a lock, concurrent lines may overshoot it slightly.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, rate_limit: float = 0.0) -> None:
+        self._sample_threshold = sample_rate * 2**32
+        self._rate_limit = rate_limit
+        self._tokens = rate_limit
+        self._updated = time.monotonic()
+
+    def __call__(self, record: Dict[str, Any]) -> bool:
+        if record["level"].no >= logging.WARNING:
+            return True
+
+        correlation_id = record["extra"].get("correlation_id")
+        if self._sample_threshold < 2**32 and correlation_id != "-":
+            if zlib.crc32(correlation_id.encode()) >= self._sample_threshold:
+                metrics.LOG_LINES_DROPPED.inc(reason="sampled")
+                return False
+
+        if self._rate_limit > 0:
+            now = time.monotonic()
+            self._tokens = min(self._rate_limit, self._tokens + (now - self._updated) * self._rate_limit)
+            self._updated = now
+            if self._tokens < 1:
+                metrics.LOG_LINES_DROPPED.inc(reason="rate_limited")
+                return False
+            self._tokens -= 1
+
+        return True
+
+
+def init_logger(
+    debug: Optional[bool] = False,
+    loguru_format: str = LOGURU_FORMAT,
+    settings: Optional[LoggingSettings] = None,
+) -> None:
+    settings = settings if settings else LoggingSettings()
+
     # logging configuration
     logging_level = logging.DEBUG if debug else logging.INFO
     loggers = (
@@ -63,5 +166,51 @@ def init_logger(debug: Optional[bool] = False, loguru_format: str = LOGURU_FORMA
         logging_logger.propagate = False
         logging_logger.handlers = [InterceptHandler(level=logging_level)]
 
-    handlers = [{"sink": sys.stderr, "level": logging_level, "format": loguru_format}]
-    logger.configure(handlers=handlers)  # type: ignore
+    sink = BackgroundSink(sys.stderr, max_size=settings.queue_size) if settings.background else sys.stderr
+    handler: Dict[str, Any] = {
+        "sink": sink,
+        "level": logging_level,
+        "format": _format_json if settings.format == "json" else loguru_format,
+        "filter": HotPathFilter(sample_rate=settings.sample_rate, rate_limit=settings.rate_limit),
+        # Variable values in tracebacks are slow to render and may leak request data
+        "backtrace": False,
+        "diagnose": False,
+    }
+    if settings.format == "json":
+        handler["colorize"] = False
+
+    # Replacing the handlers stops the previous background sink, flushing its queue
+    logger.configure(
+        handlers=[handler],  # type: ignore
+        extra={"correlation_id": "-"},
+        patcher=_add_correlation_id,  # type: ignore
+    )
+
+
+def _add_correlation_id(record: Dict[str, Any]) -> None:
+    try:
+        record["extra"]["correlation_id"] = context[HeaderKeys.correlation_id]
+    except (ContextDoesNotExistError, KeyError):
+        pass
+
+
+def _format_json(record: Dict[str, Any]) -> str:
+    line = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "process": record["process"].name,
+        "thread": record["thread"].name,
+        **record["extra"],
+    }
+    line.pop("json", None)
+    if record["exception"] is not None:
+        error_type, error, error_traceback = record["exception"]
+        line["exception"] = "".join(traceback.format_exception(error_type, error, error_traceback))
+
+    # Loguru formats the returned template with the record, the JSON goes in through ``extra``
+    record["extra"]["json"] = json.dumps(line, default=str)
+    return "{extra[json]}\n"
@@ -0,0 +1,213 @@
+import bisect
+import math
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class Metric:
+    """Base of the in-process metrics rendered in the Prometheus text format.
+
+    Every update takes one short, uncontended lock, so recording stays cheap enough for the hot path.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format(self, name: str, key: LabelValues, value: float, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = [*zip(self.labelnames, key, strict=True), *extra]
+        labels = "{" + ",".join(f'{label}="{value}"' for label, value in pairs) + "}" if pairs else ""
+        return f"{name}{labels} {_format_value(value)}"
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+
+        return [self._format(self.name, key, value) for key, value in values.items()]
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+
+        return [self._format(self.name, key, value) for key, value in values.items()]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: one count per bucket (non-cumulative, the last one is +Inf) and the sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), []))
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+
+        lines = []
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += count
+                bucket = (("le", _format_value(bound)),)
+                lines.append(self._format(f"{self.name}_bucket", key, cumulative, extra=bucket))
+
+            lines.append(self._format(f"{self.name}_sum", key, total))
+            lines.append(self._format(f"{self.name}_count", key, cumulative))
+
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+registry = MetricsRegistry()
+
+DOWNLOAD_SECONDS = Histogram("sigil_download_seconds", "Time to download the image URLs of a request.")
+DECODE_SECONDS = Histogram("sigil_decode_seconds", "Time to decode one request image.", labelnames=("decoder",))
+INFERENCE_SECONDS = Histogram("sigil_inference_seconds", "Time to run one inference batch.")
+INFERENCE_BATCH_SIZE = Histogram(
+    "sigil_inference_batch_size",
+    "Requests per inference batch.",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+REQUEST_SECONDS = Histogram("sigil_request_seconds", "Total time to answer a slide solve request.")
+SOLVES = Counter("sigil_solves_total", "Slide solve requests by outcome.", labelnames=("result",))
+CONFIDENCE = Histogram("sigil_confidence", "Confidence of computed gap locations.", buckets=CONFIDENCE_BUCKETS)
+DEADLINE_EXCEEDED = Counter(
+    "sigil_deadline_exceeded_total",
+    "Requests dropped because their deadline passed, by the stage they were dropped at.",
+    labelnames=("stage",),
+)
+REQUESTS_IN_FLIGHT = Gauge("sigil_requests_in_flight", "Slide solve requests being handled.")
+INFERENCE_PENDING = Gauge("sigil_inference_pending", "Requests submitted to the batch scheduler and not answered yet.")
+INFERENCE_QUEUED = Gauge("sigil_inference_queued", "Requests waiting to join an inference batch.")
+MODEL_LOAD_SECONDS = Gauge("sigil_model_load_seconds", "Time it took to load a model version.", labelnames=("version",))
+MODEL_WARMUP_SECONDS = Gauge(
+    "sigil_model_warmup_seconds",
+    "Time it took to warm up a model version.",
+    labelnames=("version",),
+)
+LOG_LINES_DROPPED = Counter(
+    "sigil_log_lines_dropped_total",
+    "Log lines dropped by sampling, rate limiting or a full write queue.",
+    labelnames=("reason",),
+)
+
+for _metric in (
+    DOWNLOAD_SECONDS,
+    DECODE_SECONDS,
+    INFERENCE_SECONDS,
+    INFERENCE_BATCH_SIZE,
+    REQUEST_SECONDS,
+    SOLVES,
+    DEADLINE_EXCEEDED,
+    CONFIDENCE,
+    REQUESTS_IN_FLIGHT,
+    INFERENCE_PENDING,
+    INFERENCE_QUEUED,
+    MODEL_LOAD_SECONDS,
+    MODEL_WARMUP_SECONDS,
+    LOG_LINES_DROPPED,
+):
+    registry.register(_metric)
@@ -2,13 +2,15 @@ from dishka import AsyncContainer, make_async_container
 
 from sigil.core.config.settings import Settings
 from sigil.core.providers.configs import ConfigsProvider
-from sigil.core.providers.services import ServicesProvider
+from sigil.core.providers.services import RemoteInferenceProvider, ServicesProvider
 
 
 def make_container(settings: Settings) -> AsyncContainer:
-    container = make_async_container(
-        ConfigsProvider(settings=settings),
-        ServicesProvider(),
-    )
+    providers = [ConfigsProvider(settings=settings), ServicesProvider()]
+    # Overrides the in-process scheduler and model registry
+    if settings.inference_settings.servers:
+        providers.append(RemoteInferenceProvider())
+
+    container = make_async_container(*providers)
 
     return container
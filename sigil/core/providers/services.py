@@ -1,9 +1,147 @@
-from dishka import Provider, Scope, provide
+from typing import AsyncIterable, Iterable, Optional
 
-from sigil.services.recognizer import RecognizerService
+from dishka import Provider, Scope, alias, provide
+
+from sigil.core.config.settings import Settings
+from sigil.infrastructure.fetcher import ImageFetcher
+from sigil.services.backgrounds import BackgroundIndex
+from sigil.services.batching import BatchScheduler, GapScheduler
+from sigil.services.cache import ResultCache, SqliteCacheStore
+from sigil.services.executor import InferenceExecutor
+from sigil.services.inference_server import InferenceClient, socket_path
+from sigil.services.matcher import PieceMatcher
+from sigil.services.registry import ModelManager, ModelRegistry
+from sigil.services.solver import SolverService
 
 
 class ServicesProvider(Provider):
     @provide(scope=Scope.APP)
-    def get_recognizer(self) -> RecognizerService:
-        return RecognizerService()
+    async def get_model_registry(self, settings: Settings) -> ModelRegistry:
+        registry = ModelRegistry(settings=settings.recognizer_settings, inference_settings=settings.inference_settings)
+        # Sessions are created on a thread, warm-up runs separately from the lifespan
+        await registry.activate(settings.recognizer_settings.model_version, warm_up=False)
+        return registry
+
+    @provide(scope=Scope.APP)
+    def get_inference_executor(self, settings: Settings, registry: ModelRegistry) -> Iterable[InferenceExecutor]:
+        executor = InferenceExecutor(
+            workers=registry.inference_workers(),
+            max_queue_size=settings.inference_settings.max_queue_size,
+        )
+        yield executor
+        executor.shutdown()
+
+    @provide(scope=Scope.APP)
+    async def get_batch_scheduler(
+        self,
+        settings: Settings,
+        registry: ModelRegistry,
+        executor: InferenceExecutor,
+    ) -> AsyncIterable[BatchScheduler]:
+        scheduler = BatchScheduler(
+            registry=registry,
+            executor=executor,
+            max_batch_size=settings.inference_settings.batch_max_size,
+            max_wait_ms=settings.inference_settings.batch_max_wait_ms,
+        )
+        yield scheduler
+        await scheduler.close()
+
+    scheduler = alias(source=BatchScheduler, provides=GapScheduler)
+    models = alias(source=ModelRegistry, provides=ModelManager)
+
+    @provide(scope=Scope.APP)
+    def get_result_cache(self, settings: Settings) -> Iterable[Optional[ResultCache]]:
+        cache_settings = settings.cache_settings
+        if not cache_settings.enabled:
+            yield None
+            return
+
+        store = SqliteCacheStore(path=cache_settings.sqlite_path) if cache_settings.sqlite_path else None
+        cache = ResultCache(
+            max_entries=cache_settings.max_entries,
+            max_bytes=cache_settings.max_bytes,
+            ttl=cache_settings.ttl_seconds,
+            store=store,
+        )
+        yield cache
+        cache.close()
+
+    @provide(scope=Scope.APP)
+    async def get_image_fetcher(self, settings: Settings) -> AsyncIterable[ImageFetcher]:
+        fetcher_settings = settings.fetcher_settings
+        fetcher = ImageFetcher(
+            limit=fetcher_settings.limit,
+            limit_per_host=fetcher_settings.limit_per_host,
+            dns_cache_ttl=fetcher_settings.dns_cache_ttl,
+            connect_timeout=fetcher_settings.connect_timeout,
+            read_timeout=fetcher_settings.read_timeout,
+            total_timeout=fetcher_settings.total_timeout,
+            max_bytes=fetcher_settings.max_bytes,
+        )
+        yield fetcher
+        await fetcher.close()
+
+    @provide(scope=Scope.APP)
+    def get_background_index(self, settings: Settings) -> Iterable[Optional[BackgroundIndex]]:
+        background_settings = settings.background_settings
+        if not background_settings.index_dir:
+            yield None
+            return
+
+        index = BackgroundIndex(
+            directory=background_settings.index_dir,
+            max_hash_distance=background_settings.max_hash_distance,
+            flush_every=background_settings.flush_every,
+            flush_interval=background_settings.flush_interval,
+        )
+        yield index
+        index.close()
+
+    @provide(scope=Scope.APP)
+    def get_piece_matcher(self, settings: Settings) -> Optional[PieceMatcher]:
+        if not settings.matcher_settings.enabled:
+            return None
+
+        return PieceMatcher(band=settings.matcher_settings.band)
+
+    @provide(scope=Scope.APP)
+    def get_solver(
+        self,
+        settings: Settings,
+        scheduler: GapScheduler,
+        fetcher: ImageFetcher,
+        cache: Optional[ResultCache],
+        backgrounds: Optional[BackgroundIndex],
+        matcher: Optional[PieceMatcher],
+    ) -> SolverService:
+        return SolverService(
+            scheduler=scheduler,
+            fetcher=fetcher,
+            cache=cache,
+            backgrounds=backgrounds,
+            matcher=matcher,
+            recognizer_settings=settings.recognizer_settings,
+            background_settings=settings.background_settings,
+            matcher_settings=settings.matcher_settings,
+        )
+
+
+class RemoteInferenceProvider(Provider):
+    """Sends inference to the inference server processes instead of loading the models in this worker."""
+
+    @provide(scope=Scope.APP)
+    async def get_inference_client(self, settings: Settings) -> AsyncIterable[InferenceClient]:
+        inference_settings = settings.inference_settings
+        client = InferenceClient(
+            paths=[socket_path(inference_settings, index) for index in range(inference_settings.servers)],
+            ring_slots=inference_settings.ring_slots,
+            ring_slot_bytes=inference_settings.ring_slot_bytes,
+            capacity=inference_settings.servers * inference_settings.workers * inference_settings.batch_max_size,
+            connect_timeout=inference_settings.server_connect_timeout,
+        )
+        yield client
+        await client.close()
+
+    scheduler = alias(source=InferenceClient, provides=GapScheduler)
+    models = alias(source=InferenceClient, provides=ModelManager)
@@ -0,0 +1,48 @@
+import contextlib
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List
+
+
+class StageTimer:
+    """Process-wide collector of per-stage durations (decode, preprocess, inference...).
+
+    Disabled by default so serving pays a single attribute check per stage; benchmarks enable it,
+    run their load and read the samples back.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._samples[name].append(seconds)
+
+    def samples(self) -> Dict[str, List[float]]:
+        with self._lock:
+            return {name: list(values) for name, values in self._samples.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+stage_timer = StageTimer()
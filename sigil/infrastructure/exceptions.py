@@ -3,6 +3,7 @@ class ApplicationError(Exception):
 
     detail: str
     error_code: str
+    status_code: int = 400
 
     def __init__(self, detail: str = "Application Error", error_code: str = "application_error") -> None:
         self.detail = detail
@@ -12,6 +13,42 @@ class ApplicationError(Exception):
         return f"{self.error_code}: {self.detail}"
 
 
+class ServiceUnavailableError(ApplicationError):
+    """Class for errors raised when the service is temporarily overloaded."""
+
+    status_code = 503
+
+    def __init__(self, detail: str = "Service Unavailable", error_code: str = "service_unavailable") -> None:
+        super().__init__(detail=detail, error_code=error_code)
+
+
+class DeadlineExceededError(ApplicationError):
+    """Class for errors raised when a request's deadline passes before it could be answered."""
+
+    status_code = 504
+
+    def __init__(self, detail: str = "Deadline Exceeded", error_code: str = "deadline_exceeded") -> None:
+        super().__init__(detail=detail, error_code=error_code)
+
+
+class UnauthorizedError(ApplicationError):
+    """Class for errors raised when a request lacks valid credentials."""
+
+    status_code = 401
+
+    def __init__(self, detail: str = "Unauthorized", error_code: str = "unauthorized") -> None:
+        super().__init__(detail=detail, error_code=error_code)
+
+
+class ForbiddenError(ApplicationError):
+    """Class for errors raised when a request is refused regardless of its credentials."""
+
+    status_code = 403
+
+    def __init__(self, detail: str = "Forbidden", error_code: str = "forbidden") -> None:
+        super().__init__(detail=detail, error_code=error_code)
+
+
 class ExternalClientError(Exception):
     """Class for External Client errors."""
 
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from typing import List, Optional
+
+import aiohttp
+from loguru import logger
+
+from sigil.infrastructure.exceptions import ExternalClientError
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ImageDownloadError(ExternalClientError):
+    """Class for errors downloading a remote image."""
+
+    def __init__(self, detail: str = "Error downloading image", error_code: str = "400") -> None:
+        super().__init__(detail=detail, error_code=error_code)
+
+
+class ImageFetcher:
+    """App-scoped HTTP client for image URLs.
+
+    A single ``aiohttp.ClientSession`` keeps a shared connection pool and DNS cache, so URL requests
+    reuse warm connections instead of paying a TCP/TLS handshake each time. Downloads are bounded by
+    connect/read timeouts, a total timeout (or the request's deadline when sooner) and a maximum size
+    enforced while streaming the body.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 16,
+        dns_cache_ttl: int = 300,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        total_timeout: float = 30.0,
+        max_bytes: int = 5 * 1024 * 1024,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_bytes = max_bytes
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def fetch(self, url: str, deadline: Optional[float] = None) -> bytes:
+        """Download ``url``, giving up at ``deadline`` (a ``time.monotonic()`` value) if that comes first."""
+        timeout = self.timeout
+        if deadline is not None:
+            # aiohttp reads a zero total as no limit at all
+            remaining = max(0.001, deadline - time.monotonic())
+            timeout = aiohttp.ClientTimeout(
+                total=min(timeout.total or remaining, remaining),
+                sock_connect=timeout.sock_connect,
+                sock_read=timeout.sock_read,
+            )
+
+        try:
+            async with self._get_session().get(url=url, timeout=timeout) as response:
+                # The error body is neither read nor passed on, it is the remote server's business
+                if not response.ok:
+                    msg = f"Error downloading image: HTTP {response.status}"
+                    raise ImageDownloadError(detail=msg)
+
+                if not response.content_type.startswith("image/"):
+                    msg = f"Error downloading image: HTTP {response.status} - {response.content_type}"
+                    raise ImageDownloadError(detail=msg)
+
+                if response.content_length is not None and response.content_length > self.max_bytes:
+                    msg = f"Error downloading image: {response.content_length} bytes exceeds {self.max_bytes}"
+                    raise ImageDownloadError(detail=msg)
+
+                chunks = []
+                size = 0
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        msg = f"Error downloading image: body exceeds {self.max_bytes} bytes"
+                        raise ImageDownloadError(detail=msg)
+
+                    chunks.append(chunk)
+
+                return b"".join(chunks)
+
+        except ImageDownloadError as e:
+            logger.error(e.detail)
+            raise
+
+        except asyncio.TimeoutError:
+            msg = f"Error downloading image: timed out fetching {url}"
+            logger.error(msg)
+            raise ImageDownloadError(detail=msg)
+
+        except aiohttp.ClientError as e:
+            msg = f"Error downloading image: {str(e)}"
+            logger.error(msg)
+            raise ImageDownloadError(detail=msg)
+
+    async def fetch_many(self, *urls: str, deadline: Optional[float] = None) -> List[bytes]:
+        """Download every URL concurrently over the shared pool."""
+        return list(await asyncio.gather(*[self.fetch(url, deadline=deadline) for url in urls]))
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+        self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session binds to the serving event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+        return self._session
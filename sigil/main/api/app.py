@@ -2,9 +2,19 @@ from dishka import AsyncContainer
 
 from sigil.core.config.settings import Settings
 from sigil.main.api.factory import APIFactory
+from sigil.services.inference_server import inference_servers
 
 
-def run_api(settings: Settings, container: AsyncContainer, host: str = "0.0.0.0", port: int = 8000) -> None:
+def run_api(
+    settings: Settings,
+    container: AsyncContainer,
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = 1,
+) -> None:
     factory = APIFactory(container=container, settings=settings)
     app = factory.make()
-    factory.run(app=app, host=host, port=port)
+
+    # Starts the SIGIL_INFERENCE_SERVERS model processes (none by default) next to the HTTP workers
+    with inference_servers(settings=settings):
+        factory.run(app=app, host=host, port=port, workers=workers)
@@ -1,3 +1,5 @@
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Optional
 
@@ -6,23 +8,35 @@ from dishka import AsyncContainer
 from dishka.integrations.fastapi import setup_dishka
 from fastapi import FastAPI
 from loguru import logger
+from starlette_context.middleware import RawContextMiddleware
+from starlette_context.plugins import CorrelationIdPlugin
 
 from sigil.core.config.settings import Settings, get_settings
 from sigil.core.logging import init_logger
 from sigil.presentation.apis import api_v1_router, root_router
 from sigil.presentation.exceptions import setup_exception_handlers
+from sigil.services.inference_server import InferenceClient
+from sigil.services.registry import ModelRegistry
+from sigil.services.warmup import Readiness
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator:
-    init_logger(debug=app.debug)
+    init_logger(debug=app.debug, settings=app.state.settings.logging_settings)
+
+    # Warm up in the background so the server starts answering /health while models load
+    dishka_container = getattr(app.state, "dishka_container", None)
+    warmup_task = None
+    if dishka_container:
+        warmup_task = asyncio.create_task(_warm_up(container=dishka_container, readiness=app.state.readiness))
+
     yield
 
-    state = getattr(app, "state", None)
-    if not state:
-        return
+    if warmup_task is not None:
+        warmup_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await warmup_task
 
-    dishka_container = getattr(state, "dishka_container", None)
     if not dishka_container:
         return
 
@@ -30,6 +44,26 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     logger.info("Dishka container closed")
 
 
+async def _warm_up(container: AsyncContainer, readiness: Readiness) -> None:
+    """Load the active model version and warm it up, then mark the app ready."""
+    try:
+        settings = await container.get(Settings)
+        if settings.inference_settings.servers:
+            # The inference servers only listen once their models are warm
+            client = await container.get(InferenceClient)
+            await client.connect()
+        else:
+            registry = await container.get(ModelRegistry)
+            await registry.warm_up()
+
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+        readiness.status, readiness.detail = "failed", str(e)
+        return
+
+    readiness.status = "ready"
+
+
 class APIFactory:
     def __init__(self, container: AsyncContainer, settings: Optional[Settings] = None) -> None:
         self._settings = settings if settings else get_settings()
@@ -49,7 +83,11 @@ class APIFactory:
             },
         )
 
+        app.state.settings = self._settings
+        app.state.readiness = Readiness()
         setup_dishka(container=self._container, app=app)
+        # Outermost, so every log line of a request carries its correlation id, which is echoed back
+        app.add_middleware(RawContextMiddleware, plugins=(CorrelationIdPlugin(validate=False),))
         setup_exception_handlers(app=app)
 
         app.include_router(router=root_router)
@@ -57,5 +95,10 @@ class APIFactory:
 
         return app
 
-    def run(self, app: FastAPI, host: str = "0.0.0.0", port: int = 8000) -> None:
+    def run(self, app: FastAPI, host: str = "0.0.0.0", port: int = 8000, workers: int = 1) -> None:
+        if workers > 1:
+            # Every worker process builds its own app, so uvicorn needs it as an import string
+            uvicorn.run(app="sigil.main.api.native:app", host=host, port=port, workers=workers)
+            return
+
         uvicorn.run(app=app, host=host, port=port)
@@ -1,9 +1,13 @@
+from pathlib import Path
+from typing import Any, List, Optional, cast
+
 import typer
 
 from sigil.core.async_typer import AsyncTyper
-from sigil.core.config.settings import get_settings
+from sigil.core.config.settings import Settings, get_settings
 from sigil.core.providers.factory import make_container
 from sigil.main.api.app import run_api
+from sigil.services.images import IMAGE_SUFFIXES
 
 
 class CLIFactory:
@@ -22,6 +26,13 @@ class CLIFactory:
         )
 
         self.add_api_command(app=app)
+        self.add_backgrounds_command(app=app)
+        self.add_models_command(app=app)
+        self.add_quantize_command(app=app)
+        self.add_tune_command(app=app)
+        self.add_bench_command(app=app)
+        self.add_replay_command(app=app)
+        self.add_solve_command(app=app)
 
         return app
 
@@ -41,8 +52,558 @@ class CLIFactory:
                 "-p",
                 help="Port to run the API Sever",
             ),
+            workers: int = typer.Option(
+                1,
+                "--workers",
+                "-w",
+                help="HTTP worker processes; set SIGIL_INFERENCE_SERVERS to share the models between them",
+            ),
         ) -> None:
             """[green]Run[/green] api."""
             ctx_container = ctx.obj.get("container")
             ctx_settings = ctx.obj.get("settings")
-            run_api(settings=ctx_settings, container=ctx_container, host=host, port=port)
+            run_api(settings=ctx_settings, container=ctx_container, host=host, port=port, workers=workers)
+
+        @app.command(name="inference-server")
+        def inference_server(
+            ctx: typer.Context,
+            index: int = typer.Option(
+                0,
+                "--index",
+                "-i",
+                help="Listen on inference-INDEX.sock in SIGIL_INFERENCE_SERVER_DIR",
+            ),
+        ) -> None:
+            """[green]Run[/green] an inference server for API workers started with SIGIL_INFERENCE_SERVERS."""
+            from sigil.services.inference_server import run_inference_server
+
+            run_inference_server(settings=ctx.obj.get("settings"), index=index)
+
+    def add_backgrounds_command(self, app: AsyncTyper) -> None:
+        backgrounds_app = AsyncTyper(help="Build and inspect the background pool index.")
+        app.add_typer(backgrounds_app, name="backgrounds")
+
+        @backgrounds_app.command(name="build")
+        def build(
+            ctx: typer.Context,
+            source: Path = typer.Argument(..., exists=True, file_okay=False, help="Directory of captcha images"),
+            index_dir: Optional[Path] = typer.Option(
+                None,
+                "--index-dir",
+                "-i",
+                help="Index directory (default: SIGIL_BACKGROUNDS_INDEX_DIR)",
+            ),
+            mask_gaps: bool = typer.Option(
+                True,
+                "--mask-gaps/--no-mask-gaps",
+                help="Images are puzzles: detect their gap with the model and keep it out of the background. "
+                "Turn off only for directories of clean backgrounds",
+            ),
+        ) -> None:
+            """[green]Build[/green] the background index from a directory of images."""
+            from sigil.services.backgrounds import BackgroundIndex
+            from sigil.services.images import decode_image
+
+            ctx_settings: Settings = ctx.obj.get("settings")
+            index = BackgroundIndex(
+                directory=self._resolve_index_dir(settings=ctx_settings, index_dir=index_dir),
+                max_hash_distance=ctx_settings.background_settings.max_hash_distance,
+            )
+
+            recognizer = None
+            if mask_gaps:
+                from sigil.services.registry import ModelRegistry
+
+                recognizer = ModelRegistry(settings=ctx_settings.recognizer_settings).build()
+
+            for path in sorted(source.iterdir()):
+                if path.suffix.lower() not in IMAGE_SUFFIXES or _is_cutout(path):
+                    continue
+
+                image = decode_image(path.read_bytes())
+                box = None
+                if recognizer is not None:
+                    box, confidence = recognizer.identify_gap(source=image)
+                    if confidence < ctx_settings.background_settings.learn_min_confidence:
+                        typer.echo(f"skipped {path.name}: no confident gap (confidence {confidence:.2f})")
+                        continue
+
+                entry = index.learn(image=image, box=box)
+                typer.echo(f"{path.name} -> background #{entry}")
+
+            index.close()
+            typer.echo(f"{len(index)} backgrounds in {index.directory}")
+
+        @backgrounds_app.command(name="inspect")
+        def inspect(
+            ctx: typer.Context,
+            index_dir: Optional[Path] = typer.Option(
+                None,
+                "--index-dir",
+                "-i",
+                help="Index directory (default: SIGIL_BACKGROUNDS_INDEX_DIR)",
+            ),
+        ) -> None:
+            """[green]Inspect[/green] the background index."""
+            from sigil.services.backgrounds import BackgroundIndex
+
+            ctx_settings: Settings = ctx.obj.get("settings")
+            index = BackgroundIndex(directory=self._resolve_index_dir(settings=ctx_settings, index_dir=index_dir))
+
+            typer.echo(f"{len(index)} backgrounds in {index.directory}")
+            for entry in index.entries():
+                typer.echo(
+                    f"#{entry['index']:<4} hash={entry['hash']} observations={entry['observations']:<4} "
+                    f"known={entry['known_fraction']:.1%} source={entry['source_width']}x{entry['source_height']}"
+                )
+
+    def add_models_command(self, app: AsyncTyper) -> None:
+        models_app = AsyncTyper(help="List model versions and hot-swap the one a running API serves.")
+        app.add_typer(models_app, name="models")
+
+        @models_app.command(name="list")
+        def list_versions(ctx: typer.Context) -> None:
+            """[green]List[/green] the model versions under SIGIL_RECOGNIZER_MODELS_DIR."""
+            from sigil.services.registry import ModelRegistry
+
+            ctx_settings: Settings = ctx.obj.get("settings")
+            registry = ModelRegistry(settings=ctx_settings.recognizer_settings)
+
+            versions = registry.versions()
+            if not versions:
+                typer.echo(f"No model versions in {ctx_settings.recognizer_settings.models_dir}")
+                return
+
+            default = registry.resolve()
+            for version in versions:
+                typer.echo(f"{version}{' (startup)' if version == default else ''}")
+
+        @models_app.command(name="activate")
+        async def activate(
+            ctx: typer.Context,
+            version: str = typer.Argument(..., help="Model version directory to swap in"),
+            url: str = typer.Option("http://localhost:8000", "--url", "-u", help="Base URL of the running API"),
+            admin_key: Optional[str] = typer.Option(
+                None,
+                "--admin-key",
+                help="Admin key of the API (default: SIGIL_ADMIN_KEY)",
+            ),
+            timeout: float = typer.Option(300.0, "--timeout", help="Seconds to wait for load and warm-up"),
+        ) -> None:
+            """[green]Activate[/green] a model version on a running API without downtime."""
+            import httpx
+
+            ctx_settings: Settings = ctx.obj.get("settings")
+            try:
+                async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+                    response = await client.post(
+                        "/api/v1/admin/models/activate",
+                        json={"version": version},
+                        headers={"X-Admin-Key": admin_key or _admin_key(ctx_settings)},
+                    )
+            except httpx.HTTPError as e:
+                typer.echo(f"Cannot reach the API at {url}: {e}", err=True)
+                raise typer.Exit(code=1)
+
+            body = response.json()
+            if response.status_code != 200:
+                typer.echo(f"Activation failed ({response.status_code}): {'; '.join(body.get('errors', []))}", err=True)
+                raise typer.Exit(code=1)
+
+            data = body["data"]
+            typer.echo(
+                f"{data['active']} active (was {data['previous']}), "
+                f"load {data['load_seconds']:.2f}s, warm-up {data['warmup_seconds']:.2f}s"
+            )
+
+    def add_quantize_command(self, app: AsyncTyper) -> None:
+        @app.command(name="quantize")
+        def quantize(
+            ctx: typer.Context,
+            calibration_dir: Path = typer.Argument(
+                ...,
+                exists=True,
+                file_okay=False,
+                help="Directory of captcha images",
+            ),
+            precision: str = typer.Option("int8", "--precision", help="Variant to build: int8 or fp16"),
+            version: Optional[str] = typer.Option(
+                None,
+                "--version",
+                help="Model version to quantize (default: the one loaded at startup)",
+            ),
+            per_channel: bool = typer.Option(False, "--per-channel", help="Quantize convolution weights per channel"),
+            max_images: int = typer.Option(200, "--max-images", help="Calibration images to use at most"),
+        ) -> None:
+            """[green]Build[/green] INT8 or FP16 model variants and compare them with FP32 on the calibration set."""
+            from sigil.services.images import decode_image
+            from sigil.services.quantization import Precision, compare_models, quantize_model
+            from sigil.services.recognizer import model_filename
+            from sigil.services.registry import ModelRegistry, version_dir
+
+            if precision not in ("int8", "fp16"):
+                msg = "Use int8 or fp16"
+                raise typer.BadParameter(msg, param_hint="--precision")
+
+            ctx_settings: Settings = ctx.obj.get("settings")
+            recognizer_settings = ctx_settings.recognizer_settings
+            registry = ModelRegistry(settings=recognizer_settings.model_copy(update={"precision": "fp32"}))
+            models_dir = version_dir(recognizer_settings.models_dir, registry.resolve(version))
+
+            paths = [path for path in sorted(calibration_dir.iterdir()) if path.suffix.lower() in IMAGE_SUFFIXES]
+            images = [decode_image(path.read_bytes()) for path in paths if not _is_cutout(path)][:max_images]
+            if not images:
+                msg = f"No captcha images in {calibration_dir}"
+                raise typer.BadParameter(msg)
+
+            typer.echo(f"Calibrating on {len(images)} images from {calibration_dir}")
+            for name in ("multi_cls", "single_cls"):
+                baseline_path = models_dir / model_filename(name)
+                if not baseline_path.is_file():
+                    continue
+
+                variant_path = quantize_model(
+                    model_path=baseline_path,
+                    output_path=models_dir / model_filename(name, precision),
+                    precision=cast(Precision, precision),
+                    calibration_images=images,
+                    imgsz=recognizer_settings.imgsz,
+                    per_channel=per_channel,
+                )
+                comparison = compare_models(
+                    baseline_path=baseline_path,
+                    variant_path=variant_path,
+                    images=images,
+                    conf=recognizer_settings.conf,
+                    imgsz=recognizer_settings.imgsz,
+                )
+                typer.echo(
+                    f"{variant_path.name}: {comparison.variant_ms:.1f} ms vs {comparison.baseline_ms:.1f} ms fp32, "
+                    f"box agreement {comparison.agreement:.1%} (mean IoU {comparison.mean_iou:.3f}), "
+                    f"x error {comparison.mean_x_error:.2f} px, confidence {comparison.mean_confidence_delta:+.3f}"
+                )
+
+            typer.echo(f"Serve it with SIGIL_RECOGNIZER_PRECISION={precision}")
+
+    def add_tune_command(self, app: AsyncTyper) -> None:
+        @app.command(name="tune")
+        def tune(
+            ctx: typer.Context,
+            images_dir: Optional[Path] = typer.Option(
+                None,
+                "--images",
+                "-i",
+                exists=True,
+                file_okay=False,
+                help="Directory of puzzle images (default: SIGIL_INFERENCE_WARMUP_IMAGES_DIR or a synthetic image)",
+            ),
+            version: Optional[str] = typer.Option(
+                None,
+                "--version",
+                help="Model version to tune (default: the one loaded at startup)",
+            ),
+            batch_sizes: Optional[str] = typer.Option(
+                None,
+                "--batch-sizes",
+                "-b",
+                help=(
+                    "Comma-separated batch sizes to measure "
+                    "(default: 1, half and all of SIGIL_INFERENCE_BATCH_MAX_SIZE)"
+                ),
+            ),
+            rounds: int = typer.Option(5, "--rounds", "-n", help="Calls per worker and batch size for each candidate"),
+            max_workers: int = typer.Option(8, "--max-workers", help="Largest inference worker count to try"),
+            latency_slack: float = typer.Option(
+                0.25,
+                "--latency-slack",
+                help="Throughput wins among candidates whose latency is within this share of the fastest",
+            ),
+        ) -> None:
+            """[green]Tune[/green] ONNX Runtime threads and graph optimization on this host and save the result."""
+            from sigil.services.recognizer import MODEL_NAMES, execution_providers, model_filename
+            from sigil.services.registry import ModelRegistry, version_dir
+            from sigil.services.tuning import candidates, save_profile
+            from sigil.services.tuning import tune as run_tuning
+            from sigil.services.warmup import load_warmup_images
+
+            ctx_settings: Settings = ctx.obj.get("settings")
+            inference_settings = ctx_settings.inference_settings
+            if batch_sizes:
+                try:
+                    sizes = sorted({int(size) for size in batch_sizes.split(",") if size.strip()})
+                except ValueError:
+                    msg = "Use comma-separated integers, e.g. 1,4,8"
+                    raise typer.BadParameter(msg, param_hint="--batch-sizes")
+            else:
+                sizes = sorted({1, max(1, inference_settings.batch_max_size // 2), inference_settings.batch_max_size})
+
+            registry = ModelRegistry(settings=ctx_settings.recognizer_settings)
+            models_dir = version_dir(ctx_settings.recognizer_settings.models_dir, registry.resolve(version))
+            recognizer_settings = ctx_settings.recognizer_settings.model_copy(update={"models_dir": models_dir})
+            if recognizer_settings.engine != "onnx":
+                msg = "Tuning needs SIGIL_RECOGNIZER_ENGINE=onnx"
+                raise typer.BadParameter(msg)
+
+            sources = {
+                name: models_dir / model_filename(name, recognizer_settings.precision)
+                for name in MODEL_NAMES
+                if (models_dir / model_filename(name, recognizer_settings.precision)).is_file()
+            }
+            images = load_warmup_images(images_dir or inference_settings.warmup_images_dir)
+            sweep = candidates(max_workers=max_workers)
+            typer.echo(f"Measuring {len(sweep)} configurations at batch sizes {', '.join(map(str, sizes))}")
+
+            def report(result: Any) -> None:
+                typer.echo(
+                    f"{result.candidate.describe():<28} {result.latency_ms:8.1f} ms {result.throughput:8.1f} images/s"
+                )
+
+            results = run_tuning(
+                settings=recognizer_settings,
+                images=images,
+                batch_sizes=sizes,
+                sweep=sweep,
+                rounds=rounds,
+                latency_slack=latency_slack,
+                on_result=report,
+            )
+
+            profile = save_profile(
+                settings=recognizer_settings,
+                result=results[0],
+                sources=sources,
+                providers=execution_providers(),
+                batch_sizes=sizes,
+            )
+            typer.echo(f"Picked {results[0].candidate.describe()}, saved to {profile.directory}")
+            typer.echo("Recognizers load it on start unless SIGIL_RECOGNIZER_TUNED=false")
+
+    def add_bench_command(self, app: AsyncTyper) -> None:
+        @app.command(name="bench")
+        async def bench(
+            ctx: typer.Context,
+            images_dir: Optional[Path] = typer.Option(
+                None,
+                "--images",
+                "-i",
+                exists=True,
+                file_okay=False,
+                help="Directory of puzzle images (default: resources/)",
+            ),
+            concurrency: str = typer.Option("1,4,16", "--concurrency", "-c", help="Comma-separated concurrency levels"),
+            requests: int = typer.Option(200, "--requests", "-n", help="Requests per concurrency level"),
+            target: Optional[List[str]] = typer.Option(
+                None,
+                "--target",
+                "-t",
+                help="recognizer (in-process identify_gap) or api (full /slide path), repeatable (default: both)",
+            ),
+            stub: bool = typer.Option(False, "--stub", help="Use the generated stand-in model even if weights exist"),
+            output: Optional[Path] = typer.Option(None, "--output", "-o", help="Write the JSON report here"),
+        ) -> None:
+            """[green]Benchmark[/green] latency and throughput with a per-stage breakdown."""
+            import json
+
+            from sigil.benchmarks.runner import TARGETS, format_report, run_benchmarks
+
+            try:
+                levels = [int(level) for level in concurrency.split(",") if level.strip()]
+            except ValueError:
+                msg = "Use comma-separated integers, e.g. 1,4,16"
+                raise typer.BadParameter(msg, param_hint="--concurrency")
+
+            targets = target or list(TARGETS)
+            if unknown := set(targets) - set(TARGETS):
+                msg = f"Unknown target {', '.join(sorted(unknown))}"
+                raise typer.BadParameter(msg, param_hint="--target")
+
+            source = images_dir or Path(__file__).resolve().parents[3] / "resources"
+            paths = [path for path in sorted(source.iterdir()) if path.suffix.lower() in IMAGE_SUFFIXES]
+            images = [path.read_bytes() for path in paths if not _is_cutout(path)]
+            if not images:
+                msg = f"No puzzle images in {source}"
+                raise typer.BadParameter(msg, param_hint="--images")
+
+            ctx_settings: Settings = ctx.obj.get("settings")
+            report = await run_benchmarks(
+                settings=ctx_settings,
+                images=images,
+                concurrency_levels=levels,
+                requests=requests,
+                targets=targets,
+                use_stub=True if stub else None,
+            )
+
+            typer.echo(f"model: {report['config']['model']}, {len(images)} images, {requests} requests per level")
+            typer.echo(format_report(report))
+            if output:
+                output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+                typer.echo(f"Report written to {output}")
+
+    def add_replay_command(self, app: AsyncTyper) -> None:
+        @app.command(name="replay")
+        async def replay(
+            ctx: typer.Context,
+            captures_path: Path = typer.Argument(
+                ...,
+                exists=True,
+                dir_okay=False,
+                help="JSONL file of captured requests",
+            ),
+            url: Optional[str] = typer.Option(
+                None,
+                "--url",
+                "-u",
+                help="Base URL of a running server (default: replay against the app in-process)",
+            ),
+            mode: str = typer.Option(
+                "closed",
+                "--mode",
+                "-m",
+                help="open (constant rate) or closed (fixed concurrency)",
+            ),
+            concurrency: int = typer.Option(4, "--concurrency", "-c", help="Clients in flight in closed-loop mode"),
+            rate: Optional[float] = typer.Option(
+                None,
+                "--rate",
+                "-r",
+                help="Requests per second; required in open-loop mode, the intended rate in closed-loop mode",
+            ),
+            requests: Optional[int] = typer.Option(
+                None,
+                "--requests",
+                "-n",
+                help="Requests to send, cycling through the captures (default: one pass)",
+            ),
+            stub: bool = typer.Option(False, "--stub", help="In-process: use the generated stand-in model"),
+            timeout: float = typer.Option(30.0, "--timeout", help="Per-request timeout in seconds"),
+            output: Optional[Path] = typer.Option(None, "--output", "-o", help="Write the JSON report here"),
+        ) -> None:
+            """[green]Replay[/green] captured requests and report latency with coordinated-omission correction."""
+            import json
+
+            from sigil.benchmarks.replay import MODES, format_replay_report, load_captures, run_replay
+
+            if mode not in MODES:
+                msg = f"Use one of {', '.join(MODES)}"
+                raise typer.BadParameter(msg, param_hint="--mode")
+            if mode == "open" and not rate:
+                msg = "Open-loop replay needs a rate"
+                raise typer.BadParameter(msg, param_hint="--rate")
+
+            try:
+                captures = load_captures(captures_path)
+            except ValueError as e:
+                raise typer.BadParameter(str(e), param_hint="CAPTURES_PATH")
+
+            if not captures:
+                msg = f"No requests in {captures_path}"
+                raise typer.BadParameter(msg, param_hint="CAPTURES_PATH")
+
+            ctx_settings: Settings = ctx.obj.get("settings")
+            report = await run_replay(
+                settings=ctx_settings,
+                captures=captures,
+                requests=requests,
+                mode=mode,
+                concurrency=concurrency,
+                rate=rate,
+                url=url,
+                use_stub=True if stub else None,
+                timeout=timeout,
+            )
+
+            typer.echo(f"target: {report['config']['target']}, {len(captures)} captured requests")
+            typer.echo(format_replay_report(report))
+            if output:
+                output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+                typer.echo(f"Report written to {output}")
+
+    def add_solve_command(self, app: AsyncTyper) -> None:
+        @app.command(name="solve")
+        def solve(
+            ctx: typer.Context,
+            source: str = typer.Argument(..., help="Directory of images, glob pattern or JSONL manifest"),
+            output: Path = typer.Option(
+                ...,
+                "--output",
+                "-o",
+                dir_okay=False,
+                help="JSONL file results are appended to",
+            ),
+            workers: int = typer.Option(0, "--workers", "-w", help="Worker processes (default: one per core)"),
+            batch_size: int = typer.Option(8, "--batch-size", "-b", help="Images per inference batch"),
+            shrink_size: Optional[float] = typer.Option(
+                340.0,
+                "--shrink-size",
+                help="Width the puzzles are displayed at, as in the API; 0 returns image pixels",
+            ),
+            version: Optional[str] = typer.Option(
+                None,
+                "--version",
+                help="Model version (default: the configured one)",
+            ),
+        ) -> None:
+            """[green]Solve[/green] an archive of puzzles offline, resuming from the output file."""
+            from sigil.services.bulk import collect_items, solve_bulk
+
+            try:
+                items = collect_items(source, shrink_size=shrink_size or None)
+            except ValueError as e:
+                raise typer.BadParameter(str(e), param_hint="SOURCE")
+
+            if not items:
+                msg = f"No images in {source}"
+                raise typer.BadParameter(msg, param_hint="SOURCE")
+
+            def report_progress(done: int, total: int, elapsed: float) -> None:
+                rate = done / elapsed if elapsed else 0.0
+                typer.echo(f"\r{done}/{total} solved, {rate:.1f} images/s", nl=False, err=True)
+
+            ctx_settings: Settings = ctx.obj.get("settings")
+            summary = solve_bulk(
+                items=items,
+                output=output,
+                settings=ctx_settings.recognizer_settings,
+                workers=workers,
+                batch_size=batch_size,
+                version=version,
+                on_progress=report_progress,
+            )
+
+            typer.echo("", err=True)
+            typer.echo(
+                f"{summary.solved} solved, {summary.failed} failed, {summary.skipped} already in {output} "
+                f"({summary.seconds:.1f}s)"
+            )
+
+    @staticmethod
+    def _resolve_index_dir(settings: Settings, index_dir: Optional[Path]) -> Path:
+        directory = index_dir or settings.background_settings.index_dir
+        if directory is None:
+            msg = "Pass --index-dir or set SIGIL_BACKGROUNDS_INDEX_DIR"
+            raise typer.BadParameter(msg)
+
+        return directory
+
+
+def _is_cutout(path: Path) -> bool:
+    """Slider pieces are cut-outs with transparent pixels, not backgrounds."""
+    from PIL import Image
+
+    from sigil.services.images import register_heif_opener
+
+    if path.suffix.lower() in (".heic", ".heif"):
+        register_heif_opener()
+
+    with Image.open(path) as image:
+        if "A" not in image.getbands():
+            return False
+
+        # A single band's extrema are a (min, max) pair of ints
+        return cast(int, image.getchannel("A").getextrema()[0]) < 255
+
+
+def _admin_key(settings: Settings) -> str:
+    key = settings.admin_settings.key
+    return key.get_secret_value() if key is not None else ""
@@ -1,9 +1,11 @@
 from dishka.integrations.fastapi import DishkaRoute
 from fastapi import APIRouter, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from scalar_fastapi import get_scalar_api_reference
 from starlette.responses import HTMLResponse
 
+from sigil.core import metrics
+from sigil.presentation.routers.v1.admin.routers import admin_router
 from sigil.presentation.routers.v1.captchas.routers import captchas_router
 
 root_router = APIRouter()
@@ -19,6 +21,23 @@ async def health() -> JSONResponse:
     return JSONResponse(content={"status": "ok"})
 
 
+@root_router.get("/health/ready")
+async def ready(request: Request) -> JSONResponse:
+    # Not ready until the models are loaded and warmed up, so load balancers keep traffic off cold pods
+    readiness = request.app.state.readiness
+    content = {"status": readiness.status}
+    if readiness.detail:
+        content["detail"] = readiness.detail
+
+    return JSONResponse(content=content, status_code=200 if readiness.ready else 503)
+
+
+@root_router.get("/metrics", include_in_schema=False)
+async def metrics_text() -> PlainTextResponse:
+    # Prometheus text exposition format; every worker process keeps and serves its own counters
+    return PlainTextResponse(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @root_router.get("/scalar", include_in_schema=False)
 async def scalar_html(request: Request) -> HTMLResponse:
     return get_scalar_api_reference(openapi_url=request.app.openapi_url, title=request.app.title)
@@ -27,3 +46,4 @@ async def scalar_html(request: Request) -> HTMLResponse:
 api_v1_router = APIRouter(prefix="/api/v1", route_class=DishkaRoute)
 
 api_v1_router.include_router(router=captchas_router)
+api_v1_router.include_router(router=admin_router)
@@ -33,20 +33,24 @@ def _get_error_response(exc: Exception) -> dict:
     return res
 
 
-def _application_error_handler(_, error: Union[ApplicationError, Exception]) -> JSONResponse:  # type: ignore
+async def _application_error_handler(_, error: Union[ApplicationError, Exception]) -> JSONResponse:  # type: ignore
     content = _get_error_response(exc=error)
 
-    return JSONResponse(content=content, status_code=400)
+    status_code = getattr(error, "status_code", 400)
+    return JSONResponse(content=content, status_code=status_code)
 
 
-def _http_error_handler(_: Request, exc: Union[HTTPException, Exception]) -> JSONResponse:
+async def _http_error_handler(_: Request, exc: Union[HTTPException, Exception]) -> JSONResponse:
     content = _get_error_response(exc=exc)
 
     status_code = getattr(exc, "status_code", 500)
     return JSONResponse(content=content, status_code=status_code)
 
 
-def _http422_error_handler(_: Request, exc: Union[RequestValidationError, ValidationError, Exception]) -> JSONResponse:
+async def _http422_error_handler(
+    _: Request,
+    exc: Union[RequestValidationError, ValidationError, Exception],
+) -> JSONResponse:
     errors = ["Validation Error"]
     if hasattr(exc, "errors"):
         errors = exc.errors()
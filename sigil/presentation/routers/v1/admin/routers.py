@@ -0,0 +1,22 @@
+from dishka.integrations.fastapi import DishkaRoute
+from fastapi import APIRouter
+
+from sigil.presentation.routers.v1.admin.views import activate_model, list_models
+
+admin_router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    route_class=DishkaRoute,
+)
+
+admin_router.add_api_route(
+    path="/models",
+    methods=["GET"],
+    endpoint=list_models,
+)
+
+admin_router.add_api_route(
+    path="/models/activate",
+    methods=["POST"],
+    endpoint=activate_model,
+)
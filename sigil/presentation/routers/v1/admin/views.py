@@ -0,0 +1,52 @@
+import hmac
+from typing import Annotated, Optional
+
+from dishka.integrations.fastapi import FromDishka
+from fastapi import Header
+
+from sigil.core.config.settings import Settings
+from sigil.infrastructure.exceptions import ForbiddenError, UnauthorizedError
+from sigil.presentation.base_response import GetResponseBase, PostResponseBase, create_response
+from sigil.schemas.requests import ModelActivateRequestSchema
+from sigil.schemas.responses import ModelRegistryResponseSchema, ModelSwapResponseSchema
+from sigil.services.registry import ModelManager
+
+
+async def list_models(
+    models: Annotated[ModelManager, FromDishka()],
+    settings: Annotated[Settings, FromDishka()],
+    admin_key: Annotated[Optional[str], Header(alias="X-Admin-Key")] = None,
+) -> GetResponseBase[ModelRegistryResponseSchema]:
+    _authorize(settings=settings, admin_key=admin_key)
+
+    status = await models.status()
+    data = ModelRegistryResponseSchema(active=status.active, loaded=status.loaded, versions=status.versions)
+    return create_response(data=data)
+
+
+async def activate_model(
+    models: Annotated[ModelManager, FromDishka()],
+    settings: Annotated[Settings, FromDishka()],
+    request: ModelActivateRequestSchema,
+    admin_key: Annotated[Optional[str], Header(alias="X-Admin-Key")] = None,
+) -> PostResponseBase[ModelSwapResponseSchema]:
+    _authorize(settings=settings, admin_key=admin_key)
+
+    result = await models.activate(request.version)
+    data = ModelSwapResponseSchema(
+        active=result.active,
+        previous=result.previous,
+        load_seconds=result.load_seconds,
+        warmup_seconds=result.warmup_seconds,
+    )
+    return create_response(data=data)
+
+
+def _authorize(settings: Settings, admin_key: Optional[str]) -> None:
+    # No key configured means no admin API, rather than one guarded by a guessable default
+    expected = settings.admin_settings.key
+    if expected is None or not expected.get_secret_value():
+        raise ForbiddenError(detail="The admin API is disabled, set SIGIL_ADMIN_KEY", error_code="admin_disabled")
+
+    if admin_key is None or not hmac.compare_digest(admin_key.encode(), expected.get_secret_value().encode()):
+        raise UnauthorizedError(detail="Missing or invalid X-Admin-Key header")
@@ -1,7 +1,14 @@
-from dishka.integrations.fastapi import DishkaRoute
+from dishka.integrations.fastapi import DishkaRoute, inject
 from fastapi import APIRouter
 
-from sigil.presentation.routers.v1.captchas.views import solve_slide_captcha
+from sigil.presentation.base_response import PostResponseBase
+from sigil.presentation.routers.v1.captchas.views import (
+    solve_slide_captcha,
+    solve_slide_captcha_batch,
+    solve_slide_captcha_stream,
+    solve_slide_captcha_upload,
+)
+from sigil.schemas.responses import SlideResponseSchema
 
 captchas_router = APIRouter(
     prefix="/captchas",
@@ -13,4 +20,45 @@ captchas_router.add_api_route(
     path="/slide",
     methods=["POST"],
     endpoint=solve_slide_captcha,
+    # The view serializes the response itself, the model only documents it
+    response_model=PostResponseBase[SlideResponseSchema],
+)
+
+captchas_router.add_api_route(
+    path="/slide/upload",
+    methods=["POST"],
+    endpoint=solve_slide_captcha_upload,
+    response_model=PostResponseBase[SlideResponseSchema],
+    # The body is read by the view itself, so its accepted shapes are documented here
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["puzzle_image"],
+                        "properties": {
+                            "puzzle_image": {"type": "string", "format": "binary"},
+                            "piece_image": {"type": "string", "format": "binary"},
+                            "shrink_size": {"type": "number"},
+                        },
+                    }
+                },
+                "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+
+captchas_router.add_api_route(
+    path="/slide/batch",
+    methods=["POST"],
+    endpoint=solve_slide_captcha_batch,
+)
+
+# WebSocket routes don't go through ``route_class``, so the endpoint is wrapped for injection here
+captchas_router.add_api_websocket_route(
+    path="/slide/stream",
+    endpoint=inject(solve_slide_captcha_stream),
 )
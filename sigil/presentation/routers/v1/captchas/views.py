@@ -1,80 +1,283 @@
-import base64
-import os
-import tempfile
-import traceback
-from typing import Annotated
+import asyncio
+import contextlib
+import json
+import time
+from typing import Annotated, Any, AsyncIterator, Awaitable, Dict, List, Optional, Set, Tuple, cast
 
-import aiohttp
 from dishka.integrations.fastapi import FromDishka
-from fastapi import HTTPException
+from fastapi import Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from loguru import logger
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile
 
-from sigil.presentation.base_response import PostResponseBase, create_response
-from sigil.schemas.requests import SlideRequestSchema
+from sigil.core import metrics
+from sigil.core.config.settings import Settings
+from sigil.core.timing import stage_timer
+from sigil.infrastructure.exceptions import ApplicationError
+from sigil.presentation.base_response import PostResponseBase
+from sigil.schemas.requests import SlideBatchRequestSchema, SlideRequestSchema
 from sigil.schemas.responses import SlideResponseSchema
-from sigil.services.recognizer import RecognizerService
+from sigil.services.admission import Priority, deadline_after
+from sigil.services.solver import SlideSolution, SolverService
+
+DeadlineHeader = Annotated[
+    Optional[float],
+    Header(gt=0, description="Milliseconds the client waits for the answer, unless the body sets deadline_ms"),
+]
+PriorityHeader = Annotated[Optional[Priority], Header(description="Scheduling lane, unless the body sets priority")]
 
 
 async def solve_slide_captcha(
-    recognizer: Annotated[RecognizerService, FromDishka()],
+    solver: Annotated[SolverService, FromDishka()],
     request: SlideRequestSchema,
-) -> PostResponseBase[SlideResponseSchema]:
-    request.validate_input()
+    x_deadline_ms: DeadlineHeader = None,
+    x_priority: PriorityHeader = None,
+) -> Response:
+    received_at = time.monotonic()
+    request = _with_admission(request, deadline_ms=x_deadline_ms, priority=x_priority)
+    return await _respond(solver.solve(request, received_at=received_at))
+
+
+async def solve_slide_captcha_upload(
+    solver: Annotated[SolverService, FromDishka()],
+    request: Request,
+    shrink_size: Annotated[Optional[float], Query(description="Shrink size of the puzzle image, 0 for none")] = 340.0,
+    x_deadline_ms: DeadlineHeader = None,
+    x_priority: PriorityHeader = None,
+) -> Response:
+    """Solve from raw image bytes: a multipart form with ``puzzle_image`` and an optional ``piece_image``
+    file, or the puzzle alone as the request body."""
+    deadline = deadline_after(x_deadline_ms)
+    content_type = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+
+    piece_data: Optional[bytes] = None
+    if content_type == "multipart/form-data":
+        form = await request.form()
+        puzzle_data = await _read_upload(form.get("puzzle_image"))
+        piece_data = await _read_upload(form.get("piece_image")) or None
+        if isinstance(form.get("shrink_size"), str):
+            shrink_size = _parse_shrink_size(cast(str, form["shrink_size"]))
+    elif content_type == "application/octet-stream" or content_type.startswith("image/"):
+        puzzle_data = await request.body()
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Expected multipart/form-data, application/octet-stream or an image/* body",
+        )
+
+    if not puzzle_data:
+        raise HTTPException(status_code=400, detail="puzzle_image must be provided")
+
+    return await _respond(
+        solver.solve_bytes(
+            puzzle_data,
+            piece_data,
+            shrink_size=shrink_size or None,
+            deadline=deadline,
+            priority=x_priority or "normal",
+        )
+    )
+
+
+async def solve_slide_captcha_stream(
+    solver: Annotated[SolverService, FromDishka()],
+    settings: Annotated[Settings, FromDishka()],
+    websocket: WebSocket,
+) -> None:
+    """Solve slide captchas pipelined over one WebSocket connection.
+
+    Every message is a slide request with a client chosen ``id``, answered with a line carrying the same
+    ``id`` as soon as its solve finishes, in any order. Once ``stream_max_in_flight`` solves are running
+    the connection stops reading, so a client sending faster than it is served is held back by TCP.
+    """
+    await websocket.accept()
+    slots = asyncio.Semaphore(max(1, settings.inference_settings.stream_max_in_flight))
+    sending = asyncio.Lock()
+    tasks: Set[asyncio.Task] = set()
 
-    # Get image data either from base64 or URL
-    if request.puzzle_image_b64:  # Process base64 image
-        base64_data = request.puzzle_image_b64
-        if "," in base64_data:
-            base64_data = base64_data.split(",", 1)[1]
+    async def answer(line: Dict[str, Any]) -> None:
+        # The client may be gone by the time a solve finishes, the read loop notices and cleans up
+        with contextlib.suppress(WebSocketDisconnect, RuntimeError, OSError):
+            async with sending:
+                await websocket.send_text(json.dumps(line))
 
-        # Decode base64 string to image data
-        image_data = base64.b64decode(base64_data)
+    async def solve_item(message_id: Any, payload: Dict[str, Any], received_at: float) -> None:
+        try:
+            try:
+                request = SlideRequestSchema.model_validate(payload)
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=_validation_detail(e))
+
+            outcome: Any = await _observed(solver.solve(request, received_at=received_at))
+        except Exception as e:
+            outcome = e
 
-    else:  # Process image URL
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url=request.puzzle_image_url) as response:
-                    if not response.ok:
-                        error_text = await response.text()
-                        msg = f"Error downloading image: HTTP {response.status} - {error_text}"
-                        logger.error(msg)
-                        raise HTTPException(status_code=400, detail=msg)
-
-                    if not response.content_type.startswith("image/"):
-                        msg = f"Error downloading image: HTTP {response.status} - {response.content_type}"
-                        logger.error(msg)
-                        raise HTTPException(status_code=400, detail=msg)
-
-                    image_data = await response.read()
-
-        except aiohttp.ClientError as e:
-            msg = f"Error downloading image: {str(e)}"
-            logger.error(msg)
-            raise HTTPException(status_code=400, detail=msg)
-
-    # Create a temporary file to store the image
-    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_file:
-        temp_file_path = temp_file.name
-        temp_file.write(image_data)
+            await answer({"id": message_id, **_outcome_line(outcome)})
+        finally:
+            slots.release()
 
     try:
-        box, confidence = recognizer.identify_gap(source=temp_file_path, show_result=True, verbose=True)
+        while True:
+            await slots.acquire()
+            message = await websocket.receive()
+            received_at = time.monotonic()
+            if message["type"] == "websocket.disconnect":
+                break
 
-        result = SlideResponseSchema(
-            status="successful" if confidence > 0.5 else "failed",
-            x=box[0] - 8,
-        )
+            try:
+                payload = json.loads(message.get("text") or message.get("bytes") or b"")
+            except ValueError:
+                payload = None
+            if not isinstance(payload, dict):
+                slots.release()
+                error = HTTPException(status_code=400, detail="Messages must be JSON objects")
+                await answer({"id": None, **_outcome_line(error)})
+                continue
+
+            task = asyncio.create_task(solve_item(payload.pop("id", None), payload, received_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    except WebSocketDisconnect:
+        pass
+
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _respond(solving: Awaitable[SlideSolution]) -> Response:
+    solution = await _observed(solving)
 
-        return create_response(data=result)
+    # Serialize here rather than in FastAPI so the cost shows up as its own stage in benchmarks
+    with stage_timer.stage("serialize"):
+        response = PostResponseBase[SlideResponseSchema](data=solution.result, meta=solution.meta)
+        return Response(content=response.model_dump_json(), media_type="application/json")
+
+
+async def _observed(solving: Awaitable[SlideSolution]) -> SlideSolution:
+    """Await a single solve, recording request metrics and turning unexpected errors into a 500."""
+    started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    result = "error"
+    try:
+        solution = await solving
+        result = solution.result.status
+        return solution
+
+    except (ApplicationError, HTTPException):
+        raise
 
     except Exception as e:
-        logger.error(traceback.format_exc())
-        logger.error(f"Error identifying gap: {e}")
+        # One record with the traceback attached, rendered by the log sink rather than here
+        logger.opt(exception=e).error(f"Error identifying gap: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
     finally:
-        try:
-            os.unlink(temp_file_path)
-            logger.info(f"Temporary file removed: {temp_file_path}")
-        except Exception as e:
-            logger.error(f"Error removing temporary file: {e}")
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        metrics.SOLVES.inc(result=result)
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+
+async def _read_upload(field: Any) -> bytes:
+    # Plain text form fields are rejected rather than decoded as image bytes
+    if field is None:
+        return b""
+    if not isinstance(field, UploadFile):
+        raise HTTPException(status_code=400, detail="Image fields must be sent as files")
+
+    return await field.read()
+
+
+def _with_admission(
+    request: SlideRequestSchema,
+    deadline_ms: Optional[float],
+    priority: Optional[Priority],
+) -> SlideRequestSchema:
+    """Fill the deadline and priority the body left unset from the request headers."""
+    update: Dict[str, Any] = {}
+    if request.deadline_ms is None and deadline_ms is not None:
+        update["deadline_ms"] = deadline_ms
+    if request.priority is None and priority is not None:
+        update["priority"] = priority
+
+    return request.model_copy(update=update) if update else request
+
+
+def _parse_shrink_size(value: str) -> Optional[float]:
+    try:
+        return float(value) if value.strip() else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid shrink_size: {value!r}")
+
+
+async def solve_slide_captcha_batch(
+    solver: Annotated[SolverService, FromDishka()],
+    request: SlideBatchRequestSchema,
+    x_deadline_ms: DeadlineHeader = None,
+    x_priority: PriorityHeader = None,
+) -> StreamingResponse:
+    received_at = time.monotonic()
+    items = [_with_admission(item, deadline_ms=x_deadline_ms, priority=x_priority) for item in request.items]
+    return StreamingResponse(
+        content=_stream_solutions(solver=solver, items=items, received_at=received_at),
+        media_type="application/x-ndjson",
+    )
+
+
+async def _stream_solutions(
+    solver: SolverService,
+    items: List[SlideRequestSchema],
+    received_at: float,
+) -> AsyncIterator[bytes]:
+    """Solve every item concurrently and yield one NDJSON line per item as soon as it finishes.
+
+    Item deadlines count from the arrival of the batch, not from when an item gets its turn.
+    """
+    # Keep at most one scheduler-full of items in flight so a large batch doesn't trip the queue limit
+    semaphore = asyncio.Semaphore(max(1, solver.capacity))
+
+    async def solve_item(index: int, item: SlideRequestSchema) -> Tuple[int, Any]:
+        async with semaphore:
+            try:
+                return index, await solver.solve(item, received_at=received_at)
+            except Exception as e:
+                return index, e
+
+    tasks = [asyncio.create_task(solve_item(index, item)) for index, item in enumerate(items)]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            index, outcome = await completed
+            yield (json.dumps(_batch_line(index=index, outcome=outcome)) + "\n").encode()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _batch_line(index: int, outcome: Any) -> Dict[str, Any]:
+    if not isinstance(outcome, (SlideSolution, ApplicationError, HTTPException)):
+        logger.error(f"Error identifying gap for batch item {index}: {outcome}")
+
+    return {"index": index, **_outcome_line(outcome)}
+
+
+def _outcome_line(outcome: Any) -> Dict[str, Any]:
+    """A solution or the error that replaced it, in the shape of the NDJSON and WebSocket lines."""
+    if isinstance(outcome, SlideSolution):
+        return {"data": outcome.result.model_dump(), "meta": outcome.meta}
+
+    line: Dict[str, Any] = {
+        "errors": [getattr(outcome, "detail", str(outcome))],
+        "success": False,
+        "status_code": getattr(outcome, "status_code", 500),
+    }
+    if hasattr(outcome, "error_code"):
+        line["error_code"] = outcome.error_code
+
+    return line
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, item['loc'])) or 'body'}: {item['msg']}" for item in error.errors())
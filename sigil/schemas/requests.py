@@ -1,8 +1,10 @@
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import HTTPException
 from pydantic import BaseModel, Field
 
+from sigil.services.admission import Priority
+
 
 class SlideRequestSchema(BaseModel):
     puzzle_image_b64: Optional[str] = Field(default=None, description="Base64 encoded image data")
@@ -13,6 +15,21 @@ class SlideRequestSchema(BaseModel):
 
     shrink_size: Optional[float] = Field(default=340.0, description="Shrink size of the puzzle image")
 
+    deadline_ms: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Milliseconds the client waits for the answer, counted from arrival; later answers are dropped",
+    )
+    priority: Optional[Priority] = Field(default=None, description="Scheduling lane: high, normal (default) or bulk")
+
     def validate_input(self) -> None:
         if not self.puzzle_image_b64 and not self.puzzle_image_url:
             raise HTTPException(status_code=400, detail="Either puzzle_image_b64 or puzzle_image_url must be provided")
+
+
+class SlideBatchRequestSchema(BaseModel):
+    items: List[SlideRequestSchema] = Field(min_length=1, max_length=256, description="Slide captchas to solve")
+
+
+class ModelActivateRequestSchema(BaseModel):
+    version: str = Field(description="Model version directory to load, warm up and swap in")
@@ -1,6 +1,21 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
 class SlideResponseSchema(BaseModel):
     status: str
     x: float
+
+
+class ModelRegistryResponseSchema(BaseModel):
+    active: Optional[str]
+    loaded: List[str]
+    versions: List[str]
+
+
+class ModelSwapResponseSchema(BaseModel):
+    active: str
+    previous: Optional[str]
+    load_seconds: float
+    warmup_seconds: float
@@ -0,0 +1,34 @@
+import time
+from typing import Dict, Literal, Optional
+
+from sigil.core import metrics
+from sigil.infrastructure.exceptions import DeadlineExceededError
+
+Priority = Literal["high", "normal", "bulk"]
+
+# Lower lanes are scheduled first, bulk traffic only gets inference time nobody else is waiting for
+PRIORITY_LANES: Dict[str, int] = {"high": 0, "normal": 1, "bulk": 2}
+
+
+def deadline_after(budget_ms: Optional[float], start: Optional[float] = None) -> Optional[float]:
+    """``time.monotonic()`` value ``budget_ms`` after ``start`` (now by default), ``None`` without a budget."""
+    if budget_ms is None:
+        return None
+
+    return (start if start is not None else time.monotonic()) + budget_ms / 1000
+
+
+def time_left(deadline: Optional[float]) -> Optional[float]:
+    """Seconds until ``deadline``, negative once it passed, ``None`` without one."""
+    return deadline - time.monotonic() if deadline is not None else None
+
+
+def check_deadline(deadline: Optional[float], stage: str) -> None:
+    """Drop the request before ``stage`` when nobody is waiting for its answer anymore."""
+    if deadline is not None and time.monotonic() >= deadline:
+        raise deadline_exceeded(stage)
+
+
+def deadline_exceeded(stage: str) -> DeadlineExceededError:
+    metrics.DEADLINE_EXCEEDED.inc(stage=stage)
+    return DeadlineExceededError(detail=f"Deadline passed before {stage}")
@@ -0,0 +1,320 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+CANONICAL_SIZE = (480, 300)  # (width, height) every background is stored at
+DIFF_THRESHOLD = 28  # grey-level difference counted as "changed" (above JPEG noise)
+MAX_RESIDUAL = 10.0  # mean difference outside the gap for a background to count as the same image
+MIN_GAP_FRACTION = 0.03  # smallest gap side relative to the canonical image side
+GROWTH = 64  # entries added to the memory-mapped stores when they fill up
+
+META_FILE = "meta.json"
+PIXELS_FILE = "pixels.u8"
+KNOWN_FILE = "known.u8"
+LOCK_FILE = "index.lock"
+
+
+@dataclass
+class BackgroundMatch:
+    index: int
+    box: List[float]
+    confidence: float
+    distance: int
+
+
+@dataclass
+class _Observation:
+    gray: np.ndarray
+    clean: np.ndarray
+    image_hash: int
+    source_size: Tuple[int, int]
+
+
+class BackgroundIndex:
+    """Pool of clean captcha backgrounds learnt from solved puzzles.
+
+    Backgrounds are keyed by a 64-bit difference hash and stored as canonical-size greyscale images in
+    memory-mapped files, with a second map marking which pixels are known to be clean. Every solved
+    puzzle fills in the pixels outside its gap, so after a few puzzles of the same background its gap
+    can be found by differencing against the stored image instead of running the detector.
+
+    Several processes can share a directory: learnt puzzles are held in memory and merged ``flush_every``
+    at a time under a file lock, on top of whatever the other processes wrote meanwhile. Backgrounds
+    learnt elsewhere show up at the next flush, at least every ``flush_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_hash_distance: int = 10,
+        flush_every: int = 1,
+        flush_interval: float = 10.0,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_hash_distance = max_hash_distance
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._pending: List[_Observation] = []
+        self._flushed_at = time.monotonic()
+
+        self._entries: List[Dict[str, Any]] = []
+        self._hashes: np.ndarray = np.empty(0, dtype=np.uint64)
+        self._capacity = 0
+        self._generation = 0  # bumped on every write of the metadata, tells this process it is stale
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.directory / LOCK_FILE, "a")
+        with self._locked():
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, image: np.ndarray) -> Optional[BackgroundMatch]:
+        """Find ``image``'s background and locate the gap in it; ``None`` when no stored background fits."""
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()  # also picks up the backgrounds other processes learnt
+
+        if not len(self._entries):
+            return None
+
+        gray = to_canonical(image)
+        distances = hamming_distances(self._hashes, dhash(gray))
+        for index in np.argsort(distances, kind="stable")[:3]:
+            distance = int(distances[index])
+            if distance > self.max_hash_distance:
+                break
+
+            located = locate_gap(gray, self._pixels[index], self._known[index].astype(bool))
+            if located is None:
+                continue
+
+            box, confidence = located
+            scale_x, scale_y = image.shape[1] / CANONICAL_SIZE[0], image.shape[0] / CANONICAL_SIZE[1]
+            box = [box[0] * scale_x, box[1] * scale_y, box[2] * scale_x, box[3] * scale_y]
+            return BackgroundMatch(index=int(index), box=box, confidence=confidence, distance=distance)
+
+        return None
+
+    def learn(self, image: np.ndarray, box: Optional[List[float]] = None, margin: int = 6) -> Optional[int]:
+        """Merge ``image`` into the pool, treating everything outside the gap ``box`` as clean background.
+
+        Returns the index of the background entry that was created or updated, or ``None`` while the
+        puzzle waits for the next flush.
+        """
+        gray = to_canonical(image)
+        clean = np.ones(gray.shape, dtype=bool)
+        if box:
+            scale_x, scale_y = CANONICAL_SIZE[0] / image.shape[1], CANONICAL_SIZE[1] / image.shape[0]
+            x1, y1 = max(0, int(box[0] * scale_x) - margin), max(0, int(box[1] * scale_y) - margin)
+            x2, y2 = int(np.ceil(box[2] * scale_x)) + margin, int(np.ceil(box[3] * scale_y)) + margin
+            clean[y1:y2, x1:x2] = False
+
+        observation = _Observation(gray, clean, dhash(gray), source_size=(image.shape[1], image.shape[0]))
+        with self._lock:
+            self._pending.append(observation)
+            due = len(self._pending) >= self.flush_every or time.monotonic() - self._flushed_at >= self.flush_interval
+
+        if not due:
+            return None
+
+        merged = self.flush()
+        return merged[-1] if merged else None
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return [
+            {**entry, "index": index, "known_fraction": float(self._known[index].mean())}
+            for index, entry in enumerate(self._entries)
+        ]
+
+    def flush(self) -> List[int]:
+        """Write the pending puzzles to the index files; returns the entry index each one was merged into."""
+        with self._locked():
+            # Another process may have added entries since, they are merged into rather than overwritten
+            self._refresh()
+            pending, self._pending = self._pending, []
+            self._flushed_at = time.monotonic()
+            if not pending:
+                return []
+
+            merged = [self._merge(observation) for observation in pending]
+            self._pixels.flush()
+            self._known.flush()
+            self._write_meta()
+
+        return merged
+
+    def close(self) -> None:
+        self.flush()
+        self._lock_file.close()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the index against other threads of this process and against other processes."""
+        with self._lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _merge(self, observation: _Observation) -> int:
+        gray, clean, image_hash = observation.gray, observation.clean, observation.image_hash
+        index = self._find_same_background(gray, clean, image_hash)
+        if index is None:
+            return self._append(gray, clean, image_hash, source_size=observation.source_size)
+
+        known = self._known[index].astype(bool)
+        update = clean & ~known
+        self._pixels[index][update] = gray[update]
+        self._known[index][update] = 1
+        self._entries[index]["observations"] += 1
+        return index
+
+    def _find_same_background(self, gray: np.ndarray, clean: np.ndarray, image_hash: int) -> Optional[int]:
+        if not len(self._entries):
+            return None
+
+        distances = hamming_distances(self._hashes, image_hash)
+        for index in np.argsort(distances, kind="stable")[:3]:
+            if distances[index] > self.max_hash_distance:
+                break
+
+            overlap = clean & self._known[index].astype(bool)
+            if not overlap.any():
+                continue
+
+            residual = np.abs(gray[overlap].astype(np.int16) - self._pixels[index][overlap].astype(np.int16))
+            if residual.mean() <= MAX_RESIDUAL:
+                return int(index)
+
+        return None
+
+    def _append(self, gray: np.ndarray, clean: np.ndarray, image_hash: int, source_size: Tuple[int, int]) -> int:
+        index = len(self._entries)
+        if index >= self._capacity:
+            self._open_stores(capacity=self._capacity + GROWTH)
+
+        self._pixels[index] = gray
+        self._known[index] = clean
+        self._entries.append(
+            {
+                "hash": f"{image_hash:016x}",
+                "observations": 1,
+                "source_width": source_size[0],
+                "source_height": source_size[1],
+            }
+        )
+        self._hashes = np.append(self._hashes, np.uint64(image_hash))
+        return index
+
+    def _refresh(self) -> None:
+        """Reload the metadata when another process wrote it since this one last read it."""
+        meta_path = self.directory / META_FILE
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        if meta and (meta["width"], meta["height"]) != CANONICAL_SIZE:
+            msg = f"Background index at {self.directory} uses an incompatible image size"
+            raise ValueError(msg)
+
+        if self._capacity and meta.get("generation", 0) == self._generation:
+            return
+
+        self._entries = meta.get("entries", [])
+        self._hashes = np.array([int(entry["hash"], 16) for entry in self._entries], dtype=np.uint64)
+        self._generation = meta.get("generation", 0)
+        self._open_stores(capacity=max(meta.get("capacity", 0), self._capacity, GROWTH))
+
+    def _write_meta(self) -> None:
+        self._generation += 1
+        meta: Dict[str, Any] = {
+            "width": CANONICAL_SIZE[0],
+            "height": CANONICAL_SIZE[1],
+            "capacity": self._capacity,
+            "generation": self._generation,
+            "entries": self._entries,
+        }
+        temp_path = self.directory / f"{META_FILE}.tmp"
+        temp_path.write_text(json.dumps(meta))
+        os.replace(temp_path, self.directory / META_FILE)
+
+    def _open_stores(self, capacity: int) -> None:
+        width, height = CANONICAL_SIZE
+        for name in (PIXELS_FILE, KNOWN_FILE):
+            path = self.directory / name
+            with open(path, "ab") as file:  # create the file if needed, then grow it in place
+                file.truncate(max(path.stat().st_size, capacity * width * height))
+
+        shape = (capacity, height, width)
+        self._pixels = np.memmap(self.directory / PIXELS_FILE, dtype=np.uint8, mode="r+", shape=shape)
+        self._known = np.memmap(self.directory / KNOWN_FILE, dtype=np.uint8, mode="r+", shape=shape)
+        self._capacity = capacity
+
+
+def to_canonical(image: np.ndarray) -> np.ndarray:
+    return np.asarray(Image.fromarray(image).convert("L").resize(CANONICAL_SIZE, Image.Resampling.BILINEAR))
+
+
+def dhash(gray: np.ndarray) -> int:
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 thumbnail."""
+    thumbnail = np.asarray(Image.fromarray(gray).resize((9, 8), Image.Resampling.BOX), dtype=np.int16)
+    bits = np.packbits(thumbnail[:, 1:] > thumbnail[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def hamming_distances(hashes: np.ndarray, value: int) -> np.ndarray:
+    xor = (hashes ^ np.uint64(value)).view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(xor, axis=1).sum(axis=1)
+
+
+def locate_gap(gray: np.ndarray, background: np.ndarray, known: np.ndarray) -> Optional[Tuple[List[float], float]]:
+    """Find the gap as the dominant block of pixels that differ from the clean background.
+
+    Returns the canonical-space box and a confidence in ``[0, 1]``, or ``None`` when the images
+    are not the same background or no gap-shaped difference is found.
+    """
+    diff = np.abs(gray.astype(np.int16) - background.astype(np.int16))
+    changed = (diff > DIFF_THRESHOLD) & known
+    height, width = gray.shape
+
+    columns = _longest_run(changed.sum(axis=0) >= max(2, MIN_GAP_FRACTION * height))
+    if columns is None or columns[1] - columns[0] < MIN_GAP_FRACTION * width:
+        return None
+
+    x1, x2 = columns
+    rows = _longest_run(changed[:, x1:x2].sum(axis=1) >= max(2, MIN_GAP_FRACTION * (x2 - x1)))
+    if rows is None or rows[1] - rows[0] < MIN_GAP_FRACTION * height:
+        return None
+
+    y1, y2 = rows
+    outside = known.copy()
+    outside[y1:y2, x1:x2] = False
+    if not outside.any() or diff[outside].mean() > MAX_RESIDUAL:
+        return None
+
+    inside = changed[y1:y2, x1:x2].sum()
+    purity = inside / max(1, changed.sum())
+    coverage = known[y1:y2, x1:x2].mean()
+    return [float(x1), float(y1), float(x2), float(y2)], float(purity * coverage)
+
+
+def _longest_run(mask: np.ndarray) -> Optional[Tuple[int, int]]:
+    """``(start, end)`` of the longest run of ``True`` values, end exclusive."""
+    if not mask.any():
+        return None
+
+    padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    starts, ends = edges[::2], edges[1::2]
+    longest = int(np.argmax(ends - starts))
+    return int(starts[longest]), int(ends[longest])
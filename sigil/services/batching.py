@@ -0,0 +1,221 @@
+import asyncio
+import contextlib
+import itertools
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Protocol, Set, Tuple
+
+from loguru import logger
+
+from sigil.core import metrics
+from sigil.infrastructure.exceptions import ServiceUnavailableError
+from sigil.services.admission import PRIORITY_LANES, Priority, check_deadline, deadline_exceeded
+from sigil.services.detectors.base import ImageSource
+from sigil.services.executor import InferenceExecutor
+from sigil.services.registry import ModelRegistry
+
+
+@dataclass
+class GapPrediction:
+    box: List[float]
+    confidence: float
+    batch_size: int
+    stage: str = ""
+    version: str = ""
+
+
+class GapScheduler(Protocol):
+    """Where the solver sends images for gap detection: the in-process ``BatchScheduler`` or the inference servers."""
+
+    @property
+    def capacity(self) -> int: ...
+
+    @property
+    def model_version(self) -> Optional[str]:
+        """Model version answering new requests, so results of a swapped-out version aren't reused."""
+        ...
+
+    async def submit(
+        self,
+        source: ImageSource,
+        priority: Priority = "normal",
+        deadline: Optional[float] = None,
+    ) -> GapPrediction: ...
+
+
+@dataclass
+class _PendingItem:
+    source: ImageSource
+    future: "asyncio.Future[GapPrediction]"
+    deadline: Optional[float] = None
+
+
+class BatchScheduler:
+    """Groups concurrent gap requests into batched inference calls.
+
+    A batch is dispatched once ``max_batch_size`` requests are waiting or ``max_wait_ms`` has passed
+    since its first request. At most one batch per executor worker is in flight; while all workers are
+    busy new requests keep accumulating, so batches grow with load instead of queueing up one by one.
+
+    Batches are filled by priority lane, then in arrival order. Requests whose deadline passes while
+    they wait are answered with a 504 and never reach the model.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        executor: InferenceExecutor,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 2.0,
+    ) -> None:
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+
+        self._registry = registry
+        self._executor = executor
+        self._max_pending = executor.workers * self.max_batch_size + executor.max_queue_size
+
+        # Ordered by lane, then by arrival
+        self._queue: "asyncio.PriorityQueue[Tuple[int, int, _PendingItem]]" = asyncio.PriorityQueue()
+        self._arrivals = itertools.count()
+        self._slots = asyncio.Semaphore(executor.workers)
+        self._collector: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._pending = 0
+
+        self._occupancy: Counter = Counter()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def capacity(self) -> int:
+        return self._executor.workers * self.max_batch_size
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._registry.active_version
+
+    def stats(self) -> Dict:
+        batches = sum(self._occupancy.values())
+        requests = sum(size * count for size, count in self._occupancy.items())
+        return {
+            "batches": batches,
+            "requests": requests,
+            "mean_batch_size": requests / batches if batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "occupancy": dict(sorted(self._occupancy.items())),
+        }
+
+    async def submit(
+        self,
+        source: ImageSource,
+        priority: Priority = "normal",
+        deadline: Optional[float] = None,
+    ) -> GapPrediction:
+        check_deadline(deadline, stage="inference")
+        if self._pending >= self._max_pending:
+            raise ServiceUnavailableError(detail="Inference queue is full", error_code="inference_queue_full")
+
+        if self._collector is None:
+            self._collector = asyncio.create_task(self._collect())
+
+        future: "asyncio.Future[GapPrediction]" = asyncio.get_running_loop().create_future()
+        self._pending += 1
+        metrics.INFERENCE_PENDING.set(self._pending)
+        try:
+            item = _PendingItem(source=source, future=future, deadline=deadline)
+            self._queue.put_nowait((PRIORITY_LANES[priority], next(self._arrivals), item))
+            metrics.INFERENCE_QUEUED.set(self._queue.qsize())
+            if deadline is None:
+                return await future
+
+            # Cancels the future on timeout, so the collector skips the request
+            return await asyncio.wait_for(future, timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise deadline_exceeded(stage="inference")
+        finally:
+            self._pending -= 1
+            metrics.INFERENCE_PENDING.set(self._pending)
+
+    async def close(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._collector
+
+        while not self._queue.empty():
+            _, _, item = self._queue.get_nowait()
+            if not item.future.done():
+                item.future.set_exception(ServiceUnavailableError(detail="Inference scheduler is shutting down"))
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free worker first so requests keep piling into the next batch meanwhile
+            await self._slots.acquire()
+            batch = [(await self._queue.get())[2]]
+
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait()[2])
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append((await asyncio.wait_for(self._queue.get(), timeout=timeout))[2])
+                except asyncio.TimeoutError:
+                    break
+
+            metrics.INFERENCE_QUEUED.set(self._queue.qsize())
+
+            # Skip requests whose caller already went away or stopped waiting
+            now = time.monotonic()
+            for item in batch:
+                if item.deadline is not None and now >= item.deadline and not item.future.done():
+                    item.future.set_exception(deadline_exceeded(stage="inference"))
+            batch = [item for item in batch if not item.future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._on_batch_done)
+
+    def _on_batch_done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        self._slots.release()
+
+    async def _execute(self, batch: List[_PendingItem]) -> None:
+        started = time.perf_counter()
+        try:
+            with self._registry.acquire() as model:
+                results = await self._executor.run(model.recognizer.detect_gaps, [item.source for item in batch])
+        except Exception as e:
+            logger.error(f"Error running inference batch of {len(batch)}: {e}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        self._occupancy[len(batch)] += 1
+        metrics.INFERENCE_SECONDS.observe(time.perf_counter() - started)
+        metrics.INFERENCE_BATCH_SIZE.observe(len(batch))
+        for item, detection in zip(batch, results, strict=True):
+            if not item.future.done():
+                item.future.set_result(
+                    GapPrediction(
+                        box=detection.box,
+                        confidence=detection.confidence,
+                        batch_size=len(batch),
+                        stage=detection.stage,
+                        version=model.version,
+                    )
+                )
@@ -0,0 +1,217 @@
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set
+
+from sigil.core.config.settings import RecognizerSettings
+from sigil.services.images import IMAGE_SUFFIXES, DecodedImage, ImageDecodeError, decode, decode_target
+from sigil.services.recognizer import RecognizerService
+from sigil.services.registry import ModelRegistry
+from sigil.services.solver import DEFAULT_PIECE_OFFSET
+
+# Set in every pool worker by ``_init_worker``
+_recognizer: Optional[RecognizerService] = None
+_version = ""
+_decode_target: Optional[int] = None
+
+
+@dataclass
+class BulkItem:
+    id: str
+    path: Path
+    shrink_size: Optional[float] = None
+
+
+@dataclass
+class BulkSummary:
+    solved: int
+    failed: int
+    skipped: int
+    seconds: float
+
+
+def collect_items(source: str, shrink_size: Optional[float] = None) -> List[BulkItem]:
+    """Images to solve from a directory, a glob pattern or a JSONL manifest.
+
+    Manifest lines are ``{"path": ..., "id": ..., "shrink_size": ...}`` with only ``path`` required;
+    relative paths are resolved against the manifest's directory. Items are identified by their path
+    unless the manifest gives an id.
+    """
+    path = Path(source)
+    if path.is_dir():
+        paths = sorted(child for child in path.rglob("*") if child.suffix.lower() in IMAGE_SUFFIXES)
+    elif path.is_file() and path.suffix == ".jsonl":
+        return list(_read_manifest(path, shrink_size=shrink_size))
+    else:
+        paths = sorted(Path(match) for match in glob.glob(source, recursive=True))
+        paths = [match for match in paths if match.is_file()]
+
+    return [BulkItem(id=str(item), path=item, shrink_size=shrink_size) for item in paths]
+
+
+def completed_ids(output: Path) -> Set[str]:
+    """Ids already written to ``output``; a line cut short by an interrupted run doesn't count."""
+    if not output.is_file():
+        return set()
+
+    ids = set()
+    with output.open() as file:
+        for line in file:
+            try:
+                ids.add(json.loads(line)["id"])
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    return ids
+
+
+def solve_bulk(
+    items: Sequence[BulkItem],
+    output: Path,
+    settings: Optional[RecognizerSettings] = None,
+    workers: int = 0,
+    batch_size: int = 8,
+    version: Optional[str] = None,
+    on_progress: Optional[Callable[[int, int, float], None]] = None,
+) -> BulkSummary:
+    """Solve ``items`` and append one JSON line per item to ``output``, skipping ids already there.
+
+    Work is spread over ``workers`` processes (default: one per core), each with its own ONNX Runtime
+    session and an even share of the cores for intra-op threads, and fed ``batch_size`` images at a
+    time. ``on_progress`` gets the number of items done, the number to do and the elapsed seconds.
+    """
+    settings = settings if settings else RecognizerSettings()
+    version = ModelRegistry(settings=settings).resolve(version)
+
+    _drop_partial_line(output)
+    done_ids = completed_ids(output)
+    pending = [item for item in items if item.id not in done_ids]
+    skipped = len(items) - len(pending)
+    batches = [pending[start : start + batch_size] for start in range(0, len(pending), max(1, batch_size))]
+
+    workers = min(workers or os.cpu_count() or 1, max(1, len(batches)))
+    threads = settings.intra_op_num_threads or max(1, (os.cpu_count() or 1) // workers)
+    settings = settings.model_copy(update={"intra_op_num_threads": threads})
+
+    solved = failed = 0
+    started = time.perf_counter()
+    with output.open("a") as file:
+        for records in _run(batches, settings=settings, version=version, workers=workers):
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+                failed += "error" in record
+                solved += "error" not in record
+
+            # Flushed per batch so an interrupted run resumes close to where it stopped
+            file.flush()
+            if on_progress is not None:
+                on_progress(solved + failed, len(pending), time.perf_counter() - started)
+
+    return BulkSummary(solved=solved, failed=failed, skipped=skipped, seconds=time.perf_counter() - started)
+
+
+def _run(
+    batches: List[List[BulkItem]],
+    settings: RecognizerSettings,
+    version: str,
+    workers: int,
+) -> Iterator[List[Dict[str, Any]]]:
+    if workers <= 1:
+        _init_worker(settings, version)
+        yield from map(_solve_batch, batches)
+        return
+
+    # Spawned rather than forked so workers never inherit the parent's ONNX Runtime thread pools
+    context = multiprocessing.get_context("spawn")
+    initargs = (settings, version)
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=initargs) as pool:
+        # Keep a couple of batches queued per worker instead of loading the whole archive up front
+        remaining = iter(batches)
+        running: Set[Future] = set()
+        while True:
+            for batch in remaining:
+                running.add(pool.submit(_solve_batch, batch))
+                if len(running) >= workers * 2:
+                    break
+
+            if not running:
+                return
+
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+
+
+def _init_worker(settings: RecognizerSettings, version: str) -> None:
+    global _recognizer, _version, _decode_target
+    _recognizer = ModelRegistry(settings=settings).build(version)
+    _version = version
+    _decode_target = decode_target(settings)
+
+
+def _solve_batch(items: List[BulkItem]) -> List[Dict[str, Any]]:
+    assert _recognizer is not None
+
+    records: Dict[int, Dict[str, Any]] = {}
+    images: Dict[int, DecodedImage] = {}
+    for index, item in enumerate(items):
+        try:
+            images[index] = decode(item.path.read_bytes(), target=_decode_target)
+        except (OSError, ImageDecodeError) as e:
+            records[index] = {"id": item.id, "path": str(item.path), "error": str(e)}
+
+    detections = _recognizer.detect_gaps([image.pixels for image in images.values()]) if images else []
+    for (index, image), detection in zip(images.items(), detections, strict=True):
+        item = items[index]
+        # Same offset and scaling as the API's slide endpoint, in the resolution of the file
+        x = (detection.box[0] - DEFAULT_PIECE_OFFSET) * image.scale if detection.box else 0.0
+        if item.shrink_size:
+            x = x * item.shrink_size / (image.pixels.shape[1] * image.scale)
+
+        records[index] = {
+            "id": item.id,
+            "path": str(item.path),
+            "status": "successful" if detection.confidence > 0.5 else "failed",
+            "x": x,
+            "confidence": detection.confidence,
+            "box": detection.box,
+            "model": detection.stage,
+            "model_version": _version,
+        }
+
+    return [records[index] for index in range(len(items))]
+
+
+def _drop_partial_line(output: Path) -> None:
+    """Cut off a last line left without its newline by an interrupted run, so appending starts on a fresh line."""
+    if not output.is_file():
+        return
+
+    with output.open("rb+") as file:
+        data = file.read()
+        if data and not data.endswith(b"\n"):
+            file.truncate(data.rfind(b"\n") + 1)
+
+
+def _read_manifest(path: Path, shrink_size: Optional[float]) -> Iterator[BulkItem]:
+    for number, line in enumerate(path.read_text().splitlines(), start=1):
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+            image_path = path.parent / record["path"]
+        except (ValueError, KeyError, TypeError):
+            msg = f"{path}:{number}: expected a JSON object with a path"
+            raise ValueError(msg)
+
+        yield BulkItem(
+            id=str(record.get("id", image_path)),
+            path=image_path,
+            shrink_size=record.get("shrink_size", shrink_size),
+        )
@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from sigil.infrastructure.exceptions import DeadlineExceededError
+from sigil.services.admission import deadline_exceeded, time_left
+
+CacheValue = Dict[str, Any]
+
+ENTRY_OVERHEAD = 256  # rough per-entry bookkeeping cost in bytes (dict slots, tuple, floats)
+
+
+@dataclass
+class _Inflight:
+    task: "asyncio.Task[Tuple[CacheValue, str]]"
+    lane: int  # scheduling lane of the caller that started it
+
+
+class SqliteCacheStore:
+    """Cache tier in a SQLite file so results are shared by every worker process on the host."""
+
+    def __init__(self, path: Union[str, Path], purge_every: int = 1000) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+        self._purge_every = purge_every
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[CacheValue]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM results WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: CacheValue, ttl: float) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl),
+            )
+
+            self._writes += 1
+            if self._writes % self._purge_every == 0:
+                self._connection.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class ResultCache:
+    """Content-addressed cache for solve results.
+
+    An in-memory LRU with a TTL and a memory cap sits in front of an optional shared ``SqliteCacheStore``.
+    Concurrent lookups of the same key are coalesced onto a single in-flight computation.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 3600.0,
+        store: Optional[SqliteCacheStore] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._store = store
+        self._entries: "OrderedDict[str, Tuple[float, int, CacheValue]]" = OrderedDict()
+        self._inflight: Dict[str, _Inflight] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(image: np.ndarray, **params: Any) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((image.shape, str(image.dtype), sorted(params.items()))).encode())
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    def stats(self) -> Dict[str, int]:
+        return {"cache_hits": self.hits, "cache_misses": self.misses}
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[CacheValue]],
+        deadline: Optional[float] = None,
+        lane: int = 0,
+    ) -> Tuple[CacheValue, str]:
+        """Return the cached value for ``key`` or compute it, with the lookup outcome (hit, coalesced or miss).
+
+        The computation runs as its own task, so a caller going away doesn't cancel it for the others, and
+        every caller waits for it only until its own ``deadline``. A caller in a more urgent ``lane`` (lower
+        runs sooner) than the running computation starts its own rather than waiting behind it. Callers that
+        joined a computation which was cancelled or ran out of its starter's deadline compute it themselves.
+        """
+        while True:
+            value = self._get_local(key)
+            if value is not None:
+                self.hits += 1
+                return value, "hit"
+
+            joined = self._inflight.get(key)
+            inflight = joined if joined is not None and joined.lane <= lane else self._start(key, compute, lane=lane)
+            started = inflight is not joined
+
+            task = inflight.task
+            await self._wait(task, deadline=deadline)
+            if not started and (task.cancelled() or isinstance(task.exception(), DeadlineExceededError)):
+                continue
+
+            value, status = task.result()
+            if not started:
+                self.hits += 1
+                return value, "coalesced"
+
+            if status == "hit":
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            return value, status
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _start(self, key: str, compute: Callable[[], Awaitable[CacheValue]], lane: int) -> "_Inflight":
+        inflight = _Inflight(task=asyncio.create_task(self._compute(key, compute)), lane=lane)
+        self._inflight[key] = inflight
+
+        def done(task: asyncio.Task) -> None:
+            if self._inflight.get(key) is inflight:
+                del self._inflight[key]
+            if not task.cancelled():
+                task.exception()  # waiters get the error, nobody else needs to retrieve it
+
+        inflight.task.add_done_callback(done)
+        return inflight
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[CacheValue]]) -> Tuple[CacheValue, str]:
+        value = await self._get_shared(key)
+        status = "hit" if value is not None else "miss"
+        if value is None:
+            value = await compute()
+            await self._set_shared(key, value)
+
+        self._set_local(key, value)
+        return value, status
+
+    @staticmethod
+    async def _wait(task: asyncio.Task, deadline: Optional[float]) -> None:
+        """Wait for ``task`` to finish without taking on its outcome, or raise once ``deadline`` passes."""
+        timeout = time_left(deadline)
+        done, _ = await asyncio.wait({task}, timeout=max(0.0, timeout) if timeout is not None else None)
+        if not done:
+            raise deadline_exceeded(stage="inference")
+
+    def _get_local(self, key: str) -> Optional[CacheValue]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: CacheValue) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+
+        size = len(key) + len(json.dumps(value)) + ENTRY_OVERHEAD
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    async def _get_shared(self, key: str) -> Optional[CacheValue]:
+        if self._store is None:
+            return None
+
+        return await asyncio.to_thread(self._store.get, key)
+
+    async def _set_shared(self, key: str, value: CacheValue) -> None:
+        if self._store is None:
+            return
+
+        await asyncio.to_thread(self._store.set, key, value, self.ttl)
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
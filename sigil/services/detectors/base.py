@@ -0,0 +1,35 @@
+from pathlib import Path
+from typing import Any, List, Optional, Protocol, Sequence, Union
+
+import numpy as np
+
+from sigil.services.images import decode_image
+
+ImageSource = Union[str, Path, bytes, np.ndarray]
+
+# Detections are returned per image as an (N, 6) float32 array of
+# ``x1, y1, x2, y2, confidence, class`` rows sorted by descending confidence,
+# in the coordinate space of the original image.
+EMPTY_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+class Detector(Protocol):
+    def predict(
+        self,
+        sources: Sequence[ImageSource],
+        conf: float,
+        classes: Optional[List[int]] = None,
+        **kwargs: Any,
+    ) -> List[np.ndarray]: ...
+
+
+def load_image(source: ImageSource) -> np.ndarray:
+    """Return ``source`` as an RGB ``uint8`` array of shape ``(H, W, 3)``."""
+    if isinstance(source, np.ndarray):
+        return source
+
+    if isinstance(source, bytes):
+        return decode_image(source)
+
+    # Read through ``decode_image`` so HEIC files get the HEIF opener registered
+    return decode_image(Path(source).read_bytes())
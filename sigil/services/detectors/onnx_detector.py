@@ -0,0 +1,237 @@
+import threading
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+
+from sigil.core.timing import stage_timer
+from sigil.services.detectors.base import EMPTY_DETECTIONS, ImageSource, load_image
+
+PAD_VALUE = 114
+MAX_WH = 7680  # class offset used to run class-aware NMS in a single pass
+MAX_NMS_CANDIDATES = 30000
+
+
+class OnnxDetector:
+    """YOLO detector running directly on an ``onnxruntime.InferenceSession``.
+
+    Letterboxing, decoding and NMS are done in NumPy and mirror the Ultralytics
+    defaults (centred letterbox with grey padding, class-aware NMS), so results
+    match the Ultralytics predictor without its per-call overhead.
+    """
+
+    def __init__(
+        self,
+        model_path: Union[str, Path],
+        session_options: Optional[ort.SessionOptions] = None,
+        providers: Optional[List[Any]] = None,
+        imgsz: int = 416,
+    ) -> None:
+        self.model_path = Path(model_path)
+        self.session = ort.InferenceSession(
+            str(self.model_path),
+            sess_options=session_options,
+            providers=providers or ["CPUExecutionProvider"],
+        )
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+
+        batch, _, height, width = model_input.shape
+        self.fixed_batch = batch if isinstance(batch, int) else None
+        self.dynamic_shape = not isinstance(height, int) or not isinstance(width, int)
+        self.input_shape = (imgsz, imgsz) if self.dynamic_shape else (height, width)
+
+        # Model input buffers are reused between calls, one per inference thread
+        self._buffers = threading.local()
+
+    def predict(
+        self,
+        sources: Sequence[ImageSource],
+        conf: float,
+        classes: Optional[List[int]] = None,
+        iou: float = 0.7,
+        max_det: int = 300,
+        imgsz: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[np.ndarray]:
+        """Detect objects on every image in ``sources``.
+
+        ``imgsz`` overrides the input size of models exported with a dynamic shape and is ignored by
+        fixed-shape ones. Extra Ultralytics-only arguments (``verbose``, ``half``...) are accepted and ignored.
+        """
+        images = [load_image(source) for source in sources]
+        if not images:
+            return []
+
+        input_shape = (imgsz, imgsz) if imgsz and self.dynamic_shape else self.input_shape
+
+        chunk_size = self.fixed_batch or len(images)
+        detections: List[np.ndarray] = []
+        for start in range(0, len(images), chunk_size):
+            chunk = images[start : start + chunk_size]
+            with stage_timer.stage("preprocess"):
+                out = self._input_buffer(len(chunk), input_shape=input_shape)
+                batch, letterboxes = self.preprocess(chunk, input_shape=input_shape, out=out)
+
+            with stage_timer.stage("inference"):
+                (outputs,) = self.session.run(None, {self.input_name: batch})
+
+            with stage_timer.stage("postprocess"):
+                for image, prediction, letterbox in zip(chunk, outputs, letterboxes, strict=True):
+                    boxes = self.postprocess(prediction, conf=conf, iou=iou, classes=classes, max_det=max_det)
+                    detections.append(scale_boxes(boxes, letterbox=letterbox, shape=image.shape[:2]))
+
+        return detections
+
+    def preprocess(
+        self,
+        images: Sequence[np.ndarray],
+        input_shape: Optional[Tuple[int, int]] = None,
+        out: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, List[Tuple[float, int, int]]]:
+        """Letterbox ``images`` into a normalized ``(N, 3, H, W)`` model input, written to ``out`` when given."""
+        input_shape = input_shape or self.input_shape
+        height, width = input_shape
+        batch = out if out is not None else np.empty((len(images), 3, height, width), dtype=self.input_dtype)
+        letterboxes = [letterbox_into(image, out=batch[index]) for index, image in enumerate(images)]
+        return batch, letterboxes
+
+    def _input_buffer(self, size: int, input_shape: Tuple[int, int]) -> np.ndarray:
+        buffer = getattr(self._buffers, "input", None)
+        if buffer is None or buffer.shape[0] < size or buffer.shape[2:] != input_shape:
+            buffer = self._buffers.input = np.empty((size, 3, *input_shape), dtype=self.input_dtype)
+
+        return buffer[:size]
+
+    @staticmethod
+    def postprocess(
+        prediction: np.ndarray,
+        conf: float,
+        iou: float,
+        classes: Optional[List[int]] = None,
+        max_det: int = 300,
+    ) -> np.ndarray:
+        """Decode a single ``(4 + nc, anchors)`` YOLO output into sorted ``(N, 6)`` detections."""
+        prediction = prediction.T.astype(np.float32, copy=False)
+        scores = prediction[:, 4:]
+
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+
+        keep = confidences > conf
+        if classes is not None:
+            keep &= np.isin(class_ids, classes)
+        if not keep.any():
+            return EMPTY_DETECTIONS
+
+        boxes = xywh2xyxy(prediction[keep, :4])
+        confidences = confidences[keep]
+        class_ids = class_ids[keep].astype(np.float32)
+
+        order = confidences.argsort()[::-1][:MAX_NMS_CANDIDATES]
+        boxes, confidences, class_ids = boxes[order], confidences[order], class_ids[order]
+
+        indices = non_max_suppression(boxes + class_ids[:, None] * MAX_WH, confidences, iou_threshold=iou)
+        indices = indices[:max_det]
+
+        return np.concatenate(
+            [boxes[indices], confidences[indices, None], class_ids[indices, None]],
+            axis=1,
+        ).astype(np.float32)
+
+
+def letterbox_image(
+    image: np.ndarray,
+    new_shape: Tuple[int, int] = (416, 416),
+) -> Tuple[np.ndarray, Tuple[float, int, int]]:
+    """Resize ``image`` keeping its aspect ratio and pad it to ``new_shape``.
+
+    Returns the padded image and the ``(gain, left, top)`` needed to map boxes back.
+    """
+    gain, (resized_width, resized_height), (left, top) = _letterbox_geometry(image.shape[:2], new_shape)
+    padded = np.full((*new_shape, 3), PAD_VALUE, dtype=np.uint8)
+    padded[top : top + resized_height, left : left + resized_width] = _resize(image, (resized_width, resized_height))
+    return padded, (gain, left, top)
+
+
+def letterbox_into(image: np.ndarray, out: np.ndarray) -> Tuple[float, int, int]:
+    """Letterbox ``image`` straight into ``out``, one ``(3, H, W)`` model input scaled to [0, 1].
+
+    Same result as normalizing :func:`letterbox_image`, without the intermediate padded image.
+    """
+    gain, (resized_width, resized_height), (left, top) = _letterbox_geometry(image.shape[:2], out.shape[1:])
+    bottom, right = top + resized_height, left + resized_width
+
+    pad = np.divide(PAD_VALUE, 255.0, dtype=out.dtype)
+    out[:, :top] = pad
+    out[:, bottom:] = pad
+    out[:, top:bottom, :left] = pad
+    out[:, top:bottom, right:] = pad
+
+    resized = _resize(image, (resized_width, resized_height))
+    np.divide(resized.transpose(2, 0, 1), 255.0, out=out[:, top:bottom, left:right], dtype=out.dtype, casting="unsafe")
+    return gain, left, top
+
+
+def _letterbox_geometry(
+    shape: Tuple[int, ...],
+    new_shape: Tuple[int, ...],
+) -> Tuple[float, Tuple[int, int], Tuple[int, int]]:
+    """Gain, resized ``(width, height)`` and ``(left, top)`` padding of a centred letterbox."""
+    height, width = shape
+    new_height, new_width = new_shape
+    gain = min(new_height / height, new_width / width)
+
+    resized_width, resized_height = int(round(width * gain)), int(round(height * gain))
+    pad_width, pad_height = (new_width - resized_width) / 2, (new_height - resized_height) / 2
+    top, left = int(round(pad_height - 0.1)), int(round(pad_width - 0.1))
+    return gain, (resized_width, resized_height), (left, top)
+
+
+def _resize(image: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    if size == (image.shape[1], image.shape[0]):
+        return image
+
+    return np.asarray(Image.fromarray(image).resize(size, Image.Resampling.BILINEAR))
+
+
+def scale_boxes(boxes: np.ndarray, letterbox: Tuple[float, int, int], shape: Tuple[int, ...]) -> np.ndarray:
+    """Map ``boxes`` from letterboxed model space back to an image of ``shape`` (height, width)."""
+    if not len(boxes):
+        return boxes
+
+    gain, left, top = letterbox
+    boxes = boxes.copy()
+    boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - left) / gain).clip(0, shape[1])
+    boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - top) / gain).clip(0, shape[0])
+    return boxes
+
+
+def xywh2xyxy(boxes: np.ndarray) -> np.ndarray:
+    xy, half_wh = boxes[:, :2], boxes[:, 2:4] / 2
+    return np.concatenate([xy - half_wh, xy + half_wh], axis=1)
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy NMS over ``boxes`` already sorted by descending ``scores``; returns kept indices."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+
+    order = np.arange(len(scores))
+    keep = []
+    while order.size:
+        current, rest = order[0], order[1:]
+        keep.append(current)
+
+        inter_width = (np.minimum(x2[current], x2[rest]) - np.maximum(x1[current], x1[rest])).clip(0)
+        inter_height = (np.minimum(y2[current], y2[rest]) - np.maximum(y1[current], y1[rest])).clip(0)
+        intersection = inter_width * inter_height
+        union = areas[current] + areas[rest] - intersection
+
+        order = rest[intersection / np.maximum(union, 1e-7) <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
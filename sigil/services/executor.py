@@ -0,0 +1,46 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from sigil.infrastructure.exceptions import ServiceUnavailableError
+
+T = TypeVar("T")
+
+
+class InferenceExecutor:
+    """Runs blocking inference calls on a dedicated thread pool so the event loop stays responsive.
+
+    ONNX Runtime releases the GIL while a session runs and ``InferenceSession.run`` is thread-safe,
+    so every worker shares the recognizer's sessions. Submissions beyond ``workers + max_queue_size``
+    are rejected with a 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, workers: int = 2, max_queue_size: int = 64) -> None:
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._pending = 0  # only touched from the event loop thread
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def queued(self) -> int:
+        return max(0, self._pending - self.workers)
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self._pending >= self.workers + self.max_queue_size:
+            raise ServiceUnavailableError(detail="Inference queue is full", error_code="inference_queue_full")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
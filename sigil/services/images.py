@@ -0,0 +1,94 @@
+import io
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from sigil.core.config.settings import RecognizerSettings
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".heic", ".heif"}
+
+# ISO BMFF brands of HEIC/HEIF still images and sequences, read from the ``ftyp`` box
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1"}
+
+
+class ImageDecodeError(ValueError):
+    """Raised when the provided bytes are not a decodable image."""
+
+
+@dataclass
+class DecodedImage:
+    pixels: np.ndarray
+    scale: float  # source width over decoded width, above 1 when a JPEG was decoded at a reduced scale
+    decoder: str  # path taken: ``jpeg_draft``, ``jpeg``, ``png``, ``webp``, ``heif``...
+
+
+def decode_image(data: bytes, mode: str = "RGB") -> np.ndarray:
+    """Decode encoded image bytes to a ``uint8`` array of shape ``(H, W, C)`` without touching disk.
+
+    ``mode`` is the PIL mode to convert to, ``"RGBA"`` keeps the alpha channel of slider pieces.
+    """
+    return decode(data, mode=mode).pixels
+
+
+def decode(data: bytes, mode: str = "RGB", target: Optional[int] = None) -> DecodedImage:
+    """Decode ``data`` along the cheapest path for its format.
+
+    With ``target`` set, a JPEG at least twice the size a ``target`` x ``target`` letterbox draws it at
+    is decoded at the smallest DCT scale (1/2, 1/4 or 1/8) that keeps it at or above that size, which
+    skips most of the decoding work. Images already in ``mode`` are not converted.
+    """
+    if is_heif(data):
+        register_heif_opener()
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, decoder = image.width, (image.format or "unknown").lower()
+            if target and image.format == "JPEG":
+                gain = min(target / image.width, target / image.height)
+                if gain <= 0.5:
+                    image.draft(mode, (math.ceil(image.width * gain), math.ceil(image.height * gain)))
+
+            pixels = np.asarray(image if image.mode == mode else image.convert(mode))
+    except (UnidentifiedImageError, OSError) as e:
+        msg = f"Cannot decode image: {e}"
+        raise ImageDecodeError(msg) from e
+
+    scale = width / pixels.shape[1]
+    return DecodedImage(pixels=pixels, scale=scale, decoder="jpeg_draft" if scale > 1 else decoder)
+
+
+def is_heif(data: bytes) -> bool:
+    return data[4:8] == b"ftyp" and data[8:12] in HEIF_BRANDS
+
+
+@lru_cache(maxsize=None)
+def register_heif_opener() -> None:
+    """Let ``Image.open`` read HEIC/HEIF; ``pillow_heif`` is only imported once such an image shows up."""
+    from pillow_heif import register_heif_opener as register
+
+    register()
+
+
+def rescale(image: np.ndarray, scale: float) -> np.ndarray:
+    """Shrink ``image`` by ``scale``, used to bring a piece to the resolution its puzzle was decoded at."""
+    if scale == 1:
+        return image
+
+    height, width = image.shape[:2]
+    size = (max(1, round(width / scale)), max(1, round(height / scale)))
+    return np.asarray(Image.fromarray(image).resize(size, Image.Resampling.BILINEAR))
+
+
+def decode_target(settings: RecognizerSettings) -> Optional[int]:
+    """Largest model input size of the cascade, the ``target`` to decode puzzles at.
+
+    ``None`` when draft decoding is off.
+    """
+    if not settings.decode_draft:
+        return None
+
+    return max(settings.imgsz, settings.cascade_imgsz or settings.imgsz)
@@ -0,0 +1,488 @@
+import asyncio
+import contextlib
+import functools
+import json
+import multiprocessing
+import secrets
+import signal
+import sys
+import time
+from dataclasses import asdict
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Set
+
+import numpy as np
+from loguru import logger
+
+from sigil.core.config.settings import InferenceSettings, Settings
+from sigil.core.logging import init_logger
+from sigil.infrastructure.exceptions import ApplicationError, ServiceUnavailableError
+from sigil.services.admission import Priority, check_deadline, time_left
+from sigil.services.batching import BatchScheduler, GapPrediction
+from sigil.services.detectors.base import ImageSource, load_image
+from sigil.services.executor import InferenceExecutor
+from sigil.services.registry import ModelRegistry, ModelStatus, SwapResult
+
+# After startup a lost server is given this long to come back before requests fail with a 503
+RECONNECT_TIMEOUT = 1.0
+
+
+class ImageTooLargeError(ApplicationError):
+    """Class for errors raised when a decoded image does not fit a shared-memory ring slot."""
+
+    status_code = 413
+
+    def __init__(self, detail: str = "Image too large", error_code: str = "image_too_large") -> None:
+        super().__init__(detail=detail, error_code=error_code)
+
+
+class SharedImageRing:
+    """Fixed-size image slots in one shared memory segment, owned by the HTTP worker that creates it.
+
+    Only the owner allocates slots, so no cross-process locking is needed: the inference server reads
+    a slot in place until it answers, and only then is the slot released for reuse.
+    """
+
+    def __init__(self, slots: int = 64, slot_bytes: int = 4 * 1024 * 1024) -> None:
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+
+        name = f"sigil-{secrets.token_hex(8)}"
+        self._memory = shared_memory.SharedMemory(name=name, create=True, size=slots * slot_bytes)
+        self._free = list(range(slots))
+        self._available = asyncio.Semaphore(slots)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    async def acquire(self, image: np.ndarray) -> int:
+        """Copy ``image`` into a free slot, waiting for one if needed, and return its byte offset.
+
+        The slot stays taken until ``release`` is called with that offset.
+        """
+        if image.nbytes > self.slot_bytes:
+            msg = f"Decoded image of {image.nbytes} bytes exceeds the {self.slot_bytes} byte ring slot"
+            raise ImageTooLargeError(detail=msg)
+
+        await self._available.acquire()
+        index = self._free.pop()
+        offset = index * self.slot_bytes
+        np.ndarray(image.shape, dtype=np.uint8, buffer=self._memory.buf, offset=offset)[...] = image
+        return offset
+
+    def release(self, offset: int) -> None:
+        self._free.append(offset // self.slot_bytes)
+        self._available.release()
+
+    def close(self) -> None:
+        self._memory.close()
+        with contextlib.suppress(FileNotFoundError):
+            self._memory.unlink()
+
+
+class InferenceServer:
+    """Owns the models for every HTTP worker on the host and batches their requests together.
+
+    Workers connect over a Unix socket and send one JSON line per request; images are read in place
+    from the sender's shared-memory ring. Answers go back as JSON lines in completion order.
+    """
+
+    def __init__(self, settings: Settings, path: Path) -> None:
+        self._settings = settings
+        self.path = path
+
+        self._registry: Optional[ModelRegistry] = None
+        self._scheduler: Optional[BatchScheduler] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    async def serve(self) -> None:
+        """Load and warm up the models, then answer until cancelled."""
+        inference_settings = self._settings.inference_settings
+        self._registry = ModelRegistry(
+            settings=self._settings.recognizer_settings,
+            inference_settings=inference_settings,
+        )
+        await self._registry.activate(self._settings.recognizer_settings.model_version, warm_up=False)
+        await self._registry.warm_up()
+
+        executor = InferenceExecutor(
+            workers=self._registry.inference_workers(),
+            max_queue_size=inference_settings.max_queue_size,
+        )
+        self._scheduler = BatchScheduler(
+            registry=self._registry,
+            executor=executor,
+            max_batch_size=inference_settings.batch_max_size,
+            max_wait_ms=inference_settings.batch_max_wait_ms,
+        )
+
+        # Listen only once the models are warm, so connecting workers never hit a cold session
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(self._handle, path=str(self.path))
+        logger.info(f"Inference server listening on {self.path}")
+        try:
+            await server.serve_forever()
+        finally:
+            # Connected workers see the socket close and fail over their waiting requests
+            server.close()
+            for writer in self._writers:
+                writer.close()
+            await server.wait_closed()
+
+            await self._scheduler.close()
+            executor.shutdown()
+            self.path.unlink(missing_ok=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        segments: Dict[str, shared_memory.SharedMemory] = {}
+        tasks: Set[asyncio.Task] = set()
+        self._writers.add(writer)
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._answer(json.loads(line), segments=segments, writer=writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        except (ConnectionError, ValueError) as e:
+            logger.error(f"Inference client connection failed: {e}")
+
+        except asyncio.CancelledError:
+            # Shutting down; asyncio before 3.12 logs handlers that end cancelled as errors
+            pass
+
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            # A batch still running on a cancelled request keeps its view into the segment alive
+            for memory in segments.values():
+                with contextlib.suppress(BufferError):
+                    memory.close()
+
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _answer(
+        self,
+        message: Dict[str, Any],
+        segments: Dict[str, shared_memory.SharedMemory],
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        try:
+            reply: Dict[str, Any] = {"id": message["id"], "result": await self._dispatch(message, segments)}
+        except ApplicationError as e:
+            reply = {"id": message["id"], "error": _error_payload(e, status_code=e.status_code)}
+        except Exception as e:
+            logger.error(f"Error answering inference request: {e}")
+            reply = {"id": message["id"], "error": _error_payload(e, status_code=500)}
+
+        writer.write((json.dumps(reply) + "\n").encode())
+
+    async def _dispatch(self, message: Dict[str, Any], segments: Dict[str, shared_memory.SharedMemory]) -> Any:
+        assert self._registry is not None and self._scheduler is not None
+
+        op = message["op"]
+        if op == "solve":
+            memory = segments.get(message["shm"])
+            if memory is None:
+                memory = segments[message["shm"]] = _attach(message["shm"])
+
+            shape = tuple(message["shape"])
+            image: np.ndarray = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf, offset=message["offset"])
+            try:
+                # Deadlines travel as the time left rather than as a clock reading
+                timeout = message.get("timeout")
+                deadline = time.monotonic() + timeout if timeout is not None else None
+                priority = message.get("priority", "normal")
+                return asdict(await self._scheduler.submit(image, priority=priority, deadline=deadline))
+            finally:
+                del image
+
+        if op == "status":
+            return asdict(await self._registry.status())
+
+        if op == "activate":
+            return asdict(await self._registry.activate(message.get("version"), warm_up=message.get("warm_up", True)))
+
+        raise ApplicationError(detail=f"Unknown inference server op {op!r}", error_code="unknown_op")
+
+
+class InferenceClient:
+    """The HTTP worker's side of the inference servers, used in place of a local ``BatchScheduler``.
+
+    Decoded images go through this worker's ``SharedImageRing``; requests are spread over the server
+    connections by the number of answers each one still owes.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[Path],
+        ring_slots: int = 64,
+        ring_slot_bytes: int = 4 * 1024 * 1024,
+        capacity: int = 16,
+        connect_timeout: float = 120.0,
+    ) -> None:
+        self.paths = list(paths)
+        self.connect_timeout = connect_timeout
+        self._capacity = min(capacity, ring_slots)
+
+        self._ring = SharedImageRing(slots=ring_slots, slot_bytes=ring_slot_bytes)
+        self._connections: Dict[Path, _Connection] = {}
+        self._connecting = asyncio.Lock()
+        self._ids = iter(range(sys.maxsize))
+        self._model_version: Optional[str] = None  # as last reported by a server
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._model_version
+
+    @property
+    def pending(self) -> int:
+        return sum(len(connection.futures) for connection in self._connections.values())
+
+    async def connect(self, timeout: Optional[float] = None) -> None:
+        """Connect to every server, waiting up to ``connect_timeout`` for them to start listening."""
+        async with self._connecting:
+            for path in self.paths:
+                connection = self._connections.get(path)
+                if connection is None or connection.closed:
+                    timeout = self.connect_timeout if timeout is None else timeout
+                    self._connections[path] = await _Connection.open(path, timeout=timeout)
+
+    async def submit(
+        self,
+        source: ImageSource,
+        priority: Priority = "normal",
+        deadline: Optional[float] = None,
+    ) -> GapPrediction:
+        check_deadline(deadline, stage="inference")
+        image = np.ascontiguousarray(load_image(source), dtype=np.uint8)
+        offset = await self._ring.acquire(image)
+        message = {
+            "op": "solve",
+            "shm": self._ring.name,
+            "offset": offset,
+            "shape": list(image.shape),
+            "priority": priority,
+            "timeout": time_left(deadline),
+        }
+        # The server reads the slot until it answers, so it's freed by the reply or a lost connection
+        # rather than when this caller stops waiting
+        result = await self._request(message, on_reply=functools.partial(self._ring.release, offset))
+
+        prediction = GapPrediction(**result)
+        self._model_version = prediction.version
+        return prediction
+
+    async def status(self) -> ModelStatus:
+        statuses = [ModelStatus(**await self._request({"op": "status"}, path=path)) for path in self.paths]
+        return ModelStatus(
+            active=statuses[0].active,
+            loaded=sorted({version for status in statuses for version in status.loaded}),
+            versions=statuses[0].versions,
+        )
+
+    async def activate(self, version: Optional[str] = None, warm_up: bool = True) -> SwapResult:
+        """Activate ``version`` on one server at a time, so the others keep answering meanwhile."""
+        results = []
+        for path in self.paths:
+            message = {"op": "activate", "version": version, "warm_up": warm_up}
+            results.append(SwapResult(**await self._request(message, path=path)))
+
+        self._model_version = results[0].active
+        return SwapResult(
+            active=results[0].active,
+            previous=results[0].previous,
+            load_seconds=max(result.load_seconds for result in results),
+            warmup_seconds=max(result.warmup_seconds for result in results),
+        )
+
+    async def close(self) -> None:
+        for connection in self._connections.values():
+            await connection.close()
+
+        self._connections.clear()
+        self._ring.close()
+
+    async def _request(
+        self,
+        message: Dict[str, Any],
+        path: Optional[Path] = None,
+        on_reply: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """Send ``message`` and wait for the answer; ``on_reply`` runs once the server has answered or is gone."""
+        try:
+            if len(self._connections) < len(self.paths) or any(c.closed for c in self._connections.values()):
+                await self.connect(timeout=RECONNECT_TIMEOUT)
+        except BaseException:
+            if on_reply is not None:
+                on_reply()
+            raise
+
+        if path is None:
+            connection = min(self._connections.values(), key=lambda connection: len(connection.futures))
+        else:
+            connection = self._connections[path]
+
+        return await connection.request({**message, "id": next(self._ids)}, on_reply=on_reply)
+
+
+class _Connection:
+    def __init__(self, path: Path, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.path = path
+        self.futures: Dict[int, "asyncio.Future[Any]"] = {}
+        self._on_reply: Dict[int, Callable[[], None]] = {}  # outlive the futures of callers that gave up
+        self._writer = writer
+        self._reader_task = asyncio.create_task(self._read(reader))
+
+    @classmethod
+    async def open(cls, path: Path, timeout: float) -> "_Connection":
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(str(path))
+                return cls(path=path, reader=reader, writer=writer)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if loop.time() > deadline:
+                    msg = f"Inference server at {path} is not listening"
+                    raise ServiceUnavailableError(detail=msg, error_code="inference_server_unavailable")
+
+                await asyncio.sleep(0.1)
+
+    @property
+    def closed(self) -> bool:
+        return self._reader_task.done()
+
+    async def request(self, message: Dict[str, Any], on_reply: Optional[Callable[[], None]] = None) -> Any:
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self.futures[message["id"]] = future
+        if on_reply is not None:
+            self._on_reply[message["id"]] = on_reply
+
+        try:
+            if self.closed:
+                self._replied(message["id"])
+                msg = f"Lost the connection to the inference server at {self.path}"
+                raise ServiceUnavailableError(detail=msg, error_code="inference_server_unavailable")
+
+            self._writer.write((json.dumps(message) + "\n").encode())
+            return await future
+        finally:
+            self.futures.pop(message["id"], None)
+
+    async def close(self) -> None:
+        self._writer.close()
+        self._reader_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._reader_task
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                reply = json.loads(line)
+                self._replied(reply["id"])
+                future = self.futures.get(reply["id"])
+                if future is None or future.done():
+                    continue
+
+                if "error" in reply:
+                    future.set_exception(_error_from_payload(reply["error"]))
+                else:
+                    future.set_result(reply["result"])
+
+        except ConnectionError as e:
+            logger.error(f"Inference server connection to {self.path} failed: {e}")
+
+        finally:
+            for request_id in list(self._on_reply):
+                self._replied(request_id)
+
+            # Whatever is still waiting has to be retried on a new connection
+            for future in self.futures.values():
+                if not future.done():
+                    msg = f"Lost the connection to the inference server at {self.path}"
+                    future.set_exception(ServiceUnavailableError(detail=msg, error_code="inference_server_unavailable"))
+
+    def _replied(self, request_id: int) -> None:
+        on_reply = self._on_reply.pop(request_id, None)
+        if on_reply is not None:
+            on_reply()
+
+
+def socket_path(settings: InferenceSettings, index: int) -> Path:
+    return settings.server_dir / f"inference-{index}.sock"
+
+
+def run_inference_server(settings: Settings, index: int) -> None:
+    """Entry point of an inference server process."""
+    init_logger(debug=settings.debug, settings=settings.logging_settings)
+    server = InferenceServer(settings=settings, path=socket_path(settings.inference_settings, index))
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_serve_until_terminated(server))
+
+
+@contextlib.contextmanager
+def inference_servers(settings: Settings) -> Iterator[Sequence[BaseProcess]]:
+    """Run ``settings.inference_settings.servers`` inference server processes for the duration of the block."""
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_inference_server, args=(settings, index), name=f"inference-{index}", daemon=True)
+        for index in range(settings.inference_settings.servers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        yield processes
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=10)
+
+
+async def _serve_until_terminated(server: InferenceServer) -> None:
+    # SIGTERM from the API process cancels serving, so the socket and sessions are cleaned up
+    task = asyncio.current_task()
+    assert task is not None
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    with contextlib.suppress(asyncio.CancelledError):
+        await server.serve()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore[call-arg]
+
+    # Before Python 3.13 attaching registers the segment with the resource tracker, which would unlink
+    # it when the server exits or drop the owning worker's registration; the worker cleans it up itself
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None  # type: ignore[assignment]
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register  # type: ignore[assignment]
+
+
+def _error_payload(error: Exception, status_code: int) -> Dict[str, Any]:
+    return {
+        "detail": getattr(error, "detail", str(error)),
+        "error_code": getattr(error, "error_code", "inference_error"),
+        "status_code": status_code,
+    }
+
+
+def _error_from_payload(payload: Dict[str, Any]) -> ApplicationError:
+    error = ApplicationError(detail=payload["detail"], error_code=payload["error_code"])
+    error.status_code = payload["status_code"]
+    return error
@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class PieceMatch:
+    x: float  # sub-pixel left edge of the piece's opaque region in the puzzle
+    y: float
+    score: float  # normalized cross-correlation at the peak, in [-1, 1]
+    offset_x: int  # left edge of the opaque region inside the piece image
+    margin: float = 0.0  # full search only: peak score minus the best score away from the peak
+
+
+class PieceMatcher:
+    """Locates the slider piece in the puzzle with masked normalized cross-correlation.
+
+    Both images are reduced to gradient magnitude so the piece outline lines up with the rim of the
+    gap regardless of how the vendor shades the hole. The piece's alpha channel masks the template,
+    and all correlations run as FFT products in NumPy.
+    """
+
+    def __init__(self, band: int = 12, alpha_threshold: int = 128) -> None:
+        self.band = band
+        self.alpha_threshold = alpha_threshold
+
+    def match(self, puzzle: np.ndarray, piece: np.ndarray, box: Optional[List[float]] = None) -> Optional[PieceMatch]:
+        """Match ``piece`` (RGBA) against ``puzzle`` (RGB).
+
+        With ``box`` only positions within ``band`` pixels of the box's top-left corner are searched.
+        Without it the whole puzzle is searched at half resolution first and the best position is then
+        refined the same way.
+        """
+        template, mask, (offset_x, _) = self._prepare_piece(piece)
+        image = gradient_magnitude(to_gray(puzzle))
+        if image.shape[0] < mask.shape[0] or image.shape[1] < mask.shape[1]:
+            return None
+
+        margin = 0.0
+        if not box:
+            scores = masked_ncc(_downsample(image), _downsample(template), _downsample(mask) > 0)
+            peak_y, peak_x = map(int, np.unravel_index(int(np.argmax(scores)), scores.shape))
+            margin = _peak_margin(scores, peak_y, peak_x, radius=(mask.shape[0] // 4, mask.shape[1] // 4))
+            box = [float(peak_x * 2), float(peak_y * 2)]
+
+        # Searched positions are top-left corners of the opaque region's bounding box. Near the right or
+        # bottom edge the window is shifted inwards, so it always holds at least one full placement
+        height, width = mask.shape
+        left = min(max(0, int(round(box[0])) - self.band), image.shape[1] - width)
+        top = min(max(0, int(round(box[1])) - self.band), image.shape[0] - height)
+        window = image[top : top + 2 * self.band + height + 1, left : left + 2 * self.band + width + 1]
+
+        scores = masked_ncc(window, template, mask)
+        peak_y, peak_x = map(int, np.unravel_index(int(np.argmax(scores)), scores.shape))
+        sub_x = peak_x + _parabolic_offset(scores[peak_y, max(0, peak_x - 1) : peak_x + 2], peak_x)
+
+        score = float(scores[peak_y, peak_x])
+        return PieceMatch(
+            x=left + float(sub_x),
+            y=float(top + peak_y),
+            score=score,
+            offset_x=offset_x,
+            margin=margin,
+        )
+
+    def _prepare_piece(self, piece: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Tuple[int, int]]:
+        alpha = piece[..., 3] if piece.shape[-1] == 4 else np.full(piece.shape[:2], 255, dtype=np.uint8)
+        opaque = alpha >= self.alpha_threshold
+        if not opaque.any():
+            opaque[:] = True
+
+        rows, columns = np.flatnonzero(opaque.any(axis=1)), np.flatnonzero(opaque.any(axis=0))
+        y1, y2, x1, x2 = rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+
+        # Fade the piece into black outside its shape so the outline shows up as a strong gradient
+        weight = alpha.astype(np.float32) / 255
+        template = gradient_magnitude(to_gray(piece[..., :3]) * weight)[y1:y2, x1:x2]
+        mask = _dilate(opaque)[y1:y2, x1:x2]
+        return template, mask, (int(x1), int(y1))
+
+
+def to_gray(image: np.ndarray) -> np.ndarray:
+    return image[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def gradient_magnitude(gray: np.ndarray) -> np.ndarray:
+    gradient = np.zeros_like(gray)
+    gradient[:, 1:] += np.abs(np.diff(gray, axis=1))
+    gradient[1:, :] += np.abs(np.diff(gray, axis=0))
+    return gradient
+
+
+def masked_ncc(image: np.ndarray, template: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Normalized cross-correlation of ``template`` over ``image`` restricted to ``mask``, 'valid' positions only."""
+    mask = mask.astype(np.float32)
+    count = mask.sum()
+
+    template = (template - template[mask > 0].mean()) * mask
+    template_norm = np.sqrt(np.square(template).sum())
+
+    shape = (_next_fast_len(image.shape[0] + mask.shape[0] - 1), _next_fast_len(image.shape[1] + mask.shape[1] - 1))
+    image_fft = np.fft.rfft2(image, shape)
+    squared_fft = np.fft.rfft2(np.square(image), shape)
+    template_fft = np.fft.rfft2(template[::-1, ::-1], shape)
+    mask_fft = np.fft.rfft2(mask[::-1, ::-1], shape)
+
+    numerator = _valid(np.fft.irfft2(image_fft * template_fft, shape), mask.shape, image.shape)
+    window_sum = _valid(np.fft.irfft2(image_fft * mask_fft, shape), mask.shape, image.shape)
+    window_squared_sum = _valid(np.fft.irfft2(squared_fft * mask_fft, shape), mask.shape, image.shape)
+
+    variance = np.maximum(window_squared_sum - np.square(window_sum) / count, 0)
+    denominator = template_norm * np.sqrt(variance)
+    return np.where(denominator > 1e-6, numerator / np.maximum(denominator, 1e-6), 0.0)
+
+
+def _downsample(image: np.ndarray) -> np.ndarray:
+    """Halve both sides by averaging 2x2 blocks."""
+    height, width = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    image = image[:height, :width].astype(np.float32)
+    return (image[0::2, 0::2] + image[1::2, 0::2] + image[0::2, 1::2] + image[1::2, 1::2]) / 4
+
+
+def _peak_margin(scores: np.ndarray, peak_y: int, peak_x: int, radius: Tuple[int, int]) -> float:
+    """How far the peak stands above the best score outside a ``radius`` neighbourhood around it."""
+    rows = slice(max(0, peak_y - radius[0]), peak_y + radius[0] + 1)
+    columns = slice(max(0, peak_x - radius[1]), peak_x + radius[1] + 1)
+    outside = scores.copy()
+    outside[rows, columns] = -1
+    return float(scores[peak_y, peak_x] - outside.max())
+
+
+def _valid(full: np.ndarray, kernel_shape: Tuple[int, ...], image_shape: Tuple[int, ...]) -> np.ndarray:
+    """Slice the positions where the kernel lies entirely inside the image out of a full correlation."""
+    height, width = kernel_shape
+    return full[height - 1 : image_shape[0], width - 1 : image_shape[1]]
+
+
+def _next_fast_len(size: int) -> int:
+    """Smallest 5-smooth number >= ``size``; FFTs of those lengths are much faster than of odd primes."""
+    best = 1 << (size - 1).bit_length()
+    power_of_5 = 1
+    while power_of_5 < best:
+        power_of_35 = power_of_5
+        while power_of_35 < best:
+            candidate = power_of_35
+            while candidate < size:
+                candidate *= 2
+            best = min(best, candidate)
+            power_of_35 *= 3
+        power_of_5 *= 5
+    return best
+
+
+def _dilate(mask: np.ndarray) -> np.ndarray:
+    dilated = mask.copy()
+    dilated[1:, :] |= mask[:-1, :]
+    dilated[:-1, :] |= mask[1:, :]
+    dilated[:, 1:] |= mask[:, :-1]
+    dilated[:, :-1] |= mask[:, 1:]
+    return dilated
+
+
+def _parabolic_offset(values: np.ndarray, peak: int) -> float:
+    """Sub-pixel offset of the peak from a parabola through it and its neighbours."""
+    if peak == 0 or len(values) < 3:
+        return 0.0
+
+    left, center, right = values
+    curvature = left - 2 * center + right
+    if curvature >= 0:
+        return 0.0
+
+    return float(np.clip(0.5 * (left - right) / curvature, -0.5, 0.5))
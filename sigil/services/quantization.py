@@ -0,0 +1,152 @@
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Literal, Optional, Sequence
+
+import numpy as np
+import onnx
+from onnxruntime.quantization import CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from sigil.services.detectors.onnx_detector import OnnxDetector
+
+Precision = Literal["fp16", "int8"]
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """Feeds letterboxed captcha images to the INT8 calibrator one at a time."""
+
+    def __init__(self, model_path: Path, images: Sequence[np.ndarray], imgsz: int = 416) -> None:
+        detector = OnnxDetector(model_path=model_path, imgsz=imgsz)
+        self._input_name = detector.input_name
+        self._batches: Iterator[np.ndarray] = (detector.preprocess([image])[0] for image in images)
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        batch = next(self._batches, None)
+        return {self._input_name: batch} if batch is not None else None
+
+
+@dataclass
+class VariantComparison:
+    images: int
+    baseline_ms: float  # median single-image latency of the FP32 model
+    variant_ms: float
+    mean_iou: float  # IoU between the top boxes of both models
+    agreement: float  # share of images whose top boxes overlap with IoU >= 0.5
+    mean_x_error: float  # mean absolute difference of the box left edge, in pixels
+    mean_confidence_delta: float
+
+
+def quantize_model(
+    model_path: Path,
+    output_path: Path,
+    precision: Precision,
+    calibration_images: Sequence[np.ndarray] = (),
+    imgsz: int = 416,
+    per_channel: bool = False,
+) -> Path:
+    """Write an FP16 or statically quantized INT8 variant of ``model_path`` to ``output_path``."""
+    if precision == "fp16":
+        from onnxruntime.transformers.float16 import convert_float_to_float16
+
+        # Inputs and outputs stay FP32 so the detector pre- and post-processing are unchanged
+        model = convert_float_to_float16(onnx.load(str(model_path)), keep_io_types=True)
+        onnx.save(model, str(output_path))
+        return output_path
+
+    if not calibration_images:
+        msg = "INT8 quantization needs calibration images"
+        raise ValueError(msg)
+
+    with tempfile.TemporaryDirectory() as directory:
+        prepared_path = Path(directory) / model_path.name
+        quant_pre_process(str(model_path), str(prepared_path), skip_symbolic_shape=True)
+
+        quantize_static(
+            model_input=str(prepared_path),
+            model_output=str(output_path),
+            calibration_data_reader=ImageCalibrationReader(prepared_path, calibration_images, imgsz=imgsz),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=_decode_nodes(prepared_path),
+        )
+
+    return output_path
+
+
+def compare_models(
+    baseline_path: Path,
+    variant_path: Path,
+    images: Sequence[np.ndarray],
+    conf: float = 0.25,
+    imgsz: int = 416,
+) -> VariantComparison:
+    """Run both models on ``images`` one at a time and compare their latency and top detections."""
+    baseline = OnnxDetector(model_path=baseline_path, imgsz=imgsz)
+    variant = OnnxDetector(model_path=variant_path, imgsz=imgsz)
+
+    baseline_times: List[float] = []
+    variant_times: List[float] = []
+    ious: List[float] = []
+    x_errors: List[float] = []
+    confidence_deltas: List[float] = []
+    for image in images:
+        baseline_top = _timed_top(baseline, image, conf=conf, timings=baseline_times)
+        variant_top = _timed_top(variant, image, conf=conf, timings=variant_times)
+        if baseline_top is None or variant_top is None:
+            ious.append(1.0 if baseline_top is variant_top else 0.0)
+            continue
+
+        ious.append(_iou(baseline_top[:4], variant_top[:4]))
+        x_errors.append(abs(float(baseline_top[0] - variant_top[0])))
+        confidence_deltas.append(float(variant_top[4] - baseline_top[4]))
+
+    return VariantComparison(
+        images=len(images),
+        baseline_ms=statistics.median(baseline_times) * 1000 if baseline_times else 0.0,
+        variant_ms=statistics.median(variant_times) * 1000 if variant_times else 0.0,
+        mean_iou=float(np.mean(ious)) if ious else 0.0,
+        agreement=float(np.mean([iou >= 0.5 for iou in ious])) if ious else 0.0,
+        mean_x_error=float(np.mean(x_errors)) if x_errors else 0.0,
+        mean_confidence_delta=float(np.mean(confidence_deltas)) if confidence_deltas else 0.0,
+    )
+
+
+def _decode_nodes(model_path: Path) -> List[str]:
+    """Nodes after the last convolution, the box/score decoding that stays in float.
+
+    Box coordinates in pixels and class scores in ``[0, 1]`` end up in one output tensor, so quantizing
+    the decoding with a single scale would wipe out the scores.
+    """
+    model = onnx.load(str(model_path))
+    nodes = model.graph.node
+
+    # Exclusion works by node name, give unnamed nodes one
+    if not all(node.name for node in nodes):
+        for index, node in enumerate(nodes):
+            node.name = node.name or f"{node.op_type}_{index}"
+        onnx.save(model, str(model_path))
+
+    last_conv = max((index for index, node in enumerate(nodes) if node.op_type == "Conv"), default=-1)
+    return [node.name for node in nodes[last_conv + 1 :]]
+
+
+def _timed_top(detector: OnnxDetector, image: np.ndarray, conf: float, timings: List[float]) -> Optional[np.ndarray]:
+    started = time.perf_counter()
+    (detections,) = detector.predict([image], conf=conf, classes=[0])
+    timings.append(time.perf_counter() - started)
+    return detections[0] if len(detections) else None
+
+
+def _iou(first: np.ndarray, second: np.ndarray) -> float:
+    width = max(0.0, min(first[2], second[2]) - max(first[0], second[0]))
+    height = max(0.0, min(first[3], second[3]) - max(first[1], second[1]))
+    intersection = width * height
+    union = (first[2] - first[0]) * (first[3] - first[1]) + (second[2] - second[0]) * (second[3] - second[1])
+    union -= intersection
+    return float(intersection / union) if union > 0 else 0.0
@@ -1,132 +1,231 @@
 import contextlib
 import os
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, List, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
 import onnxruntime as ort
-import torch
 from loguru import logger
-from ultralytics import YOLO
-from ultralytics.engine.model import Results
+from PIL import Image, ImageDraw
 
-DEFAULT_CONF = 0.25
+from sigil.core.config.settings import RecognizerSettings
+from sigil.services.detectors.base import Detector, ImageSource, load_image
+from sigil.services.detectors.onnx_detector import OnnxDetector
+from sigil.services.tuning import TuningProfile, load_profile, session_options, tuning_dir
+
+MODEL_NAMES = ("multi_cls", "single_cls")
+
+
+def model_filename(name: str, precision: str = "fp32") -> str:
+    """File name of a model variant: ``multi_cls.onnx`` for FP32, ``multi_cls.int8.onnx`` and so on otherwise."""
+    return f"{name}.onnx" if precision == "fp32" else f"{name}.{precision}.onnx"
+
+
+def execution_providers() -> List[Any]:
+    """Execution providers for ONNX Runtime, CUDA first when the installed build ships it.
+
+    Session options come from the settings, see ``sigil.services.tuning.session_options``.
+    """
+    # Set CUDA provider options
+    cuda_provider_options = {
+        "arena_extend_strategy": "kSameAsRequested",
+        "cudnn_conv_algo_search": "EXHAUSTIVE",
+        "do_copy_in_default_stream": True,
+        # This option can help reduce memory copies between CPU and GPU
+        "device_id": 0,
+        # Force CPU kernels to stay on CPU, improving memory transfer
+        "gpu_mem_limit": 2 * 1024 * 1024 * 1024,  # 2GB GPU memory limit
+    }
+
+    providers: List[Any] = (
+        [
+            ("CUDAExecutionProvider", cuda_provider_options),
+            "CPUExecutionProvider",
+        ]
+        # Asks ONNX Runtime itself rather than importing torch just for ``torch.cuda.is_available()``
+        if "CUDAExecutionProvider" in ort.get_available_providers()
+        else ["CPUExecutionProvider"]
+    )
+
+    # Register the CUDA provider options
+    with contextlib.suppress(Exception):
+        # Set as environment variable that YOLO will use
+        os.environ["ULTRALYTICS_ORT_PROVIDERS"] = str(providers)
+
+    return providers
+
+
+@dataclass
+class GapDetection:
+    box: List[float]
+    confidence: float
+    stage: str  # cascade stage that answered, ``<model>@<imgsz>``
+
+
+@dataclass
+class _CascadeStage:
+    name: str
+    detector: Detector
+    imgsz: int
+    min_confidence: float  # answers below this escalate to the next stage
 
 
 class RecognizerService:
-    def __init__(self) -> None:
-        # Configure ONNX Runtime session options to optimize for CUDA
-        self._configure_onnxruntime()
-
-        root_dir = os.path.dirname(os.path.dirname(__file__))
-        multi_cls_model_path = os.path.join(root_dir, "models", "yolo", "multi_cls.onnx")
-        single_cls_model_path = os.path.join(root_dir, "models", "yolo", "single_cls.onnx")
-
-        # Initialize models with optimized settings
-        self.multi_cls_model = YOLO(multi_cls_model_path, task="detect")
-        self.single_cls_model = YOLO(single_cls_model_path, task="detect")
-
-    def identify_gap(self, source: str, show_result: bool = False, **kwargs: Any) -> Tuple[List[float], float]:
-        results = self._predict(model=self.multi_cls_model, source=source, classes=[0], conf=DEFAULT_CONF, **kwargs)
-        if not len(results):
-            return [], 0.0
-
-        box_with_max_conf: Results = max(results, key=lambda x: x.boxes.conf.max())
-        if show_result:
-            box_with_max_conf.show()
-
-        box_with_conf = box_with_max_conf.boxes.data.tolist()[0]
-        return box_with_conf[:-2], box_with_conf[-2]
-
-    def _predict(
-        self,
-        model: YOLO,
-        source: Union[str, Path, int, list, tuple, np.ndarray] = None,
-        **kwargs: Any,
-    ) -> List[Results]:
-        os.environ["ORT_TENSORRT_FP16_ENABLE"] = "1"  # Enable fp16 for TensorRT if available
-        os.environ["ORT_TENSORRT_INT8_ENABLE"] = "0"  # Disable int8 to avoid memory copying
-
-        with open(os.devnull, "w") as devnull:
-            import sys
-
-            stderr_backup = sys.stderr
-            try:
-                # Only set when running in non-production
-                if os.environ.get("ENVIRONMENT") != "production":
-                    sys.stderr = devnull
-
-                # Set parameters
-                params = {
-                    "source": source,
-                    "device": "0" if torch.cuda.is_available() else "cpu",
-                    "conf": 0.8,
-                    "imgsz": [416, 416],
-                    "half": torch.cuda.is_available(),  # Use FP16 if CUDA is available
-                    "optimize": True,  # Enable ONNX Runtime optimizations
-                    "verbose": True,
-                }
-                params.update(kwargs)
-
-                # Perform prediction
-                results = model.predict(**params)
-                if len(results):
-                    return results
-
-                return []
-
-            except Exception as e:
-                logger.error(f"Error predicting: {e}")
-                raise e
-
-            finally:
-                # Restore stderr
-                if os.environ.get("ENVIRONMENT") != "production":
-                    sys.stderr = stderr_backup
-
-    def _configure_onnxruntime(self) -> None:
-        """Configure ONNX Runtime session options to optimize for CUDA execution"""
-        # Set global session options
-        options = ort.SessionOptions()
-
-        # Enable memory pattern optimization
-        options.enable_mem_pattern = True
-
-        # Set graph optimization level to all optimizations
-        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-
-        # Set execution mode to parallel (can help reduce memory copies)
-        options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
-
-        # Enable memory reuse (can help reduce memory copies)
-        options.enable_mem_reuse = True
-
-        # Set inter-op thread count to minimize overhead
-        options.inter_op_num_threads = 1
-
-        # Set CUDA provider options
-        cuda_provider_options = {
-            "arena_extend_strategy": "kSameAsRequested",
-            "cudnn_conv_algo_search": "EXHAUSTIVE",
-            "do_copy_in_default_stream": True,
-            # This option can help reduce memory copies between CPU and GPU
-            "device_id": 0,
-            # Force CPU kernels to stay on CPU, improving memory transfer
-            "gpu_mem_limit": 2 * 1024 * 1024 * 1024,  # 2GB GPU memory limit
-        }
-
-        # Register the session options and CUDA provider options
-        with contextlib.suppress(Exception):
-            providers = (
-                [
-                    ("CUDAExecutionProvider", cuda_provider_options),
-                    "CPUExecutionProvider",
-                ]
-                if torch.cuda.is_available()
-                else ["CPUExecutionProvider"]
+    def __init__(self, settings: Optional[RecognizerSettings] = None) -> None:
+        self._settings = settings if settings else RecognizerSettings()
+
+        # Configure ONNX Runtime execution providers to optimize for CUDA
+        self._providers = execution_providers()
+
+        # Sessions start from the graphs ``sigil tune`` optimized on this host, with its thread settings
+        self.profile = self._load_profile()
+        if self.profile is not None:
+            self._settings = self.profile.apply(self._settings)
+            logger.info(f"Loaded tuning profile {self.profile.directory}: {self.profile.candidate.describe()}")
+        self._session_options = session_options(self._settings, optimized=self.profile is not None)
+
+        # Initialize models with optimized settings, single_cls is only loaded when the cascade uses it
+        self.multi_cls_model = self._load_detector("multi_cls")
+        self.single_cls_model: Optional[Detector] = None
+        if self._settings.cascade and self._settings.cascade_model == "single_cls":
+            self.single_cls_model = self._load_detector("single_cls")
+
+        self._stages = self._build_cascade()
+
+    @property
+    def stages(self) -> List[str]:
+        return [stage.name for stage in self._stages]
+
+    def identify_gap(self, source: ImageSource, show_result: bool = False, **kwargs: Any) -> Tuple[List[float], float]:
+        box, confidence = self.identify_gaps([source], **kwargs)[0]
+        if show_result and box:
+            self._show_result(source=source, box=box)
+
+        return box, confidence
+
+    def identify_gaps(self, sources: Sequence[ImageSource], **kwargs: Any) -> List[Tuple[List[float], float]]:
+        """Run batched inference over ``sources`` and return a ``(box, confidence)`` pair per image."""
+        return [(detection.box, detection.confidence) for detection in self.detect_gaps(sources, **kwargs)]
+
+    def detect_gaps(self, sources: Sequence[ImageSource], **kwargs: Any) -> List[GapDetection]:
+        """Run ``sources`` through the model cascade, one batch per stage.
+
+        Each stage only sees the images the previous stages were not confident about, the last stage
+        answers for whatever is left.
+        """
+        results: List[Optional[GapDetection]] = [None] * len(sources)
+        remaining = list(range(len(sources)))
+        for position, stage in enumerate(self._stages):
+            is_last = position == len(self._stages) - 1
+            detections = stage.detector.predict(
+                [sources[index] for index in remaining],
+                conf=self._settings.conf,
+                classes=[0],
+                iou=self._settings.iou,
+                imgsz=stage.imgsz,
+                **kwargs,
             )
 
-            # Set as environment variable that YOLO will use
-            os.environ["ULTRALYTICS_ORT_PROVIDERS"] = str(providers)
-            os.environ["OMP_NUM_THREADS"] = "1"
-            os.environ["OMP_WAIT_POLICY"] = "PASSIVE"
+            escalated = []
+            for index, image_detections in zip(remaining, detections, strict=True):
+                detection = self._top_detection(image_detections, stage=stage.name)
+                if is_last or detection.confidence >= stage.min_confidence:
+                    results[index] = detection
+                else:
+                    escalated.append(index)
+
+            remaining = escalated
+            if not remaining:
+                break
+
+        return [result for result in results if result is not None]
+
+    def warm_up(self, images: Sequence[ImageSource], batch_sizes: Iterable[int], rounds: int = 1) -> Dict[str, float]:
+        """Run every cascade stage on batches of each size so sessions are optimized before real traffic.
+
+        Returns the seconds each stage spent warming up.
+        """
+        timings: Dict[str, float] = {}
+        for stage in self._stages:
+            started = time.perf_counter()
+            for _ in range(rounds):
+                for batch_size in batch_sizes:
+                    batch = [images[index % len(images)] for index in range(batch_size)]
+                    stage.detector.predict(
+                        batch,
+                        conf=self._settings.conf,
+                        classes=[0],
+                        iou=self._settings.iou,
+                        imgsz=stage.imgsz,
+                    )
+
+            timings[stage.name] = time.perf_counter() - started
+
+        return timings
+
+    @staticmethod
+    def _top_detection(detections: np.ndarray, stage: str) -> GapDetection:
+        if not len(detections):
+            return GapDetection(box=[], confidence=0.0, stage=stage)
+
+        # Detections are sorted by confidence, the first row is the most likely gap
+        box_with_conf = detections[0].tolist()
+        return GapDetection(box=box_with_conf[:-2], confidence=box_with_conf[-2], stage=stage)
+
+    def _build_cascade(self) -> List[_CascadeStage]:
+        imgsz = self._settings.imgsz
+        final = _CascadeStage(name=f"multi_cls@{imgsz}", detector=self.multi_cls_model, imgsz=imgsz, min_confidence=0.0)
+        if not self._settings.cascade:
+            return [final]
+
+        first_imgsz = self._settings.cascade_imgsz or imgsz
+        first_detector = self.single_cls_model if self.single_cls_model is not None else self.multi_cls_model
+        first = _CascadeStage(
+            name=f"{self._settings.cascade_model}@{first_imgsz}",
+            detector=first_detector,
+            imgsz=first_imgsz,
+            min_confidence=self._settings.cascade_min_confidence,
+        )
+        if first.name == final.name:
+            return [final]
+
+        return [first, final]
+
+    def _load_detector(self, name: str) -> Detector:
+        model_path = self._model_path(name)
+        if not model_path.is_file():
+            msg = f"Model {model_path} not found"
+            if self._settings.precision != "fp32":
+                msg += f", build it with `sigil quantize --precision {self._settings.precision}`"
+            raise FileNotFoundError(msg)
+
+        if self._settings.engine == "ultralytics":
+            from sigil.services.detectors.ultralytics_detector import UltralyticsDetector
+
+            return UltralyticsDetector(model_path=model_path, imgsz=self._settings.imgsz)
+
+        return OnnxDetector(
+            model_path=self.profile.model_path(name) if self.profile is not None else model_path,
+            session_options=self._session_options,
+            providers=self._providers,
+            imgsz=self._settings.imgsz,
+        )
+
+    def _model_path(self, name: str) -> Path:
+        return self._settings.models_dir / model_filename(name, self._settings.precision)
+
+    def _load_profile(self) -> Optional[TuningProfile]:
+        if not self._settings.tuned or self._settings.engine != "onnx":
+            return None
+
+        sources = {name: self._model_path(name) for name in MODEL_NAMES if self._model_path(name).is_file()}
+        directory = tuning_dir(self._settings.models_dir, self._settings.precision, self._providers)
+        return load_profile(directory, sources=sources)
+
+    @staticmethod
+    def _show_result(source: ImageSource, box: List[float]) -> None:
+        image = Image.fromarray(np.ascontiguousarray(load_image(source)))
+        ImageDraw.Draw(image).rectangle(box, outline=(255, 0, 0), width=2)
+        image.show()
@@ -0,0 +1,206 @@
+import asyncio
+import contextlib
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Protocol
+
+from loguru import logger
+
+from sigil.core import metrics
+from sigil.core.config.settings import InferenceSettings, RecognizerSettings
+from sigil.infrastructure.exceptions import ApplicationError, ServiceUnavailableError
+from sigil.services.recognizer import RecognizerService, model_filename
+from sigil.services.tuning import inference_workers
+from sigil.services.warmup import warm_up_recognizer
+
+DEFAULT_VERSION = "default"  # models placed directly in ``models_dir``
+MODEL_NAME = "multi_cls"  # every version must at least provide the final cascade stage
+
+
+class ModelVersionNotFoundError(ApplicationError):
+    """Class for errors raised when a requested model version is not in the registry."""
+
+    status_code = 404
+
+    def __init__(self, detail: str = "Model version not found", error_code: str = "model_version_not_found") -> None:
+        super().__init__(detail=detail, error_code=error_code)
+
+
+@dataclass
+class LoadedModel:
+    version: str
+    recognizer: RecognizerService
+    inflight: int = 0
+    retired: bool = False
+
+
+@dataclass
+class SwapResult:
+    active: str
+    previous: Optional[str]
+    load_seconds: float
+    warmup_seconds: float
+
+
+@dataclass
+class ModelStatus:
+    active: Optional[str]
+    loaded: List[str]
+    versions: List[str]
+
+
+class ModelManager(Protocol):
+    """Model versions as the admin API sees them: the in-process ``ModelRegistry`` or the inference servers."""
+
+    async def status(self) -> ModelStatus: ...
+
+    async def activate(self, version: Optional[str] = None, warm_up: bool = True) -> SwapResult: ...
+
+
+class ModelRegistry:
+    """Versions of the YOLO models kept under ``models_dir`` and the one currently serving.
+
+    A version is a subdirectory holding ``multi_cls`` (and ``single_cls`` for the cascade) in the configured precision;
+    models placed directly in ``models_dir`` form the ``default`` version. Activating a version loads and
+    warms it up in the background, then swaps it in atomically. Batches already running keep the
+    session they started with, and the old version is unloaded once the last of them finishes.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[RecognizerSettings] = None,
+        inference_settings: Optional[InferenceSettings] = None,
+    ) -> None:
+        self._settings = settings if settings else RecognizerSettings()
+        self._inference_settings = inference_settings if inference_settings else InferenceSettings()
+
+        self._active: Optional[LoadedModel] = None
+        self._retired: List[LoadedModel] = []
+        self._lock = threading.Lock()
+        self._swap_lock = asyncio.Lock()
+
+    @property
+    def active_version(self) -> Optional[str]:
+        return self._active.version if self._active else None
+
+    @property
+    def loaded_versions(self) -> List[str]:
+        with self._lock:
+            models = ([self._active] if self._active else []) + self._retired
+            return [model.version for model in models]
+
+    async def status(self) -> ModelStatus:
+        return ModelStatus(active=self.active_version, loaded=self.loaded_versions, versions=self.versions())
+
+    def versions(self) -> List[str]:
+        """Versions available on disk, ``default`` first and the rest in name order."""
+        models_dir = self._settings.models_dir
+        if not models_dir.is_dir():
+            return []
+
+        model_file = model_filename(MODEL_NAME, self._settings.precision)
+        versions = [DEFAULT_VERSION] if (models_dir / model_file).is_file() else []
+        versions += sorted(path.name for path in models_dir.iterdir() if (path / model_file).is_file())
+        return versions
+
+    def resolve(self, version: Optional[str] = None) -> str:
+        """``version`` if it exists, otherwise the configured one, ``default`` or the last version by name."""
+        available = self.versions()
+        version = version or self._settings.model_version
+        if version is None and available:
+            version = DEFAULT_VERSION if DEFAULT_VERSION in available else available[-1]
+
+        if version is None or version not in available:
+            msg = f"Model version {version!r} not found in {self._settings.models_dir}"
+            raise ModelVersionNotFoundError(detail=msg)
+
+        return version
+
+    def inference_workers(self) -> int:
+        """Inference threads for the executor: ``SIGIL_INFERENCE_WORKERS`` when set, else what ``sigil tune`` picked.
+
+        Read once at startup, versions activated later keep the worker count.
+        """
+        with self._lock:
+            profile = self._active.recognizer.profile if self._active else None
+
+        return inference_workers(self._inference_settings, profile)
+
+    def build(self, version: Optional[str] = None) -> RecognizerService:
+        """Load a recognizer for ``version`` without activating it."""
+        models_dir = version_dir(self._settings.models_dir, self.resolve(version))
+        return RecognizerService(settings=self._settings.model_copy(update={"models_dir": models_dir}))
+
+    async def activate(self, version: Optional[str] = None, warm_up: bool = True) -> SwapResult:
+        """Load, optionally warm up and swap in ``version``; concurrent activations run one at a time."""
+        async with self._swap_lock:
+            version = self.resolve(version)
+
+            started = time.perf_counter()
+            recognizer = await asyncio.to_thread(self.build, version)
+            load_seconds = time.perf_counter() - started
+
+            # Warm-up runs on its own thread so serving workers keep answering on the old version
+            started = time.perf_counter()
+            if warm_up and self._inference_settings.warmup:
+                await asyncio.to_thread(warm_up_recognizer, recognizer, self._inference_settings)
+            warmup_seconds = time.perf_counter() - started
+
+            metrics.MODEL_LOAD_SECONDS.set(load_seconds, version=version)
+            if warm_up and self._inference_settings.warmup:
+                metrics.MODEL_WARMUP_SECONDS.set(warmup_seconds, version=version)
+
+            with self._lock:
+                previous, self._active = self._active, LoadedModel(version=version, recognizer=recognizer)
+                if previous is not None:
+                    previous.retired = True
+                    self._retired.append(previous)
+                    self._unload_drained()
+
+            logger.info(f"Model version {version} active (load {load_seconds:.2f}s, warm-up {warmup_seconds:.2f}s)")
+            return SwapResult(
+                active=version,
+                previous=previous.version if previous else None,
+                load_seconds=load_seconds,
+                warmup_seconds=warmup_seconds,
+            )
+
+    async def warm_up(self) -> None:
+        """Warm up the active version, used once at startup."""
+        if not self._inference_settings.warmup:
+            return
+
+        with self.acquire() as model:
+            started = time.perf_counter()
+            await asyncio.to_thread(warm_up_recognizer, model.recognizer, self._inference_settings)
+            metrics.MODEL_WARMUP_SECONDS.set(time.perf_counter() - started, version=model.version)
+
+    @contextlib.contextmanager
+    def acquire(self) -> Iterator[LoadedModel]:
+        """Pin the active version for the duration of a batch so a swap can't unload it mid-inference."""
+        with self._lock:
+            model = self._active
+            if model is None:
+                raise ServiceUnavailableError(detail="No model version is loaded", error_code="model_not_loaded")
+
+            model.inflight += 1
+
+        try:
+            yield model
+        finally:
+            with self._lock:
+                model.inflight -= 1
+                if model.retired:
+                    self._unload_drained()
+
+    def _unload_drained(self) -> None:
+        # Dropping the last reference releases the ONNX Runtime sessions and their memory
+        for model in [model for model in self._retired if model.inflight == 0]:
+            self._retired.remove(model)
+            logger.info(f"Model version {model.version} unloaded")
+
+
+def version_dir(models_dir: Path, version: str) -> Path:
+    return models_dir if version == DEFAULT_VERSION else models_dir / version
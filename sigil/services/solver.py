@@ -0,0 +1,323 @@
+import asyncio
+import base64
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple, cast
+
+import numpy as np
+from fastapi import HTTPException
+from loguru import logger
+
+from sigil.core import metrics
+from sigil.core.config.settings import BackgroundSettings, MatcherSettings, RecognizerSettings
+from sigil.core.timing import stage_timer
+from sigil.infrastructure.fetcher import ImageDownloadError, ImageFetcher
+from sigil.schemas.requests import SlideRequestSchema
+from sigil.schemas.responses import SlideResponseSchema
+from sigil.services.admission import PRIORITY_LANES, Priority, check_deadline, deadline_after
+from sigil.services.backgrounds import BackgroundIndex
+from sigil.services.batching import GapScheduler
+from sigil.services.cache import CacheValue, ResultCache
+from sigil.services.images import DecodedImage, ImageDecodeError, decode, decode_target, rescale
+from sigil.services.matcher import PieceMatch, PieceMatcher
+
+# Left edge of the opaque region inside the usual slider piece image, used when no piece is sent
+DEFAULT_PIECE_OFFSET = 8
+
+
+@dataclass
+class SlideSolution:
+    result: SlideResponseSchema
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+
+class SolverService:
+    """Turns a slide request into a solution: loads and decodes the puzzle image, then locates the gap.
+
+    Puzzles drawn on a known background are solved by differencing against the background pool,
+    everything else goes through batched model inference. When the piece image is sent it is matched
+    against the puzzle: a clear match skips the model entirely, otherwise it refines the detected gap.
+    """
+
+    def __init__(
+        self,
+        scheduler: GapScheduler,
+        fetcher: ImageFetcher,
+        cache: Optional[ResultCache] = None,
+        backgrounds: Optional[BackgroundIndex] = None,
+        matcher: Optional[PieceMatcher] = None,
+        recognizer_settings: Optional[RecognizerSettings] = None,
+        background_settings: Optional[BackgroundSettings] = None,
+        matcher_settings: Optional[MatcherSettings] = None,
+    ) -> None:
+        self._scheduler = scheduler
+        self._fetcher = fetcher
+        self._cache = cache
+        self._backgrounds = backgrounds
+        self._matcher = matcher
+        self._recognizer_settings = recognizer_settings if recognizer_settings else RecognizerSettings()
+        self._background_settings = background_settings if background_settings else BackgroundSettings()
+        self._matcher_settings = matcher_settings if matcher_settings else MatcherSettings()
+        self._decode_target = decode_target(self._recognizer_settings)
+        self._learning: Set[asyncio.Task] = set()
+
+    @property
+    def capacity(self) -> int:
+        """Number of requests the inference scheduler can hold in flight without queueing."""
+        return self._scheduler.capacity
+
+    async def solve(self, request: SlideRequestSchema, received_at: Optional[float] = None) -> SlideSolution:
+        """Solve ``request``; its ``deadline_ms`` counts from ``received_at``, a ``time.monotonic()`` value."""
+        request.validate_input()
+
+        deadline = deadline_after(request.deadline_ms, start=received_at)
+        check_deadline(deadline, stage="download")
+
+        puzzle_data, piece_data = await self._load_images(request, deadline=deadline)
+        return await self.solve_bytes(
+            puzzle_data,
+            piece_data,
+            shrink_size=request.shrink_size,
+            deadline=deadline,
+            priority=request.priority or "normal",
+        )
+
+    async def solve_bytes(
+        self,
+        puzzle_data: bytes,
+        piece_data: Optional[bytes] = None,
+        shrink_size: Optional[float] = 340.0,
+        deadline: Optional[float] = None,
+        priority: Priority = "normal",
+    ) -> SlideSolution:
+        """Solve from already encoded images, as sent by the upload endpoint or loaded by :meth:`solve`.
+
+        Requests still waiting for inference when ``deadline`` passes are dropped with a 504, ``priority``
+        picks their scheduling lane.
+        """
+        # Decode straight from the request buffers, the images never touch the filesystem
+        try:
+            image, piece, scale = await asyncio.to_thread(_decode_images, puzzle_data, piece_data, self._decode_target)
+        except ImageDecodeError as e:
+            logger.error(str(e))
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if self._cache is None:
+            return await self._infer(
+                image, piece, shrink_size=shrink_size, scale=scale, deadline=deadline, priority=priority
+            )
+
+        # Identical puzzles share one cache entry and concurrent duplicates share one inference,
+        # a model swap starts over so answers of the previous version aren't served
+        key = self._cache.make_key(
+            image,
+            conf=self._recognizer_settings.conf,
+            imgsz=self._recognizer_settings.imgsz,
+            model=self._scheduler.model_version,
+            shrink_size=shrink_size,
+            piece=self._cache.make_key(piece) if piece is not None else None,
+        )
+        meta: Dict[str, Any] = {}
+
+        async def compute() -> CacheValue:
+            solution = await self._infer(
+                image, piece, shrink_size=shrink_size, scale=scale, deadline=deadline, priority=priority
+            )
+            meta.update(solution.meta)
+            return solution.result.model_dump()
+
+        value, status = await self._cache.get_or_compute(key, compute, deadline=deadline, lane=PRIORITY_LANES[priority])
+        return SlideSolution(
+            result=SlideResponseSchema.model_validate(value),
+            meta={**meta, "cache": status, **self._cache.stats()},
+        )
+
+    async def _infer(
+        self,
+        image: np.ndarray,
+        piece: Optional[np.ndarray],
+        shrink_size: Optional[float],
+        scale: float = 1.0,
+        deadline: Optional[float] = None,
+        priority: Priority = "normal",
+    ) -> SlideSolution:
+        matcher = self._matcher if piece is not None else None
+
+        if self._backgrounds is not None:
+            background = await asyncio.to_thread(self._backgrounds.lookup, image)
+            if background is not None and background.confidence >= self._background_settings.min_confidence:
+                refined = await self._refine(image=image, piece=piece, box=background.box)
+                return self._make_solution(
+                    x=self._slide_offset(box=background.box, match=refined),
+                    successful=True,
+                    confidence=background.confidence,
+                    meta={"stage": "background", **_match_meta(refined)},
+                    image_width=image.shape[1],
+                    shrink_size=shrink_size,
+                    scale=scale,
+                )
+
+        # A piece that stands out clearly in the puzzle locates the gap without the model
+        if matcher is not None and piece is not None:
+            template = await asyncio.to_thread(matcher.match, image, piece)
+            if (
+                template is not None
+                and template.score >= self._matcher_settings.fast_path_min_score
+                and template.margin >= self._matcher_settings.fast_path_min_margin
+            ):
+                return self._make_solution(
+                    x=self._slide_offset(box=[], match=template),
+                    successful=True,
+                    confidence=template.score,
+                    meta={"stage": "template", **_match_meta(template)},
+                    image_width=image.shape[1],
+                    shrink_size=shrink_size,
+                    scale=scale,
+                )
+
+        # Inference is batched with concurrent requests and runs off the event loop
+        prediction = await self._scheduler.submit(image, priority=priority, deadline=deadline)
+
+        if prediction.confidence >= self._background_settings.learn_min_confidence:
+            self._learn_background(image=image, box=prediction.box)
+
+        refined = await self._refine(image=image, piece=piece, box=prediction.box)
+        return self._make_solution(
+            x=self._slide_offset(box=prediction.box, match=refined),
+            successful=prediction.confidence > 0.5,
+            confidence=prediction.confidence,
+            meta={
+                "stage": "model",
+                "model": prediction.stage,
+                "model_version": prediction.version,
+                "batch_size": prediction.batch_size,
+                **_match_meta(refined),
+            },
+            image_width=image.shape[1],
+            shrink_size=shrink_size,
+            scale=scale,
+        )
+
+    async def _refine(self, image: np.ndarray, piece: Optional[np.ndarray], box: List[float]) -> Optional[PieceMatch]:
+        """Match the piece within a narrow band around ``box``; ``None`` when there is nothing to refine with."""
+        if self._matcher is None or piece is None or not box:
+            return None
+
+        match = await asyncio.to_thread(self._matcher.match, image, piece, box)
+        if match is None or match.score < self._matcher_settings.min_score:
+            return None
+
+        return match
+
+    @staticmethod
+    def _slide_offset(box: List[float], match: Optional[PieceMatch]) -> float:
+        """Distance in puzzle pixels the piece has to travel to cover the gap."""
+        if match is not None:
+            return match.x - match.offset_x
+
+        return box[0] - DEFAULT_PIECE_OFFSET if box else 0.0
+
+    @staticmethod
+    def _make_solution(
+        x: float,
+        successful: bool,
+        confidence: float,
+        meta: Dict[str, Any],
+        image_width: int,
+        shrink_size: Optional[float],
+        scale: float = 1.0,
+    ) -> SlideSolution:
+        metrics.CONFIDENCE.observe(confidence)
+
+        # Back to the resolution the client sent, the puzzle may have been decoded at a reduced scale
+        x, width = x * scale, image_width * scale
+
+        # Clients render the puzzle ``shrink_size`` pixels wide, so the offset is scaled to that width
+        if shrink_size:
+            x = x * shrink_size / width
+
+        result = SlideResponseSchema(status="successful" if successful else "failed", x=x)
+        return SlideSolution(result=result, meta=meta)
+
+    def _learn_background(self, image: np.ndarray, box: List[float]) -> None:
+        """Feed a confidently solved puzzle to the background pool without delaying the response."""
+        if self._backgrounds is None or not self._background_settings.learn or not box:
+            return
+
+        task = asyncio.create_task(asyncio.to_thread(self._backgrounds.learn, image, box))
+        self._learning.add(task)
+        task.add_done_callback(self._on_learned)
+
+    def _on_learned(self, task: asyncio.Task) -> None:
+        self._learning.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error learning background: {task.exception()}")
+
+    async def _load_images(
+        self,
+        request: SlideRequestSchema,
+        deadline: Optional[float] = None,
+    ) -> Tuple[bytes, Optional[bytes]]:
+        """Return the encoded puzzle and piece images, downloading any URLs concurrently until ``deadline``."""
+        puzzle_data = _decode_base64(request.puzzle_image_b64) if request.puzzle_image_b64 else None
+        piece_data = _decode_base64(request.piece_image_b64) if request.piece_image_b64 else None
+
+        urls = {}
+        if puzzle_data is None and request.puzzle_image_url:
+            urls["puzzle"] = request.puzzle_image_url
+        if piece_data is None and request.piece_image_url:
+            urls["piece"] = request.piece_image_url
+
+        if urls:
+            started = time.perf_counter()
+            try:
+                fetched = await self._fetcher.fetch_many(*urls.values(), deadline=deadline)
+                downloaded = dict(zip(urls, fetched, strict=True))
+            except ImageDownloadError as e:
+                # A download cut short by the request's own deadline is a timeout, not a bad URL
+                check_deadline(deadline, stage="download")
+                raise HTTPException(status_code=400, detail=e.detail)
+            finally:
+                metrics.DOWNLOAD_SECONDS.observe(time.perf_counter() - started)
+
+            puzzle_data = downloaded.get("puzzle", puzzle_data)
+            piece_data = downloaded.get("piece", piece_data)
+
+        return cast(bytes, puzzle_data), piece_data
+
+
+def _match_meta(match: Optional[PieceMatch]) -> Dict[str, Any]:
+    return {"match_score": round(match.score, 4)} if match is not None else {}
+
+
+def _decode_images(
+    puzzle_data: bytes,
+    piece_data: Optional[bytes],
+    target: Optional[int],
+) -> Tuple[np.ndarray, Optional[np.ndarray], float]:
+    """Decode the puzzle, possibly at a reduced scale, and the piece at the same scale; returns the scale too."""
+    with stage_timer.stage("decode"):
+        puzzle = _timed_decode(puzzle_data, mode="RGB", target=target)
+        # The piece keeps its alpha channel, the matcher uses it as the template mask
+        piece = rescale(_timed_decode(piece_data, mode="RGBA").pixels, puzzle.scale) if piece_data else None
+
+    return puzzle.pixels, piece, puzzle.scale
+
+
+def _timed_decode(data: bytes, mode: str, target: Optional[int] = None) -> DecodedImage:
+    started = time.perf_counter()
+    decoder = "invalid"
+    try:
+        decoded = decode(data, mode=mode, target=target)
+        decoder = decoded.decoder
+        return decoded
+    finally:
+        metrics.DECODE_SECONDS.observe(time.perf_counter() - started, decoder=decoder)
+
+
+def _decode_base64(data: str) -> bytes:
+    # Accept both data URIs and raw base64 strings
+    if "," in data:
+        data = data.split(",", 1)[1]
+
+    return base64.b64decode(data)
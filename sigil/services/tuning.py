@@ -0,0 +1,333 @@
+import hashlib
+import json
+import os
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Sequence
+
+import numpy as np
+import onnxruntime as ort
+from loguru import logger
+
+from sigil.core.config.settings import InferenceSettings, RecognizerSettings
+
+ExecutionMode = Literal["sequential", "parallel"]
+OptimizationLevel = Literal["disabled", "basic", "extended", "all"]
+
+EXECUTION_MODES: Dict[str, ort.ExecutionMode] = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+OPTIMIZATION_LEVELS: Dict[str, ort.GraphOptimizationLevel] = {
+    "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+TUNED_DIR = "tuned"  # under a model version directory, next to the models it was tuned for
+PROFILE_FILE = "profile.json"
+
+
+@dataclass
+class TuningCandidate:
+    execution_mode: ExecutionMode
+    graph_optimization_level: OptimizationLevel
+    workers: int  # inference threads sharing the sessions, ``SIGIL_INFERENCE_WORKERS``
+    intra_op_num_threads: int
+    inter_op_num_threads: int = 1
+
+    def describe(self) -> str:
+        threads = f"{self.workers}x{self.intra_op_num_threads}"
+        if self.execution_mode == "parallel":
+            threads += f"+{self.inter_op_num_threads}"
+        return f"{self.execution_mode} {self.graph_optimization_level} {threads}"
+
+    def settings_update(self) -> Dict[str, Any]:
+        """The ``RecognizerSettings`` fields this candidate sets; the worker count belongs to ``InferenceSettings``."""
+        return {
+            "execution_mode": self.execution_mode,
+            "graph_optimization_level": self.graph_optimization_level,
+            "intra_op_num_threads": self.intra_op_num_threads,
+            "inter_op_num_threads": self.inter_op_num_threads,
+        }
+
+
+@dataclass
+class TuningResult:
+    candidate: TuningCandidate
+    latency_ms: float  # median time of one batch-1 call while every worker is busy
+    throughput: float  # images per second over all batch sizes
+
+
+@dataclass
+class TuningProfile:
+    """Session settings ``sigil tune`` picked for one host, saved with the models it optimized.
+
+    ``models`` maps each model name to the SHA-256 of the file it was optimized from, so a profile is
+    ignored once its models are replaced.
+    """
+
+    host: str
+    precision: str
+    onnxruntime: str
+    candidate: TuningCandidate
+    latency_ms: float
+    throughput: float
+    batch_sizes: List[int]
+    models: Dict[str, str] = field(default_factory=dict)
+    directory: Optional[Path] = None  # where the profile was loaded from, not saved
+
+    @property
+    def workers(self) -> int:
+        return self.candidate.workers
+
+    def model_path(self, name: str) -> Path:
+        if self.directory is None:
+            msg = "Profile was not loaded from disk"
+            raise ValueError(msg)
+
+        return self.directory / f"{name}.onnx"
+
+    def apply(self, settings: RecognizerSettings) -> RecognizerSettings:
+        """``settings`` with the tuned session settings, except the ones set explicitly."""
+        tuned = self.candidate.settings_update()
+        update = {name: value for name, value in tuned.items() if name not in settings.model_fields_set}
+        return settings.model_copy(update=update)
+
+    def save(self, directory: Path) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        data = asdict(self)
+        del data["directory"]
+        path = directory / PROFILE_FILE
+        path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+        return path
+
+    @classmethod
+    def load(cls, directory: Path) -> "TuningProfile":
+        data = json.loads((directory / PROFILE_FILE).read_text())
+        candidate = TuningCandidate(**data.pop("candidate"))
+        return cls(candidate=candidate, directory=directory, **data)
+
+
+def session_options(settings: RecognizerSettings, optimized: bool = False) -> ort.SessionOptions:
+    """ONNX Runtime session options from ``settings``; ``optimized`` models were already optimized by ``sigil tune``."""
+    options = ort.SessionOptions()
+
+    # Enable memory pattern optimization and memory reuse (can help reduce memory copies)
+    options.enable_mem_pattern = True
+    options.enable_mem_reuse = True
+
+    # A saved optimized graph is loaded as is instead of being optimized again on every start
+    level = "disabled" if optimized else settings.graph_optimization_level
+    options.graph_optimization_level = OPTIMIZATION_LEVELS[level]
+    options.execution_mode = EXECUTION_MODES[settings.execution_mode]
+    options.inter_op_num_threads = settings.inter_op_num_threads
+
+    # Bound intra-op threads so concurrent inference workers don't oversubscribe the CPU
+    if settings.intra_op_num_threads:
+        options.intra_op_num_threads = settings.intra_op_num_threads
+
+    return options
+
+
+def host_key(providers: Sequence[Any]) -> str:
+    """Names the hardware a profile was tuned on: optimized graphs and thread counts only fit that hardware."""
+    device = "cuda" if any(_provider_name(provider) == "CUDAExecutionProvider" for provider in providers) else "cpu"
+    fingerprint = hashlib.sha256(_cpu_model().encode()).hexdigest()[:8]
+    return f"{platform.machine().lower()}-{os.cpu_count() or 1}cpu-{device}-{fingerprint}"
+
+
+def tuning_dir(models_dir: Path, precision: str, providers: Sequence[Any]) -> Path:
+    return models_dir / TUNED_DIR / host_key(providers) / precision
+
+
+def load_profile(directory: Path, sources: Dict[str, Path]) -> Optional[TuningProfile]:
+    """The profile in ``directory`` if it was tuned for ``sources`` with this ONNX Runtime, otherwise ``None``."""
+    if not (directory / PROFILE_FILE).is_file():
+        return None
+
+    try:
+        profile = TuningProfile.load(directory)
+    except (ValueError, TypeError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable tuning profile in {directory}: {e}")
+        return None
+
+    if profile.onnxruntime != ort.__version__:
+        logger.warning(
+            f"Ignoring tuning profile in {directory}: tuned with onnxruntime {profile.onnxruntime}, "
+            f"running {ort.__version__}; re-run `sigil tune`"
+        )
+        return None
+
+    for name, source in sources.items():
+        if profile.models.get(name) != file_digest(source) or not profile.model_path(name).is_file():
+            logger.warning(f"Ignoring tuning profile in {directory}: {source.name} changed; re-run `sigil tune`")
+            return None
+
+    return profile
+
+
+def inference_workers(settings: InferenceSettings, profile: Optional[TuningProfile]) -> int:
+    """``SIGIL_INFERENCE_WORKERS`` when set, otherwise the tuned worker count, otherwise the default."""
+    if profile is None or "workers" in settings.model_fields_set:
+        return settings.workers
+
+    return profile.workers
+
+
+def candidates(
+    cpu_count: Optional[int] = None,
+    max_workers: int = 8,
+    levels: Iterable[OptimizationLevel] = ("basic", "extended", "all"),
+) -> List[TuningCandidate]:
+    """Configurations to sweep: every optimization level and execution mode for each way of splitting
+    the cores into workers x intra-op threads, with worker counts in powers of two."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    splits = [1 << power for power in range(cpu_count.bit_length()) if 1 << power <= min(cpu_count, max_workers)]
+
+    result: List[TuningCandidate] = []
+    for workers in splits:
+        threads = max(1, cpu_count // workers)
+        for level in levels:
+            result.append(TuningCandidate("sequential", level, workers=workers, intra_op_num_threads=threads))
+            if threads >= 4:
+                # Independent branches run on an inter-op pool, each node still gets the intra-op pool
+                result.append(
+                    TuningCandidate(
+                        "parallel",
+                        level,
+                        workers=workers,
+                        intra_op_num_threads=threads // 2,
+                        inter_op_num_threads=2,
+                    )
+                )
+
+    return result
+
+
+def tune(
+    settings: RecognizerSettings,
+    images: Sequence[np.ndarray],
+    batch_sizes: Sequence[int],
+    sweep: Optional[Sequence[TuningCandidate]] = None,
+    rounds: int = 5,
+    latency_slack: float = 0.25,
+    on_result: Optional[Callable[[TuningResult], None]] = None,
+) -> List[TuningResult]:
+    """Measure every candidate of ``sweep`` on the recognizer cascade ``settings`` loads.
+
+    Returns the results with the pick first: the highest throughput among the candidates whose latency
+    is within ``latency_slack`` of the lowest one.
+    """
+    results = []
+    for candidate in sweep or candidates():
+        result = _measure(settings, candidate, images=images, batch_sizes=batch_sizes, rounds=rounds)
+        if on_result is not None:
+            on_result(result)
+        results.append(result)
+
+    fastest = min(result.latency_ms for result in results)
+    eligible = [result for result in results if result.latency_ms <= fastest * (1 + latency_slack)]
+    best = max(eligible, key=lambda result: (result.throughput, -result.latency_ms))
+    return [best] + [result for result in results if result is not best]
+
+
+def save_profile(
+    settings: RecognizerSettings,
+    result: TuningResult,
+    sources: Dict[str, Path],
+    providers: Sequence[Any],
+    batch_sizes: Sequence[int],
+) -> TuningProfile:
+    """Write the optimized graph of every model in ``sources`` and the profile that loads them."""
+    directory = tuning_dir(settings.models_dir, settings.precision, providers)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    tuned = TuningProfile(
+        host=host_key(providers),
+        precision=settings.precision,
+        onnxruntime=ort.__version__,
+        candidate=result.candidate,
+        latency_ms=result.latency_ms,
+        throughput=result.throughput,
+        batch_sizes=list(batch_sizes),
+        directory=directory,
+    )
+    options = session_options(settings.model_copy(update=result.candidate.settings_update()))
+    # ORT warns that the saved graph is hardware specific, which is why profiles are kept per host
+    options.log_severity_level = 3
+    for name, source in sources.items():
+        options.optimized_model_filepath = str(tuned.model_path(name))
+        ort.InferenceSession(str(source), sess_options=options, providers=list(providers))
+        tuned.models[name] = file_digest(source)
+
+    tuned.save(directory)
+    return tuned
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _measure(
+    settings: RecognizerSettings,
+    candidate: TuningCandidate,
+    images: Sequence[np.ndarray],
+    batch_sizes: Sequence[int],
+    rounds: int,
+) -> TuningResult:
+    from sigil.services.recognizer import RecognizerService
+
+    recognizer = RecognizerService(
+        settings=settings.model_copy(update={"tuned": False, **candidate.settings_update()}),
+    )
+    recognizer.warm_up(images, batch_sizes=batch_sizes)
+
+    def timed_call(batch: List[np.ndarray]) -> float:
+        started = time.perf_counter()
+        recognizer.detect_gaps(batch)
+        return time.perf_counter() - started
+
+    # Every worker keeps calling at once, as the executor threads do under load
+    latencies: List[float] = []
+    solved, elapsed = 0, 0.0
+    with ThreadPoolExecutor(max_workers=candidate.workers) as pool:
+        for batch_size in batch_sizes:
+            batch = [images[index % len(images)] for index in range(batch_size)]
+            calls = rounds * candidate.workers
+            started = time.perf_counter()
+            timings = list(pool.map(timed_call, [batch] * calls))
+            elapsed += time.perf_counter() - started
+            solved += calls * batch_size
+            if batch_size == min(batch_sizes):
+                latencies = timings
+
+    return TuningResult(
+        candidate=candidate,
+        latency_ms=statistics.median(latencies) * 1000,
+        throughput=solved / elapsed if elapsed else 0.0,
+    )
+
+
+def _provider_name(provider: Any) -> str:
+    return provider[0] if isinstance(provider, tuple) else str(provider)
+
+
+def _cpu_model() -> str:
+    # Optimized CPU graphs use kernels and layouts picked for the instruction set they were built on
+    cpuinfo = Path("/proc/cpuinfo")
+    if cpuinfo.is_file():
+        for line in cpuinfo.read_text().splitlines():
+            if line.startswith("model name"):
+                return line.split(":", 1)[1].strip()
+
+    return platform.processor() or platform.machine()
@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+from loguru import logger
+
+from sigil.core.config.settings import InferenceSettings
+from sigil.services.images import IMAGE_SUFFIXES, decode_image
+from sigil.services.recognizer import RecognizerService
+
+SYNTHETIC_SIZE = (344, 552)  # (height, width) of the usual puzzle
+
+
+@dataclass
+class Readiness:
+    status: Literal["starting", "ready", "failed"] = "starting"
+    detail: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+
+def warm_up_recognizer(recognizer: RecognizerService, settings: InferenceSettings) -> Dict[str, float]:
+    """Run warm-up inferences at every batch size the scheduler can form.
+
+    Session creation, graph optimization and first-run kernel selection take seconds, so they are
+    paid here instead of by the first requests after a deploy.
+    """
+    images = load_warmup_images(settings.warmup_images_dir)
+    timings = recognizer.warm_up(
+        images,
+        batch_sizes=range(1, settings.batch_max_size + 1),
+        rounds=settings.warmup_rounds,
+    )
+    logger.info(f"Warm-up finished: {', '.join(f'{name} {seconds:.2f}s' for name, seconds in timings.items())}")
+    return timings
+
+
+def load_warmup_images(directory: Optional[Path] = None) -> List[np.ndarray]:
+    """Images from ``directory`` when given, otherwise a synthetic puzzle-sized image."""
+    if directory:
+        paths = sorted(path for path in Path(directory).iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+        images = [decode_image(path.read_bytes()) for path in paths]
+        if images:
+            return images
+
+        logger.warning(f"No warm-up images in {directory}, using a synthetic image")
+
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, size=(*SYNTHETIC_SIZE, 3), dtype=np.uint8)]
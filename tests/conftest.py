@@ -0,0 +1,25 @@
+from pathlib import Path
+from typing import AsyncGenerator
+
+import httpx
+import pytest
+from sigil.benchmarks.stub import make_stub_models
+from sigil.core.config.settings import RecognizerSettings, Settings
+
+from tests.utils import app_client
+
+
+@pytest.fixture(scope="session")
+def models_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    return make_stub_models(tmp_path_factory.mktemp("models"))
+
+
+@pytest.fixture
+def settings(models_dir: Path) -> Settings:
+    return Settings(recognizer=RecognizerSettings(models_dir=models_dir))
+
+
+@pytest.fixture
+async def client(settings: Settings) -> AsyncGenerator[httpx.AsyncClient, None]:
+    async with app_client(settings=settings) as client:
+        yield client
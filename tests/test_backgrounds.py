@@ -0,0 +1,64 @@
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+from sigil.services.backgrounds import BackgroundIndex
+from sigil.services.images import decode_image
+
+from tests.utils import RESOURCES_DIR
+
+
+@pytest.fixture(scope="module")
+def background() -> np.ndarray:
+    return decode_image((RESOURCES_DIR / "background-2-2.jpeg").read_bytes())
+
+
+def cut_gap(background: np.ndarray, x: int, y: int = 120, size: int = 90) -> Tuple[np.ndarray, List[float]]:
+    """Draw a darkened, white-rimmed gap on ``background`` the way slide captchas do."""
+    puzzle = background.astype(np.int16)
+    puzzle[y : y + size, x : x + size] = puzzle[y : y + size, x : x + size] * 0.4 + 60
+    puzzle[[y, y + size - 1], x : x + size] = 255
+    return puzzle.clip(0, 255).astype(np.uint8), [x, y, x + size, y + size]
+
+
+def test_lookup_finds_gap_on_learnt_background(background: np.ndarray, tmp_path: Path) -> None:
+    index = BackgroundIndex(tmp_path)
+    for x in (50, 350):
+        index.learn(*cut_gap(background, x=x))
+
+    assert len(index) == 1
+    assert index.entries()[0]["observations"] == 2
+
+    puzzle, box = cut_gap(background, x=200, y=60)
+    match = BackgroundIndex(tmp_path).lookup(puzzle)
+
+    assert match is not None
+    assert match.confidence > 0.9
+    assert match.box == pytest.approx(box, abs=2)
+
+
+def test_lookup_ignores_unknown_backgrounds(background: np.ndarray, tmp_path: Path) -> None:
+    index = BackgroundIndex(tmp_path)
+    index.learn(background)
+
+    other = decode_image((RESOURCES_DIR / "background-1-1.jpeg").read_bytes())
+    assert index.lookup(other) is None
+
+
+def test_indexes_sharing_a_directory_merge_their_backgrounds(background: np.ndarray, tmp_path: Path) -> None:
+    other = decode_image((RESOURCES_DIR / "background-1-1.jpeg").read_bytes())
+    first, second = BackgroundIndex(tmp_path, flush_every=2), BackgroundIndex(tmp_path, flush_every=2)
+
+    assert first.learn(*cut_gap(background, x=50)) is None  # held until the batch is full
+    second.learn(other)
+    assert first.learn(*cut_gap(background, x=350)) == 0
+    second.flush()
+
+    merged = BackgroundIndex(tmp_path)
+    assert len(merged) == 2
+    assert [entry["observations"] for entry in merged.entries()] == [2, 1]
+    assert merged.lookup(cut_gap(background, x=200, y=60)[0]) is not None
+    # The first index picks up the second's background the next time it syncs
+    first.flush()
+    assert len(first) == 2
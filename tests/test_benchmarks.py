@@ -0,0 +1,58 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+from sigil.benchmarks.runner import STAGES, format_report, run_benchmarks, summarize
+from sigil.core.config.settings import Settings
+
+from tests.utils import RESOURCES_DIR
+
+pytestmark = pytest.mark.benchmark
+
+# Keep the default run quick; SIGIL_BENCH_REQUESTS raises it for real measurements
+REQUESTS = int(os.environ.get("SIGIL_BENCH_REQUESTS", "20"))
+
+
+def test_summarize_percentiles() -> None:
+    summary = summarize([index / 1000 for index in range(1, 101)])
+
+    assert summary["count"] == 100
+    assert summary["p50"] == pytest.approx(50.5)
+    assert summary["p99"] == pytest.approx(99.01)
+    assert summary["max"] == pytest.approx(100)
+
+
+async def test_benchmark_suite(tmp_path: Path) -> None:
+    images = [path.read_bytes() for path in sorted(RESOURCES_DIR.glob("background-*.jpeg"))]
+
+    report = await run_benchmarks(
+        settings=Settings(),
+        images=images,
+        concurrency_levels=(1, 4),
+        requests=REQUESTS,
+        use_stub=True,
+    )
+
+    # Set SIGIL_BENCH_OUTPUT to keep the report and diff it between commits
+    output = Path(os.environ.get("SIGIL_BENCH_OUTPUT", tmp_path / "bench.json"))
+    output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+    assert report["config"]["model"] == "stub"
+    assert "recognizer" in format_report(report)
+    assert [(result["target"], result["concurrency"]) for result in report["results"]] == [
+        ("recognizer", 1),
+        ("recognizer", 4),
+        ("api", 1),
+        ("api", 4),
+    ]
+    for result in report["results"]:
+        assert result["errors"] == 0
+        assert result["latency_ms"]["count"] == REQUESTS
+        assert result["latency_ms"]["p50"] <= result["latency_ms"]["p95"] <= result["latency_ms"]["p99"]
+        assert set(result["stages_ms"]) == set(STAGES)
+        assert result["stages_ms"]["inference"]["count"] > 0
+
+    api = report["results"][-1]["stages_ms"]
+    assert api["decode"]["count"] == REQUESTS
+    assert api["serialize"]["count"] == REQUESTS
@@ -0,0 +1,85 @@
+import json
+import shutil
+from pathlib import Path
+from typing import List
+
+import pytest
+from sigil.core.config.settings import RecognizerSettings
+from sigil.services.bulk import collect_items, completed_ids, solve_bulk
+
+from tests.utils import RESOURCES_DIR
+
+
+@pytest.fixture
+def archive(tmp_path: Path) -> Path:
+    directory = tmp_path / "archive"
+    (directory / "nested").mkdir(parents=True)
+    shutil.copy(RESOURCES_DIR / "background-1-1.jpeg", directory)
+    shutil.copy(RESOURCES_DIR / "background-2-2.jpeg", directory / "nested")
+    (directory / "broken.jpg").write_bytes(b"not an image")
+    return directory
+
+
+def read_lines(path: Path) -> List[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_collect_items(archive: Path) -> None:
+    manifest = archive / "manifest.jsonl"
+    manifest.write_text(json.dumps({"path": "background-1-1.jpeg", "id": "a", "shrink_size": None}) + "\n")
+
+    assert [item.path.name for item in collect_items(str(archive))] == [
+        "background-1-1.jpeg",
+        "broken.jpg",
+        "background-2-2.jpeg",
+    ]
+    assert [item.path.name for item in collect_items(str(archive / "**" / "*.jpeg"))] == [
+        "background-1-1.jpeg",
+        "background-2-2.jpeg",
+    ]
+    [item] = collect_items(str(manifest), shrink_size=340.0)
+    assert (item.id, item.path, item.shrink_size) == ("a", archive / "background-1-1.jpeg", None)
+
+
+def test_solve_bulk_resumes(archive: Path, models_dir: Path, tmp_path: Path) -> None:
+    output = tmp_path / "results.jsonl"
+    items = collect_items(str(archive), shrink_size=340.0)
+    settings = RecognizerSettings(models_dir=models_dir)
+    progress = []
+
+    summary = solve_bulk(
+        items[:2],
+        output=output,
+        settings=settings,
+        workers=1,
+        on_progress=lambda *args: progress.append(args),
+    )
+
+    assert (summary.solved, summary.failed, summary.skipped) == (1, 1, 0)
+    assert progress[-1][:2] == (2, 2)
+    solved, broken = read_lines(output)
+    assert solved["x"] == pytest.approx((212.3 - 8) * 340 / 552, abs=0.5)
+    assert solved["model"] == "multi_cls@416"
+    assert solved["model_version"] == "default"
+    assert "error" in broken
+
+    # An interrupted run leaves a partial last line, which is solved again
+    with output.open("a") as file:
+        file.write('{"id": "' + str(items[2].path))
+
+    summary = solve_bulk(items, output=output, settings=settings, workers=1)
+
+    assert (summary.solved, summary.skipped) == (1, 2)
+    assert completed_ids(output) == {item.id for item in items}
+
+
+def test_solve_bulk_process_pool(archive: Path, models_dir: Path, tmp_path: Path) -> None:
+    output = tmp_path / "results.jsonl"
+    items = collect_items(str(archive / "**" / "*.jpeg"))
+
+    settings = RecognizerSettings(models_dir=models_dir)
+
+    summary = solve_bulk(items, output=output, settings=settings, workers=2, batch_size=1)
+
+    assert summary.solved == 2
+    assert sorted(line["id"] for line in read_lines(output)) == sorted(item.id for item in items)
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sigil.infrastructure.exceptions import DeadlineExceededError
+from sigil.services.cache import CacheValue, ResultCache, SqliteCacheStore
+
+
+@pytest.fixture
+def image() -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 255, size=(32, 48, 3), dtype=np.uint8)
+
+
+def test_make_key_depends_on_pixels_and_params(image: np.ndarray) -> None:
+    key = ResultCache.make_key(image, conf=0.25, shrink_size=340.0)
+
+    assert key == ResultCache.make_key(image.copy(), conf=0.25, shrink_size=340.0)
+    assert key != ResultCache.make_key(image, conf=0.25, shrink_size=300.0)
+    assert key != ResultCache.make_key(255 - image, conf=0.25, shrink_size=340.0)
+
+
+async def test_concurrent_misses_are_coalesced() -> None:
+    cache = ResultCache()
+    calls = 0
+
+    async def compute() -> CacheValue:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"x": 1.0}
+
+    outcomes = await asyncio.gather(*[cache.get_or_compute("key", compute) for _ in range(5)])
+
+    assert calls == 1
+    assert sorted(status for _, status in outcomes) == ["coalesced"] * 4 + ["miss"]
+    assert cache.stats() == {"cache_hits": 4, "cache_misses": 1}
+
+
+async def test_failed_computations_are_not_cached() -> None:
+    cache = ResultCache()
+
+    async def fail() -> CacheValue:
+        msg = "boom"
+        raise RuntimeError(msg)
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("key", fail)
+
+    async def compute() -> CacheValue:
+        return {"x": 2.0}
+
+    assert await cache.get_or_compute("key", compute) == ({"x": 2.0}, "miss")
+
+
+async def test_coalesced_callers_outlive_the_caller_that_started() -> None:
+    cache = ResultCache()
+    release = asyncio.Event()
+
+    async def compute() -> CacheValue:
+        await release.wait()
+        return {"x": 1.0}
+
+    leader = asyncio.create_task(cache.get_or_compute("key", compute))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(cache.get_or_compute("key", partial(_value, "unused")))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    release.set()
+
+    assert await follower == ({"x": 1.0}, "coalesced")
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_each_caller_keeps_its_own_deadline() -> None:
+    cache = ResultCache()
+
+    async def expire() -> CacheValue:
+        await asyncio.sleep(0.05)
+        raise DeadlineExceededError()
+
+    leader = asyncio.create_task(cache.get_or_compute("key", expire, deadline=time.monotonic() + 0.05))
+    await asyncio.sleep(0)
+    impatient = asyncio.create_task(cache.get_or_compute("key", expire, deadline=time.monotonic()))
+    patient = asyncio.create_task(cache.get_or_compute("key", partial(_value, "own")))
+
+    with pytest.raises(DeadlineExceededError):
+        await impatient
+    with pytest.raises(DeadlineExceededError):
+        await leader
+    # The leader ran out of time, the caller without a deadline computes the value itself
+    assert await patient == ({"x": "own"}, "miss")
+
+
+async def test_urgent_callers_do_not_wait_behind_bulk_computations() -> None:
+    cache = ResultCache()
+    release = asyncio.Event()
+
+    async def bulk() -> CacheValue:
+        await release.wait()
+        return {"x": "bulk"}
+
+    slow = asyncio.create_task(cache.get_or_compute("key", bulk, lane=2))
+    await asyncio.sleep(0)
+
+    assert await cache.get_or_compute("key", partial(_value, "high"), lane=0) == ({"x": "high"}, "miss")
+    release.set()
+    assert await slow == ({"x": "bulk"}, "miss")
+
+
+async def test_lru_eviction_and_ttl() -> None:
+    cache = ResultCache(max_entries=2, ttl=60)
+    for key in ("a", "b", "c"):
+        await cache.get_or_compute(key, partial(_value, key))
+
+    assert (await cache.get_or_compute("a", partial(_value, "a")))[1] == "miss"
+    assert (await cache.get_or_compute("c", partial(_value, "c")))[1] == "hit"
+
+    cache.ttl = 0
+    await cache.get_or_compute("d", partial(_value, "d"))
+    assert (await cache.get_or_compute("d", partial(_value, "d")))[1] == "miss"
+
+
+async def test_sqlite_tier_is_shared_between_caches(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite3"
+    first = ResultCache(store=SqliteCacheStore(path))
+    second = ResultCache(store=SqliteCacheStore(path))
+
+    await first.get_or_compute("key", partial(_value, "from first"))
+    value, status = await second.get_or_compute("key", partial(_value, "from second"))
+
+    assert status == "hit"
+    assert value == {"x": "from first"}
+    first.close()
+    second.close()
+
+
+async def _value(x: str) -> CacheValue:
+    return {"x": x}
@@ -0,0 +1,354 @@
+import asyncio
+import base64
+import io
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, Tuple
+
+import httpx
+import pytest
+from PIL import Image
+from sigil.core import metrics
+from sigil.core.config.settings import CacheSettings, InferenceSettings, Settings
+from sigil.core.providers.factory import make_container
+from sigil.main.api.factory import APIFactory
+from sigil.services.recognizer import RecognizerService
+from sigil.services.solver import SolverService
+from starlette.testclient import TestClient
+
+from tests.utils import RESOURCES_DIR, app_client
+
+
+@pytest.fixture
+def puzzle_image_b64() -> str:
+    return base64.b64encode((RESOURCES_DIR / "background-1-1.jpeg").read_bytes()).decode()
+
+
+@pytest.fixture
+def slow_recognizer(monkeypatch: pytest.MonkeyPatch) -> None:
+    detect_gaps = RecognizerService.detect_gaps
+
+    def slow_detect_gaps(self: RecognizerService, *args: Any, **kwargs: Any) -> Any:
+        time.sleep(0.2)
+        return detect_gaps(self, *args, **kwargs)
+
+    monkeypatch.setattr(RecognizerService, "detect_gaps", slow_detect_gaps)
+
+
+@pytest.fixture
+def blocked_recognizer(monkeypatch: pytest.MonkeyPatch) -> Iterator[Tuple[threading.Event, threading.Event]]:
+    """Hold inference inside the executor until the test sets ``release``; ``started`` is set once it is held."""
+    started, release = threading.Event(), threading.Event()
+    detect_gaps = RecognizerService.detect_gaps
+
+    def blocked_detect_gaps(self: RecognizerService, *args: Any, **kwargs: Any) -> Any:
+        started.set()
+        release.wait(timeout=30)
+        return detect_gaps(self, *args, **kwargs)
+
+    monkeypatch.setattr(RecognizerService, "detect_gaps", blocked_detect_gaps)
+    yield started, release
+    release.set()
+
+
+async def test_solve_slide_captcha(client: httpx.AsyncClient, puzzle_image_b64: str) -> None:
+    response = await client.post("/api/v1/captchas/slide", json={"puzzle_image_b64": puzzle_image_b64})
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["status"] == "successful"
+    assert data["x"] == pytest.approx((212.3 - 8) * 340 / 552, abs=0.5)
+    assert response.json()["meta"]["model"] == "multi_cls@416"
+
+
+async def test_solve_slide_captcha_without_shrink_size(client: httpx.AsyncClient, puzzle_image_b64: str) -> None:
+    payload = {"puzzle_image_b64": puzzle_image_b64, "shrink_size": None}
+    response = await client.post("/api/v1/captchas/slide", json=payload)
+
+    assert response.json()["data"]["x"] == pytest.approx(212.3 - 8, abs=0.5)
+
+
+async def test_solve_slide_captcha_with_piece(client: httpx.AsyncClient) -> None:
+    payload = {
+        "puzzle_image_b64": base64.b64encode((RESOURCES_DIR / "background-2-2.jpeg").read_bytes()).decode(),
+        "piece_image_b64": base64.b64encode((RESOURCES_DIR / "piece-2-2.png").read_bytes()).decode(),
+        "shrink_size": None,
+    }
+    response = await client.post("/api/v1/captchas/slide", json=payload)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["meta"]["stage"] == "template"
+    assert body["data"] == {"status": "successful", "x": pytest.approx(227 - 6, abs=1)}
+
+
+async def test_solve_slide_captcha_upload_multipart(client: httpx.AsyncClient) -> None:
+    files = {
+        "puzzle_image": ("puzzle.jpeg", (RESOURCES_DIR / "background-2-2.jpeg").read_bytes(), "image/jpeg"),
+        "piece_image": ("piece.png", (RESOURCES_DIR / "piece-2-2.png").read_bytes(), "image/png"),
+    }
+    response = await client.post("/api/v1/captchas/slide/upload", files=files, data={"shrink_size": "0"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["meta"]["stage"] == "template"
+    assert body["data"] == {"status": "successful", "x": pytest.approx(227 - 6, abs=1)}
+
+
+async def test_solve_slide_captcha_upload_raw_body(client: httpx.AsyncClient) -> None:
+    response = await client.post(
+        "/api/v1/captchas/slide/upload",
+        content=(RESOURCES_DIR / "background-1-1.jpeg").read_bytes(),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"]["x"] == pytest.approx((212.3 - 8) * 340 / 552, abs=0.5)
+
+
+async def test_solve_slide_captcha_upload_rejects_bad_bodies(client: httpx.AsyncClient) -> None:
+    url = "/api/v1/captchas/slide/upload"
+
+    wrong_type = await client.post(url, json={"puzzle_image_b64": "abc"})
+    empty = await client.post(url, content=b"", headers={"Content-Type": "application/octet-stream"})
+    missing = await client.post(url, files={"piece_image": ("piece.png", b"abc", "image/png")})
+
+    assert wrong_type.status_code == 415
+    assert empty.status_code == 400
+    assert missing.status_code == 400
+
+
+async def test_solve_slide_captcha_draft_decodes_large_jpeg(client: httpx.AsyncClient) -> None:
+    # Four times the usual size, decoded at a quarter scale and answered in the sent resolution
+    with Image.open(RESOURCES_DIR / "background-1-1.jpeg") as image:
+        buffer = io.BytesIO()
+        image.resize((image.width * 4, image.height * 4)).save(buffer, format="JPEG")
+    payload = {"puzzle_image_b64": base64.b64encode(buffer.getvalue()).decode()}
+
+    scaled = await client.post("/api/v1/captchas/slide", json=payload)
+    native = await client.post("/api/v1/captchas/slide", json={**payload, "shrink_size": None})
+
+    assert scaled.json()["data"]["x"] == pytest.approx((212.3 - 8) * 340 / 552, abs=0.5)
+    assert native.json()["data"]["x"] == pytest.approx((212.3 - 8) * 4, abs=2)
+
+
+async def test_solve_slide_captcha_accepts_data_uri(client: httpx.AsyncClient, puzzle_image_b64: str) -> None:
+    payload = {"puzzle_image_b64": f"data:image/jpeg;base64,{puzzle_image_b64}"}
+    response = await client.post("/api/v1/captchas/slide", json=payload)
+
+    assert response.status_code == 200
+
+
+async def test_solve_slide_captcha_does_not_touch_temp_dir(
+    client: httpx.AsyncClient,
+    puzzle_image_b64: str,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    for _ in range(5):
+        response = await client.post("/api/v1/captchas/slide", json={"puzzle_image_b64": puzzle_image_b64})
+        assert response.status_code == 200
+
+    assert not list(tmp_path.iterdir())
+
+
+async def test_solve_slide_captcha_rejects_invalid_image(client: httpx.AsyncClient) -> None:
+    payload = {"puzzle_image_b64": base64.b64encode(b"not an image").decode()}
+    response = await client.post("/api/v1/captchas/slide", json=payload)
+
+    assert response.status_code == 400
+
+
+async def test_health_stays_responsive_while_inference_is_busy(
+    client: httpx.AsyncClient,
+    puzzle_image_b64: str,
+    blocked_recognizer: Tuple[threading.Event, threading.Event],
+) -> None:
+    started, release = blocked_recognizer
+    payload = {"puzzle_image_b64": puzzle_image_b64}
+    solves = [asyncio.create_task(client.post("/api/v1/captchas/slide", json=payload)) for _ in range(4)]
+    assert await asyncio.to_thread(started.wait, 10)
+
+    response = await client.get("/health")
+
+    assert response.status_code == 200
+    assert not any(solve.done() for solve in solves)
+    release.set()
+    assert all(solve.status_code == 200 for solve in await asyncio.gather(*solves))
+
+
+async def test_solve_slide_captcha_rejects_when_queue_is_full(
+    settings: Settings,
+    puzzle_image_b64: str,
+    slow_recognizer: None,
+) -> None:
+    settings.inference_settings = InferenceSettings(workers=1, max_queue_size=0, batch_max_size=1)
+    settings.cache_settings = CacheSettings(enabled=False)
+    payload = {"puzzle_image_b64": puzzle_image_b64}
+    async with app_client(settings=settings) as client:
+        responses = await asyncio.gather(*[client.post("/api/v1/captchas/slide", json=payload) for _ in range(3)])
+
+    status_codes = [response.status_code for response in responses]
+    assert 200 in status_codes
+    assert 503 in status_codes
+    assert any(response.json().get("error_code") == "inference_queue_full" for response in responses)
+
+
+async def test_solve_slide_captcha_drops_expired_requests_before_download(client: httpx.AsyncClient) -> None:
+    before = metrics.DEADLINE_EXCEEDED.value(stage="download")
+    payload = {"puzzle_image_url": "http://192.0.2.1/puzzle.png"}
+
+    response = await client.post("/api/v1/captchas/slide", json=payload, headers={"X-Deadline-Ms": "0.000001"})
+
+    assert response.status_code == 504
+    assert response.json()["error_code"] == "deadline_exceeded"
+    assert metrics.DEADLINE_EXCEEDED.value(stage="download") - before == 1
+
+
+async def test_solve_slide_captcha_drops_requests_queued_past_their_deadline(
+    settings: Settings,
+    puzzle_image_b64: str,
+    slow_recognizer: None,
+) -> None:
+    settings.inference_settings = InferenceSettings(workers=1, batch_max_size=1)
+    settings.cache_settings = CacheSettings(enabled=False)
+    payload = {"puzzle_image_b64": puzzle_image_b64}
+    async with app_client(settings=settings) as client:
+        busy = asyncio.create_task(client.post("/api/v1/captchas/slide", json=payload))
+        await asyncio.sleep(0.05)
+        late = await client.post("/api/v1/captchas/slide", json={**payload, "deadline_ms": 50})
+
+        assert late.status_code == 504
+        assert late.json()["error_code"] == "deadline_exceeded"
+        assert (await busy).status_code == 200
+
+
+async def test_high_priority_requests_skip_the_bulk_queue(
+    settings: Settings,
+    puzzle_image_b64: str,
+    slow_recognizer: None,
+) -> None:
+    settings.inference_settings = InferenceSettings(workers=1, batch_max_size=1)
+    settings.cache_settings = CacheSettings(enabled=False)
+    payload = {"puzzle_image_b64": puzzle_image_b64}
+    finished = []
+
+    async def solve(name: str, priority: str) -> None:
+        response = await client.post("/api/v1/captchas/slide", json=payload, headers={"X-Priority": priority})
+        assert response.status_code == 200
+        finished.append(name)
+
+    async with app_client(settings=settings) as client:
+        busy = asyncio.create_task(solve("busy", "bulk"))
+        await asyncio.sleep(0.05)
+        bulk = asyncio.create_task(solve("bulk", "bulk"))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(busy, bulk, solve("high", "high"))
+
+    assert finished == ["busy", "high", "bulk"]
+
+
+async def test_concurrent_solves_are_batched(settings: Settings, puzzle_image_b64: str) -> None:
+    settings.inference_settings = InferenceSettings(workers=1, batch_max_size=4, batch_max_wait_ms=100)
+    settings.cache_settings = CacheSettings(enabled=False)
+    payload = {"puzzle_image_b64": puzzle_image_b64}
+    async with app_client(settings=settings) as client:
+        responses = await asyncio.gather(*[client.post("/api/v1/captchas/slide", json=payload) for _ in range(4)])
+
+    assert all(response.status_code == 200 for response in responses)
+    assert max(response.json()["meta"]["batch_size"] for response in responses) > 1
+    assert len({response.json()["data"]["x"] for response in responses}) == 1
+
+
+async def test_solve_slide_captcha_batch_streams_ndjson(client: httpx.AsyncClient, puzzle_image_b64: str) -> None:
+    items = [
+        {"puzzle_image_b64": puzzle_image_b64},
+        {"puzzle_image_b64": base64.b64encode(b"not an image").decode()},
+        {},
+        {"puzzle_image_b64": f"data:image/jpeg;base64,{puzzle_image_b64}"},
+    ]
+    response = await client.post("/api/v1/captchas/slide/batch", json={"items": items})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+    assert sorted(lines) == [0, 1, 2, 3]
+    assert lines[0]["data"]["status"] == "successful"
+    assert lines[3]["data"] == lines[0]["data"]
+    assert lines[1]["success"] is False and lines[1]["status_code"] == 400
+    assert lines[2]["success"] is False and lines[2]["status_code"] == 400
+
+
+async def test_solve_slide_captcha_batch_requires_items(client: httpx.AsyncClient) -> None:
+    response = await client.post("/api/v1/captchas/slide/batch", json={"items": []})
+
+    assert response.status_code == 422
+
+
+def test_solve_slide_captcha_stream(settings: Settings, puzzle_image_b64: str) -> None:
+    app = APIFactory(container=make_container(settings=settings), settings=settings).make()
+    with TestClient(app) as client, client.websocket_connect("/api/v1/captchas/slide/stream") as websocket:
+        websocket.send_json({"id": "a", "puzzle_image_b64": puzzle_image_b64})
+        websocket.send_json({"id": 2, "puzzle_image_b64": puzzle_image_b64, "shrink_size": None})
+        websocket.send_json({"id": "missing"})
+        websocket.send_json({"id": "invalid", "shrink_size": "wide"})
+        websocket.send_text("not json")
+        lines = [websocket.receive_json() for _ in range(5)]
+
+    by_id = {line["id"]: line for line in lines}
+    assert by_id["a"]["data"]["x"] == pytest.approx((212.3 - 8) * 340 / 552, abs=0.5)
+    assert by_id[2]["data"]["x"] == pytest.approx(212.3 - 8, abs=0.5)
+    assert by_id["missing"]["status_code"] == 400
+    assert by_id["invalid"]["status_code"] == 422
+    assert by_id[None]["status_code"] == 400
+
+
+def test_solve_slide_captcha_stream_limits_in_flight(
+    settings: Settings,
+    puzzle_image_b64: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    settings.inference_settings = InferenceSettings(stream_max_in_flight=2, warmup=False)
+    solve = SolverService.solve
+    running = peak = 0
+
+    async def counting_solve(self: SolverService, *args: Any, **kwargs: Any) -> Any:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            await asyncio.sleep(0.05)
+            return await solve(self, *args, **kwargs)
+        finally:
+            running -= 1
+
+    monkeypatch.setattr(SolverService, "solve", counting_solve)
+    app = APIFactory(container=make_container(settings=settings), settings=settings).make()
+    with TestClient(app) as client, client.websocket_connect("/api/v1/captchas/slide/stream") as websocket:
+        for index in range(6):
+            websocket.send_json({"id": index, "puzzle_image_b64": puzzle_image_b64})
+        lines = [websocket.receive_json() for _ in range(6)]
+
+    assert sorted(line["id"] for line in lines) == list(range(6))
+    assert all(line["data"]["status"] == "successful" for line in lines)
+    assert peak == 2
+
+
+async def test_repeated_puzzles_are_served_from_cache(client: httpx.AsyncClient, puzzle_image_b64: str) -> None:
+    payload = {"puzzle_image_b64": puzzle_image_b64}
+    first = await client.post("/api/v1/captchas/slide", json=payload)
+    second = await client.post("/api/v1/captchas/slide", json=payload)
+
+    assert first.json()["meta"]["cache"] == "miss"
+    assert second.json()["meta"]["cache"] == "hit"
+    assert second.json()["meta"]["cache_hits"] == 1
+    assert second.json()["data"] == first.json()["data"]
+
+    other_shrink_size = await client.post("/api/v1/captchas/slide", json={**payload, "shrink_size": 300})
+    assert other_shrink_size.json()["meta"]["cache"] == "miss"
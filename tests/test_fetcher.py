@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import AsyncGenerator
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from sigil.infrastructure.fetcher import ImageDownloadError, ImageFetcher
+
+from tests.utils import RESOURCES_DIR
+
+PUZZLE = (RESOURCES_DIR / "background-1-1.jpeg").read_bytes()
+PIECE = (RESOURCES_DIR / "piece-1-1.png").read_bytes()
+
+
+async def slow_image(request: web.Request) -> web.Response:
+    await asyncio.sleep(0.2)
+    return web.Response(body=PUZZLE if request.match_info["name"] == "puzzle" else PIECE, content_type="image/jpeg")
+
+
+async def streamed_image(request: web.Request) -> web.StreamResponse:
+    response = web.StreamResponse(headers={"Content-Type": "image/jpeg"})
+    await response.prepare(request)
+    for _ in range(16):
+        await response.write(b"x" * 1024)
+    return response
+
+
+async def trickled_image(request: web.Request) -> web.StreamResponse:
+    # Every read returns within the read timeout, only a total deadline stops it
+    response = web.StreamResponse(headers={"Content-Type": "image/jpeg"})
+    await response.prepare(request)
+    for _ in range(100):
+        await response.write(b"x")
+        await asyncio.sleep(0.05)
+    return response
+
+
+async def missing(_: web.Request) -> web.Response:
+    return web.Response(status=404, text="secret internals " * 1000)
+
+
+async def text(_: web.Request) -> web.Response:
+    return web.Response(text="hello")
+
+
+@pytest.fixture
+async def server() -> AsyncGenerator[TestServer, None]:
+    app = web.Application()
+    app.router.add_get("/slow/{name}", slow_image)
+    app.router.add_get("/streamed", streamed_image)
+    app.router.add_get("/text", text)
+    app.router.add_get("/trickle", trickled_image)
+    app.router.add_get("/missing", missing)
+
+    async with TestServer(app) as server:
+        yield server
+
+
+@pytest.fixture
+async def fetcher() -> AsyncGenerator[ImageFetcher, None]:
+    fetcher = ImageFetcher(max_bytes=8 * 1024, read_timeout=1.0)
+    yield fetcher
+    await fetcher.close()
+
+
+async def test_fetch_many_downloads_concurrently(server: TestServer, fetcher: ImageFetcher) -> None:
+    fetcher.max_bytes = len(PUZZLE)
+
+    started = time.perf_counter()
+    puzzle, piece = await fetcher.fetch_many(str(server.make_url("/slow/puzzle")), str(server.make_url("/slow/piece")))
+
+    assert time.perf_counter() - started < 0.35
+    assert (puzzle, piece) == (PUZZLE, PIECE)
+
+
+async def test_fetch_enforces_max_size_while_streaming(server: TestServer, fetcher: ImageFetcher) -> None:
+    with pytest.raises(ImageDownloadError, match="exceeds"):
+        await fetcher.fetch(str(server.make_url("/streamed")))
+
+
+async def test_fetch_rejects_non_image_content(server: TestServer, fetcher: ImageFetcher) -> None:
+    with pytest.raises(ImageDownloadError, match="text/plain"):
+        await fetcher.fetch(str(server.make_url("/text")))
+
+
+async def test_fetch_times_out_slow_reads(server: TestServer) -> None:
+    fetcher = ImageFetcher(read_timeout=0.05)
+
+    with pytest.raises(ImageDownloadError, match="timed out"):
+        await fetcher.fetch(str(server.make_url("/slow/puzzle")))
+
+    await fetcher.close()
+
+
+async def test_fetch_stops_at_the_deadline_of_a_trickling_download(server: TestServer, fetcher: ImageFetcher) -> None:
+    fetcher.max_bytes = 1024 * 1024
+
+    with pytest.raises(ImageDownloadError, match="timed out"):
+        await fetcher.fetch(str(server.make_url("/trickle")), deadline=time.monotonic() + 0.2)
+
+
+async def test_fetch_leaves_error_bodies_out(server: TestServer, fetcher: ImageFetcher) -> None:
+    with pytest.raises(ImageDownloadError) as error:
+        await fetcher.fetch(str(server.make_url("/missing")))
+
+    assert error.value.detail == "Error downloading image: HTTP 404"
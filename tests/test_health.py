@@ -0,0 +1,71 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+import pytest
+from sigil.core.config.settings import InferenceSettings, RecognizerSettings, Settings
+from sigil.core.providers.factory import make_container
+from sigil.main.api.factory import APIFactory
+from sigil.services.recognizer import RecognizerService
+
+from tests.utils import RESOURCES_DIR
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 10.0) -> httpx.Response:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        response = await client.get("/health/ready")
+        if response.json()["status"] != "starting" or asyncio.get_running_loop().time() > deadline:
+            return response
+
+        await asyncio.sleep(0.01)
+
+
+async def test_ready_reports_not_ready_before_warm_up(client: httpx.AsyncClient) -> None:
+    # The ASGI test transport does not run the lifespan, so warm-up never starts
+    response = await client.get("/health/ready")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "starting"}
+
+
+@pytest.mark.parametrize("warmup_images_dir", [None, RESOURCES_DIR])
+async def test_ready_after_warm_up_at_every_batch_size(
+    models_dir: Path,
+    warmup_images_dir: Optional[Path],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    batch_sizes = []
+    warm_up = RecognizerService.warm_up
+
+    def record_warm_up(self: RecognizerService, *args: Any, **kwargs: Any) -> Any:
+        batch_sizes.extend(kwargs["batch_sizes"])
+        return warm_up(self, *args, **kwargs)
+
+    monkeypatch.setattr(RecognizerService, "warm_up", record_warm_up)
+    settings = Settings(
+        recognizer=RecognizerSettings(models_dir=models_dir),
+        inference=InferenceSettings(batch_max_size=3, warmup_images_dir=warmup_images_dir),
+    )
+    app = APIFactory(container=make_container(settings=settings), settings=settings).make()
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await wait_until_ready(client)
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+    assert batch_sizes == [1, 2, 3]
+
+
+async def test_ready_reports_failed_warm_up(tmp_path: Path) -> None:
+    settings = Settings(recognizer=RecognizerSettings(models_dir=tmp_path))
+    app = APIFactory(container=make_container(settings=settings), settings=settings).make()
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await wait_until_ready(client)
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
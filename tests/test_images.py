@@ -0,0 +1,77 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+from sigil.services.detectors.onnx_detector import letterbox_image, letterbox_into
+from sigil.services.images import ImageDecodeError, decode, is_heif, register_heif_opener
+
+from tests.utils import RESOURCES_DIR
+
+
+def encode(image: Image.Image, format: str) -> bytes:
+    if format == "HEIF":
+        register_heif_opener()
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def puzzle() -> Image.Image:
+    with Image.open(RESOURCES_DIR / "background-1-1.jpeg") as image:
+        return image.convert("RGB")
+
+
+def test_large_jpeg_is_draft_decoded(puzzle: Image.Image) -> None:
+    data = encode(puzzle.resize((puzzle.width * 4, puzzle.height * 4)), "JPEG")
+
+    decoded = decode(data, target=416)
+
+    assert decoded.decoder == "jpeg_draft"
+    assert decoded.scale == 4
+    assert decoded.pixels.shape == (puzzle.height, puzzle.width, 3)
+    assert decode(data).pixels.shape == (puzzle.height * 4, puzzle.width * 4, 3)
+
+
+def test_jpeg_near_target_size_is_decoded_in_full(puzzle: Image.Image) -> None:
+    decoded = decode(encode(puzzle, "JPEG"), target=416)
+
+    assert (decoded.decoder, decoded.scale) == ("jpeg", 1)
+    assert decoded.pixels.shape == (puzzle.height, puzzle.width, 3)
+
+
+@pytest.mark.parametrize("format", ["PNG", "WEBP", "HEIF"])
+def test_other_formats_decode(puzzle: Image.Image, format: str) -> None:
+    decoded = decode(encode(puzzle, format), target=416)
+
+    assert decoded.decoder == format.lower()
+    assert decoded.pixels.shape == (puzzle.height, puzzle.width, 3)
+    assert is_heif(encode(puzzle, format)) == (format == "HEIF")
+
+
+def test_piece_keeps_alpha() -> None:
+    decoded = decode((RESOURCES_DIR / "piece-2-2.png").read_bytes(), mode="RGBA")
+
+    assert decoded.pixels.shape[2] == 4
+    assert decoded.pixels[..., 3].min() == 0
+
+
+def test_invalid_bytes_raise() -> None:
+    with pytest.raises(ImageDecodeError):
+        decode(b"not an image")
+
+
+@pytest.mark.parametrize("shape", [(344, 552, 3), (416, 416, 3), (900, 300, 3)])
+@pytest.mark.parametrize("dtype", [np.float32, np.float16])
+def test_letterbox_into_matches_letterbox_image(shape: tuple, dtype: type) -> None:
+    image = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+    padded, expected_letterbox = letterbox_image(image, new_shape=(416, 416))
+    expected = padded.transpose(2, 0, 1).astype(dtype) / dtype(255)
+
+    out = np.empty((3, 416, 416), dtype=dtype)
+    letterbox = letterbox_into(image, out=out)
+
+    assert letterbox == expected_letterbox
+    np.testing.assert_array_equal(out, expected)
@@ -0,0 +1,162 @@
+import asyncio
+import base64
+import contextlib
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import numpy as np
+import pytest
+from sigil.core.config.settings import AdminSettings, CacheSettings, InferenceSettings, RecognizerSettings, Settings
+from sigil.services.inference_server import InferenceClient, InferenceServer, SharedImageRing, socket_path
+from sigil.services.recognizer import RecognizerService
+
+from tests.utils import RESOURCES_DIR, app_client
+
+
+@pytest.fixture
+def server_settings(models_dir: Path) -> Settings:
+    # Unix socket paths are limited to ~100 bytes, pytest's tmp_path can be longer
+    with tempfile.TemporaryDirectory(prefix="sigil-") as directory:
+        yield Settings(
+            recognizer=RecognizerSettings(models_dir=models_dir),
+            inference=InferenceSettings(servers=1, server_dir=Path(directory), batch_max_size=8, warmup=False),
+            cache=CacheSettings(enabled=False),
+        )
+
+
+@contextlib.asynccontextmanager
+async def running_server(settings: Settings) -> AsyncIterator[InferenceServer]:
+    server = InferenceServer(settings=settings, path=socket_path(settings.inference_settings, 0))
+    task = asyncio.create_task(server.serve())
+    try:
+        while not server.path.exists():
+            await asyncio.sleep(0.01)
+
+        yield server
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+async def test_workers_share_server_batches(server_settings: Settings, monkeypatch: pytest.MonkeyPatch) -> None:
+    detect_gaps = RecognizerService.detect_gaps
+
+    def slow_detect_gaps(self: RecognizerService, *args: Any, **kwargs: Any) -> Any:
+        time.sleep(0.1)
+        return detect_gaps(self, *args, **kwargs)
+
+    monkeypatch.setattr(RecognizerService, "detect_gaps", slow_detect_gaps)
+    payload = {"puzzle_image_b64": base64.b64encode((RESOURCES_DIR / "background-1-1.jpeg").read_bytes()).decode()}
+
+    # Two apps stand in for two HTTP workers, each with its own ring and connection
+    async with running_server(server_settings):
+        async with app_client(server_settings) as first, app_client(server_settings) as second:
+            responses = await asyncio.gather(
+                *[client.post("/api/v1/captchas/slide", json=payload) for client in [first, second] * 4]
+            )
+
+    assert all(response.status_code == 200 for response in responses)
+    for response in responses:
+        assert response.json()["data"]["x"] == pytest.approx((212.3 - 8) * 340 / 552, abs=0.5)
+    assert max(response.json()["meta"]["batch_size"] for response in responses) > 1
+
+
+async def test_admin_goes_to_servers(server_settings: Settings) -> None:
+    server_settings.admin_settings = AdminSettings(key="admin-key")
+    headers = {"X-Admin-Key": "admin-key"}
+    async with running_server(server_settings):
+        async with app_client(server_settings) as client:
+            models = await client.get("/api/v1/admin/models", headers=headers)
+            swap = await client.post("/api/v1/admin/models/activate", json={"version": "default"}, headers=headers)
+            missing = await client.post("/api/v1/admin/models/activate", json={"version": "v9"}, headers=headers)
+
+    assert models.json()["data"] == {"active": "default", "loaded": ["default"], "versions": ["default"]}
+    assert swap.json()["data"]["previous"] == "default"
+    assert missing.status_code == 404
+    assert missing.json()["error_code"] == "model_version_not_found"
+
+
+async def test_lost_server_fails_requests(server_settings: Settings) -> None:
+    client = InferenceClient(paths=[socket_path(server_settings.inference_settings, 0)], connect_timeout=0.2)
+    image = np.zeros((344, 552, 3), dtype=np.uint8)
+    try:
+        async with running_server(server_settings):
+            assert (await client.submit(image)).batch_size == 1
+
+        with pytest.raises(Exception) as error:
+            await client.submit(image)
+
+        assert error.value.status_code == 503
+    finally:
+        await client.close()
+
+
+async def test_deadlines_reach_the_server(server_settings: Settings, monkeypatch: pytest.MonkeyPatch) -> None:
+    detect_gaps = RecognizerService.detect_gaps
+
+    def slow_detect_gaps(self: RecognizerService, *args: Any, **kwargs: Any) -> Any:
+        time.sleep(0.2)
+        return detect_gaps(self, *args, **kwargs)
+
+    monkeypatch.setattr(RecognizerService, "detect_gaps", slow_detect_gaps)
+    server_settings.inference_settings.workers = 1
+    server_settings.inference_settings.batch_max_size = 1
+    client = InferenceClient(paths=[socket_path(server_settings.inference_settings, 0)], connect_timeout=0.2)
+    image = np.zeros((344, 552, 3), dtype=np.uint8)
+    try:
+        async with running_server(server_settings):
+            busy = asyncio.create_task(client.submit(image))
+            await asyncio.sleep(0.05)
+            with pytest.raises(Exception) as error:
+                await client.submit(image, priority="high", deadline=time.monotonic() + 0.05)
+
+            assert error.value.status_code == 504
+            assert error.value.error_code == "deadline_exceeded"
+            assert (await busy).batch_size == 1
+    finally:
+        await client.close()
+
+
+async def test_cancelled_requests_keep_their_slot(server_settings: Settings, monkeypatch: pytest.MonkeyPatch) -> None:
+    seen = []
+    detect_gaps = RecognizerService.detect_gaps
+
+    def slow_detect_gaps(self: RecognizerService, images: Any, *args: Any, **kwargs: Any) -> Any:
+        time.sleep(0.2)
+        seen.extend(int(image[0, 0, 0]) for image in images)
+        return detect_gaps(self, images, *args, **kwargs)
+
+    monkeypatch.setattr(RecognizerService, "detect_gaps", slow_detect_gaps)
+    client = InferenceClient(paths=[socket_path(server_settings.inference_settings, 0)], ring_slots=1)
+    try:
+        async with running_server(server_settings):
+            cancelled = asyncio.create_task(client.submit(np.zeros((344, 552, 3), dtype=np.uint8)))
+            await asyncio.sleep(0.05)
+            cancelled.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await cancelled
+
+            # The only slot is still being read by the server, the next image has to wait for it
+            await client.submit(np.full((344, 552, 3), 255, dtype=np.uint8))
+    finally:
+        await client.close()
+
+    assert seen == [0, 255]
+
+
+async def test_ring_rejects_oversized_images() -> None:
+    ring = SharedImageRing(slots=2, slot_bytes=100)
+    try:
+        with pytest.raises(Exception) as error:
+            await ring.acquire(np.zeros((10, 10, 3), dtype=np.uint8))
+
+        assert error.value.status_code == 413
+
+        offset = await ring.acquire(np.ones((5, 5, 3), dtype=np.uint8))
+        assert offset in (0, 100)
+        ring.release(offset)
+    finally:
+        ring.close()
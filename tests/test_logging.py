@@ -0,0 +1,91 @@
+import base64
+import io
+import json
+import sys
+import threading
+from typing import Any, Dict, Iterator
+
+import httpx
+import pytest
+from loguru import logger
+from sigil.core import metrics
+from sigil.core.config.settings import LoggingSettings
+from sigil.core.logging import BackgroundSink, HotPathFilter, init_logger
+
+
+@pytest.fixture
+def restore_logger() -> Iterator[None]:
+    yield
+    logger.remove()
+    logger.add(sys.__stderr__)
+
+
+def make_record(level: str, correlation_id: str = "-") -> Dict[str, Any]:
+    return {"level": logger.level(level), "extra": {"correlation_id": correlation_id}}
+
+
+def test_background_sink_writes_queued_lines() -> None:
+    stream = io.StringIO()
+    sink = BackgroundSink(stream, max_size=1000)
+    for index in range(100):
+        sink.write(f"line {index}\n")
+    sink.stop()
+
+    assert stream.getvalue().splitlines() == [f"line {index}" for index in range(100)]
+
+
+def test_background_sink_drops_lines_when_full() -> None:
+    class BlockedStream(io.StringIO):
+        def write(self, text: str) -> int:
+            release.wait()
+            return super().write(text)
+
+    release = threading.Event()
+    sink = BackgroundSink(BlockedStream(), max_size=2)
+    before = metrics.LOG_LINES_DROPPED.value(reason="queue_full")
+    for index in range(10):
+        sink.write(f"line {index}\n")
+    release.set()
+    sink.stop()
+
+    assert metrics.LOG_LINES_DROPPED.value(reason="queue_full") - before >= 7
+
+
+def test_hot_path_filter_samples_requests() -> None:
+    keep_none = HotPathFilter(sample_rate=0.0)
+    keep_all = HotPathFilter(sample_rate=1.0)
+
+    assert not keep_none(make_record("INFO", correlation_id="abc"))
+    assert keep_none(make_record("ERROR", correlation_id="abc"))
+    assert keep_none(make_record("INFO"))
+    assert keep_all(make_record("INFO", correlation_id="abc"))
+
+    # The decision is per request, every line of a sampled request is kept
+    half = HotPathFilter(sample_rate=0.5)
+    for correlation_id in ["a", "b", "c", "d"]:
+        assert len({half(make_record("INFO", correlation_id=correlation_id)) for _ in range(5)}) == 1
+
+
+def test_hot_path_filter_rate_limits_info_lines() -> None:
+    limited = HotPathFilter(rate_limit=3)
+
+    assert [limited(make_record("INFO")) for _ in range(5)] == [True, True, True, False, False]
+    assert limited(make_record("WARNING"))
+
+
+async def test_json_lines_carry_correlation_id(
+    client: httpx.AsyncClient,
+    capsys: pytest.CaptureFixture,
+    restore_logger: None,
+) -> None:
+    init_logger(settings=LoggingSettings(format="json", background=False))
+    payload = {"puzzle_image_b64": base64.b64encode(b"not an image").decode()}
+
+    response = await client.post("/api/v1/captchas/slide", json=payload, headers={"X-Correlation-ID": "abc"})
+
+    assert response.status_code == 400
+    assert response.headers["X-Correlation-ID"] == "abc"
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    errors = [line for line in lines if line["level"] == "ERROR"]
+    assert errors and all(line["correlation_id"] == "abc" for line in errors)
+    assert {"time", "message", "logger", "function", "line"} <= set(errors[0])
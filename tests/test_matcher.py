@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+from sigil.services.matcher import PieceMatcher, _next_fast_len, masked_ncc
+
+from tests.utils import RESOURCES_DIR
+
+
+def load_pair(name: str) -> tuple:
+    puzzle = np.asarray(Image.open(RESOURCES_DIR / f"background-{name}.jpeg").convert("RGB"))
+    piece = np.asarray(Image.open(RESOURCES_DIR / f"piece-{name}.png").convert("RGBA"))
+    return puzzle, piece
+
+
+@pytest.mark.parametrize(("name", "gap_x"), [("1-1", 159), ("2-2", 227)])
+def test_match_finds_gap(name: str, gap_x: float) -> None:
+    puzzle, piece = load_pair(name)
+
+    match = PieceMatcher().match(puzzle, piece)
+
+    assert match is not None
+    assert match.x == pytest.approx(gap_x, abs=1)
+    assert match.y == pytest.approx(93, abs=1)
+    assert match.score > 0.4
+
+
+@pytest.mark.parametrize("padding", [10, 20, 40])
+def test_match_ignores_transparent_padding(padding: int) -> None:
+    puzzle, piece = load_pair("2-2")
+    matcher = PieceMatcher()
+    expected = matcher.match(puzzle, piece)
+    assert expected is not None
+
+    match = matcher.match(puzzle, np.pad(piece, ((0, 0), (padding, 0), (0, 0))))
+
+    assert match is not None
+    assert match.offset_x == expected.offset_x + padding
+    assert match.x == pytest.approx(expected.x, abs=0.01)
+    # The padded piece image starts further left, its travel is shorter by exactly the padding
+    assert match.x - match.offset_x == pytest.approx(expected.x - expected.offset_x - padding, abs=0.01)
+
+
+@pytest.mark.parametrize("name", ["1-1", "2-2"])
+def test_band_search_agrees_with_full_search(name: str) -> None:
+    puzzle, piece = load_pair(name)
+    matcher = PieceMatcher(band=12)
+    full = matcher.match(puzzle, piece)
+    assert full is not None
+
+    refined = matcher.match(puzzle, piece, box=[full.x - 9, full.y + 7, 0, 0])
+
+    assert refined is not None
+    assert refined.x == pytest.approx(full.x, abs=0.01)
+    assert refined.y == full.y
+
+
+@pytest.mark.parametrize("box", [[190.0, 10.0], [10.0, 95.0], [500.0, 500.0]])
+def test_band_search_near_the_edge(box: list) -> None:
+    puzzle = np.random.default_rng(0).integers(0, 255, size=(100, 200, 3), dtype=np.uint8)
+    piece = np.full((40, 40, 4), 255, dtype=np.uint8)
+
+    match = PieceMatcher().match(puzzle, piece, box=box)
+
+    assert match is not None
+    assert 0 <= match.x <= 200 - 40
+    assert 0 <= match.y <= 100 - 40
+
+
+def test_masked_ncc_ignores_pixels_outside_mask() -> None:
+    rng = np.random.default_rng(0)
+    image = rng.random((60, 80)).astype(np.float32)
+    template = image[20:36, 30:46].copy()
+    mask = np.zeros(template.shape, dtype=bool)
+    mask[4:12, 4:12] = True
+    template[~mask] = 1000  # garbage outside the mask must not matter
+
+    scores = masked_ncc(image, template, mask)
+
+    assert np.unravel_index(int(np.argmax(scores)), scores.shape) == (20, 30)
+    assert scores[20, 30] == pytest.approx(1.0, abs=1e-3)
+
+
+@pytest.mark.parametrize(("size", "expected"), [(1, 1), (7, 8), (647, 648), (439, 450), (512, 512)])
+def test_next_fast_len(size: int, expected: int) -> None:
+    assert _next_fast_len(size) == expected
+
+
+def test_band_search_is_cheap() -> None:
+    puzzle, piece = load_pair("1-1")
+    matcher = PieceMatcher()
+    box = [158.0, 93.0, 0, 0]
+    matcher.match(puzzle, piece, box)
+
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        matcher.match(puzzle, piece, box)
+        timings.append(time.perf_counter() - started)
+
+    # A YOLO pass at 416px costs tens of milliseconds on CPU, refining must stay well below that
+    assert sorted(timings)[len(timings) // 2] < 0.02
@@ -0,0 +1,79 @@
+import base64
+
+import httpx
+import pytest
+from sigil.core import metrics
+from sigil.core.metrics import Counter, Gauge, Histogram
+
+from tests.utils import RESOURCES_DIR
+
+
+def sample(text: str, line_prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+
+    return 0.0
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram = Histogram("test_seconds", "Test.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 3.65",
+        "test_seconds_count 4",
+    ]
+
+
+def test_counter_and_gauge_labels() -> None:
+    counter = Counter("test_total", "Test.", labelnames=("result",))
+    counter.inc(result="successful")
+    counter.inc(2, result="failed")
+    gauge = Gauge("test_in_flight", "Test.")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    assert counter.render()[2:] == ['test_total{result="successful"} 1', 'test_total{result="failed"} 2']
+    assert gauge.render()[2:] == ["test_in_flight 1"]
+
+
+async def test_metrics_endpoint_counts_solves(client: httpx.AsyncClient) -> None:
+    before = (await client.get("/metrics")).text
+    payload = {"puzzle_image_b64": base64.b64encode((RESOURCES_DIR / "background-1-1.jpeg").read_bytes()).decode()}
+    await client.post("/api/v1/captchas/slide", json=payload)
+    await client.post("/api/v1/captchas/slide", json={"puzzle_image_b64": base64.b64encode(b"not an image").decode()})
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    after = response.text
+    for name, delta in [
+        ('sigil_solves_total{result="successful"}', 1),
+        ('sigil_solves_total{result="error"}', 1),
+        ("sigil_request_seconds_count", 2),
+        ('sigil_decode_seconds_count{decoder="jpeg"}', 1),
+        ('sigil_decode_seconds_count{decoder="invalid"}', 1),
+        ("sigil_inference_seconds_count", 1),
+        ("sigil_confidence_count", 1),
+    ]:
+        assert sample(after, name) - sample(before, name) == delta, name
+
+    assert sample(after, 'sigil_confidence_bucket{le="0.9"}') - sample(before, 'sigil_confidence_bucket{le="0.9"}') == 1
+    assert sample(after, "sigil_requests_in_flight") == 0
+    assert sample(after, "sigil_inference_pending") == 0
+
+
+@pytest.mark.parametrize("name", ["sigil_model_load_seconds", "sigil_inference_queued"])
+async def test_metrics_endpoint_lists_every_metric(client: httpx.AsyncClient, name: str) -> None:
+    response = await client.get("/metrics")
+
+    assert f"# TYPE {name} gauge" in response.text
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+from sigil.benchmarks.stub import make_stub_model
+from sigil.core.config.settings import RecognizerSettings
+from sigil.services.quantization import compare_models, quantize_model
+from sigil.services.recognizer import RecognizerService, model_filename
+
+from tests.utils import RESOURCES_DIR
+
+
+@pytest.fixture
+def fp32_models_dir(tmp_path: Path) -> Path:
+    make_stub_model(tmp_path / "multi_cls.onnx", num_classes=2)
+    make_stub_model(tmp_path / "single_cls.onnx", num_classes=1)
+    return tmp_path
+
+
+@pytest.fixture
+def calibration_images() -> list:
+    return [np.asarray(Image.open(path).convert("RGB")) for path in sorted(RESOURCES_DIR.glob("background-*.jpeg"))]
+
+
+@pytest.mark.parametrize("precision", ["int8", "fp16"])
+def test_quantized_variant_matches_fp32(fp32_models_dir: Path, calibration_images: list, precision: str) -> None:
+    baseline_path = fp32_models_dir / "multi_cls.onnx"
+
+    variant_path = quantize_model(
+        model_path=baseline_path,
+        output_path=fp32_models_dir / model_filename("multi_cls", precision),
+        precision=precision,  # type: ignore[arg-type]
+        calibration_images=calibration_images,
+    )
+    comparison = compare_models(baseline_path=baseline_path, variant_path=variant_path, images=calibration_images)
+
+    assert variant_path.name == f"multi_cls.{precision}.onnx"
+    assert comparison.images == len(calibration_images)
+    assert comparison.agreement == 1.0
+    assert comparison.mean_confidence_delta == pytest.approx(0, abs=0.01)
+
+
+def test_int8_needs_calibration_images(fp32_models_dir: Path) -> None:
+    with pytest.raises(ValueError):
+        quantize_model(fp32_models_dir / "multi_cls.onnx", fp32_models_dir / "multi_cls.int8.onnx", precision="int8")
+
+
+def test_recognizer_loads_selected_precision(fp32_models_dir: Path, calibration_images: list) -> None:
+    settings = RecognizerSettings(models_dir=fp32_models_dir, precision="int8", cascade=False)
+    with pytest.raises(FileNotFoundError, match="sigil quantize"):
+        RecognizerService(settings=settings)
+
+    quantize_model(
+        model_path=fp32_models_dir / "multi_cls.onnx",
+        output_path=fp32_models_dir / "multi_cls.int8.onnx",
+        precision="int8",
+        calibration_images=calibration_images,
+    )
+    recognizer = RecognizerService(settings=settings)
+
+    assert recognizer.identify_gap(source=calibration_images[0])[1] == pytest.approx(0.9, abs=0.01)
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sigil.benchmarks.stub import make_stub_model
+from sigil.core.config.settings import RecognizerSettings
+from sigil.services.recognizer import RecognizerService
+
+from tests.utils import RESOURCES_DIR
+
+
+@pytest.fixture
+def unsure_models_dir(tmp_path: Path) -> Path:
+    make_stub_model(tmp_path / "multi_cls.onnx", num_classes=2)
+    make_stub_model(tmp_path / "single_cls.onnx", num_classes=1, confidence=0.5)
+    return tmp_path
+
+
+def test_cascade_answers_from_first_stage_when_confident(models_dir: Path) -> None:
+    recognizer = RecognizerService(settings=RecognizerSettings(models_dir=models_dir, cascade=True))
+
+    (detection,) = recognizer.detect_gaps([RESOURCES_DIR / "background-1-1.jpeg"])
+
+    assert recognizer.stages == ["single_cls@416", "multi_cls@416"]
+    assert detection.stage == "single_cls@416"
+    assert detection.confidence == pytest.approx(0.9)
+
+
+def test_cascade_escalates_unsure_images(unsure_models_dir: Path) -> None:
+    recognizer = RecognizerService(settings=RecognizerSettings(models_dir=unsure_models_dir, cascade=True))
+    image = np.zeros((344, 552, 3), dtype=np.uint8)
+
+    detections = recognizer.detect_gaps([image, image])
+
+    assert [detection.stage for detection in detections] == ["multi_cls@416", "multi_cls@416"]
+    assert detections[0].confidence == pytest.approx(0.9)
+
+
+def test_cascade_is_off_by_default_and_skips_single_cls_model(tmp_path: Path) -> None:
+    make_stub_model(tmp_path / "multi_cls.onnx", num_classes=2)
+
+    recognizer = RecognizerService(settings=RecognizerSettings(models_dir=tmp_path))
+
+    assert recognizer.single_cls_model is None
+    assert recognizer.stages == ["multi_cls@416"]
+    assert recognizer.identify_gap(source=RESOURCES_DIR / "background-1-1.jpeg")[1] == pytest.approx(0.9)
@@ -0,0 +1,144 @@
+import asyncio
+import base64
+from pathlib import Path
+
+import httpx
+import pytest
+from sigil.benchmarks.stub import make_stub_model
+from sigil.core.config.settings import AdminSettings, CacheSettings, InferenceSettings, RecognizerSettings, Settings
+from sigil.services.registry import ModelRegistry, ModelVersionNotFoundError
+
+from tests.utils import RESOURCES_DIR, app_client
+
+
+def admin_headers(settings: Settings) -> dict:
+    key = settings.admin_settings.key
+    assert key is not None
+    return {"X-Admin-Key": key.get_secret_value()}
+
+
+@pytest.fixture
+def versioned_models_dir(tmp_path: Path) -> Path:
+    for version in ("v1", "v2"):
+        (tmp_path / version).mkdir()
+        make_stub_model(tmp_path / version / "multi_cls.onnx", num_classes=2)
+        make_stub_model(tmp_path / version / "single_cls.onnx", num_classes=1)
+
+    return tmp_path
+
+
+@pytest.fixture
+def registry_settings(versioned_models_dir: Path) -> Settings:
+    return Settings(
+        recognizer=RecognizerSettings(models_dir=versioned_models_dir, model_version="v1"),
+        inference=InferenceSettings(batch_max_size=2),
+        cache=CacheSettings(enabled=False),
+        admin=AdminSettings(key="s3cr3t-Admin-key"),
+    )
+
+
+def test_versions_and_resolution(versioned_models_dir: Path, models_dir: Path) -> None:
+    assert ModelRegistry(settings=RecognizerSettings(models_dir=versioned_models_dir)).resolve() == "v2"
+    assert ModelRegistry(settings=RecognizerSettings(models_dir=models_dir)).versions() == ["default"]
+
+    with pytest.raises(ModelVersionNotFoundError):
+        ModelRegistry(settings=RecognizerSettings(models_dir=versioned_models_dir)).resolve("v3")
+
+
+def test_versions_follow_the_configured_precision(tmp_path: Path) -> None:
+    (tmp_path / "v1").mkdir()
+    make_stub_model(tmp_path / "v1" / "multi_cls.int8.onnx", num_classes=2)
+
+    assert ModelRegistry(settings=RecognizerSettings(models_dir=tmp_path, precision="int8")).resolve() == "v1"
+    assert ModelRegistry(settings=RecognizerSettings(models_dir=tmp_path)).versions() == []
+
+
+async def test_swap_unloads_previous_version_after_inflight_batches(versioned_models_dir: Path) -> None:
+    registry = ModelRegistry(settings=RecognizerSettings(models_dir=versioned_models_dir))
+    await registry.activate("v1", warm_up=False)
+
+    with registry.acquire() as model:
+        result = await registry.activate("v2")
+        assert (result.active, result.previous) == ("v2", "v1")
+        assert registry.loaded_versions == ["v2", "v1"]
+        assert model.recognizer.identify_gap(source=RESOURCES_DIR / "background-1-1.jpeg")[0]
+
+    assert registry.loaded_versions == ["v2"]
+
+
+async def test_admin_requires_key(registry_settings: Settings) -> None:
+    async with app_client(settings=registry_settings) as client:
+        missing = await client.get("/api/v1/admin/models")
+        wrong = await client.get("/api/v1/admin/models", headers={"X-Admin-Key": registry_settings.secret_key})
+
+    assert (missing.status_code, wrong.status_code) == (401, 401)
+
+
+async def test_admin_is_disabled_without_a_key(registry_settings: Settings) -> None:
+    registry_settings.admin_settings = AdminSettings()
+    async with app_client(settings=registry_settings) as client:
+        response = await client.get("/api/v1/admin/models", headers={"X-Admin-Key": registry_settings.secret_key})
+
+    assert response.status_code == 403
+    assert response.json()["error_code"] == "admin_disabled"
+
+
+async def test_admin_rejects_unknown_version(registry_settings: Settings) -> None:
+    async with app_client(settings=registry_settings) as client:
+        response = await client.post(
+            "/api/v1/admin/models/activate",
+            json={"version": "v3"},
+            headers=admin_headers(registry_settings),
+        )
+
+    assert response.status_code == 404
+    assert response.json()["error_code"] == "model_version_not_found"
+
+
+async def test_hot_swap_under_load_fails_no_request(registry_settings: Settings) -> None:
+    payload = {"puzzle_image_b64": base64.b64encode((RESOURCES_DIR / "background-1-1.jpeg").read_bytes()).decode()}
+
+    async with app_client(settings=registry_settings) as client:
+
+        async def solve_continuously(stop: asyncio.Event) -> list:
+            responses = []
+            while not stop.is_set():
+                responses.append(await client.post("/api/v1/captchas/slide", json=payload))
+            return responses
+
+        stop = asyncio.Event()
+        workers = [asyncio.create_task(solve_continuously(stop)) for _ in range(4)]
+        await asyncio.sleep(0.1)
+
+        swap = await client.post(
+            "/api/v1/admin/models/activate",
+            json={"version": "v2"},
+            headers=admin_headers(registry_settings),
+        )
+        await asyncio.sleep(0.1)
+        stop.set()
+        responses = [response for worker in workers for response in await worker]
+
+        status = await client.get("/api/v1/admin/models", headers=admin_headers(registry_settings))
+
+    assert swap.status_code == 200
+    assert swap.json()["data"]["previous"] == "v1"
+    assert all(isinstance(response, httpx.Response) and response.status_code == 200 for response in responses)
+    assert {response.json()["meta"]["model_version"] for response in responses} == {"v1", "v2"}
+    assert status.json()["data"] == {"active": "v2", "loaded": ["v2"], "versions": ["v1", "v2"]}
+
+
+async def test_swap_does_not_serve_answers_cached_from_the_previous_version(registry_settings: Settings) -> None:
+    registry_settings.cache_settings = CacheSettings()
+    payload = {"puzzle_image_b64": base64.b64encode((RESOURCES_DIR / "background-1-1.jpeg").read_bytes()).decode()}
+
+    async with app_client(settings=registry_settings) as client:
+        first = await client.post("/api/v1/captchas/slide", json=payload)
+        cached = await client.post("/api/v1/captchas/slide", json=payload)
+        headers = admin_headers(registry_settings)
+        await client.post("/api/v1/admin/models/activate", json={"version": "v2"}, headers=headers)
+        swapped = await client.post("/api/v1/captchas/slide", json=payload)
+
+    assert (first.json()["meta"]["cache"], cached.json()["meta"]["cache"]) == ("miss", "hit")
+    assert swapped.json()["meta"]["cache"] == "miss"
+    assert swapped.json()["meta"]["model_version"] == "v2"
@@ -0,0 +1,81 @@
+import base64
+import json
+from pathlib import Path
+
+import pytest
+from sigil.benchmarks.replay import (
+    DEFAULT_PATH,
+    correct_coordinated_omission,
+    histogram,
+    load_captures,
+    run_replay,
+)
+from sigil.core.config.settings import Settings
+
+from tests.utils import RESOURCES_DIR
+
+
+@pytest.fixture
+def captures_path(tmp_path: Path) -> Path:
+    puzzle_image_b64 = base64.b64encode((RESOURCES_DIR / "background-1-1.jpeg").read_bytes()).decode()
+    path = tmp_path / "captures.jsonl"
+    path.write_text(
+        json.dumps({"puzzle_image_b64": puzzle_image_b64})
+        + "\n\n"
+        + json.dumps({"path": DEFAULT_PATH, "body": {"puzzle_image_b64": base64.b64encode(b"nope").decode()}})
+        + "\n"
+    )
+    return path
+
+
+def test_load_captures(captures_path: Path) -> None:
+    captures = load_captures(captures_path)
+
+    assert len(captures) == 2
+    assert "puzzle_image_b64" in captures[0].body
+    assert captures[1].path == DEFAULT_PATH
+
+
+def test_load_captures_reports_line(tmp_path: Path) -> None:
+    path = tmp_path / "captures.jsonl"
+    path.write_text('{"shrink_size": 340}\n{not json\n')
+
+    with pytest.raises(ValueError, match="captures.jsonl:2"):
+        load_captures(path)
+
+
+def test_correct_coordinated_omission() -> None:
+    # One 50 ms stall with a 10 ms send interval hides four requests that would have waited 40..10 ms
+    corrected = correct_coordinated_omission([0.005, 0.05], interval=0.01)
+
+    assert sorted(corrected) == pytest.approx([0.005, 0.01, 0.02, 0.03, 0.04, 0.05])
+    assert correct_coordinated_omission([0.05], interval=0) == [0.05]
+
+
+def test_histogram_buckets() -> None:
+    buckets = histogram([0.0005, 0.003, 0.003, 20.0])
+
+    assert buckets[0] == {"le_ms": 1, "count": 1}
+    assert buckets[2] == {"le_ms": 5, "count": 2}
+    assert buckets[-1] == {"le_ms": "+Inf", "count": 1}
+
+
+@pytest.mark.parametrize("mode, rate", [("closed", None), ("open", 500.0)])
+async def test_replay_in_process(captures_path: Path, mode: str, rate: float) -> None:
+    report = await run_replay(
+        settings=Settings(),
+        captures=load_captures(captures_path),
+        requests=10,
+        mode=mode,
+        concurrency=2,
+        rate=rate,
+        use_stub=True,
+    )
+
+    result = report["result"]
+    assert report["config"]["model"] == "stub"
+    assert result["statuses"] == {"200": 5, "400": 5}
+    assert result["error_rate"] == 0.5
+    assert result["latency_ms"]["count"] == 10
+    assert result["corrected_latency_ms"]["p99"] >= result["latency_ms"]["p50"]
+    assert sum(bucket["count"] for bucket in result["histogram"]) == result["corrected_latency_ms"]["count"]
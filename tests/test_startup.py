@@ -0,0 +1,27 @@
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+from sigil.benchmarks.startup import measure_startup
+
+# About twice what a serving process measures with the stub models (1.1 s import, 110-160 MiB once
+# warm); importing torch alone used to take it past both
+IMPORT_SECONDS_BUDGET = 2.5
+RSS_MB_BUDGET = 320
+
+
+@pytest.fixture(scope="module")
+def report(models_dir: Path) -> Dict[str, Any]:
+    return measure_startup(env={"SIGIL_RECOGNIZER_MODELS_DIR": str(models_dir)})
+
+
+def test_serving_startup_skips_heavy_modules(report: Dict[str, Any]) -> None:
+    assert report["status"] == "ready"
+    assert report["heavy_modules"] == []
+
+
+@pytest.mark.benchmark
+def test_serving_startup_fits_budget(report: Dict[str, Any]) -> None:
+    # Timings depend on the host, deselect with -m 'not benchmark' on shared runners
+    assert report["import_seconds"] < IMPORT_SECONDS_BUDGET
+    assert report["rss_mb"] < RSS_MB_BUDGET
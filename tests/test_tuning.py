@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+from sigil.benchmarks.stub import make_stub_model
+from sigil.core.config.settings import InferenceSettings, RecognizerSettings
+from sigil.services.recognizer import RecognizerService, execution_providers
+from sigil.services.tuning import TuningCandidate, candidates, inference_workers, save_profile, tune
+
+from tests.utils import RESOURCES_DIR
+
+
+@pytest.fixture
+def models_dir(tmp_path: Path) -> Path:
+    make_stub_model(tmp_path / "multi_cls.onnx", num_classes=2)
+    make_stub_model(tmp_path / "single_cls.onnx", num_classes=1)
+    return tmp_path
+
+
+@pytest.fixture
+def puzzle() -> np.ndarray:
+    return np.asarray(Image.open(RESOURCES_DIR / "background-1-1.jpeg").convert("RGB"))
+
+
+def tune_and_save(models_dir: Path, puzzle: np.ndarray) -> RecognizerSettings:
+    settings = RecognizerSettings(models_dir=models_dir)
+    sweep = [
+        TuningCandidate("sequential", "basic", workers=1, intra_op_num_threads=1),
+        TuningCandidate("sequential", "all", workers=2, intra_op_num_threads=1),
+    ]
+    results = tune(settings, images=[puzzle], batch_sizes=[1, 2], sweep=sweep, rounds=2)
+    sources = {name: models_dir / f"{name}.onnx" for name in ("multi_cls", "single_cls")}
+    save_profile(settings, result=results[0], sources=sources, providers=execution_providers(), batch_sizes=[1, 2])
+    return settings
+
+
+def test_candidates_split_cores_between_workers() -> None:
+    sweep = candidates(cpu_count=8, max_workers=4)
+
+    assert {candidate.workers for candidate in sweep} == {1, 2, 4}
+    assert {candidate.graph_optimization_level for candidate in sweep} == {"basic", "extended", "all"}
+    assert all(
+        candidate.workers * (candidate.intra_op_num_threads + candidate.inter_op_num_threads - 1) <= 8
+        for candidate in sweep
+    )
+    assert any(candidate.execution_mode == "parallel" for candidate in sweep)
+    assert [candidate.workers for candidate in candidates(cpu_count=1)] == [1, 1, 1]
+
+
+def test_tuned_profile_is_loaded_on_start(models_dir: Path, puzzle: np.ndarray) -> None:
+    settings = tune_and_save(models_dir, puzzle)
+
+    tuned = RecognizerService(settings=settings)
+    untuned = RecognizerService(settings=settings.model_copy(update={"tuned": False}))
+
+    assert tuned.profile is not None and untuned.profile is None
+    assert tuned.multi_cls_model.model_path.parent == tuned.profile.directory
+    assert tuned.detect_gaps([puzzle]) == untuned.detect_gaps([puzzle])
+
+    # Explicit settings win over the tuned ones, the worker count only applies when not set
+    assert inference_workers(InferenceSettings(), tuned.profile) == tuned.profile.workers
+    assert inference_workers(InferenceSettings(workers=3), tuned.profile) == 3
+    assert tuned.profile.apply(RecognizerSettings(intra_op_num_threads=5)).intra_op_num_threads == 5
+
+
+def test_profile_is_ignored_once_models_change(models_dir: Path, puzzle: np.ndarray) -> None:
+    settings = tune_and_save(models_dir, puzzle)
+    make_stub_model(models_dir / "multi_cls.onnx", num_classes=3)
+
+    assert RecognizerService(settings=settings).profile is None
@@ -0,0 +1,22 @@
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+import httpx
+from sigil.core.config.settings import Settings
+from sigil.core.providers.factory import make_container
+from sigil.main.api.factory import APIFactory
+
+RESOURCES_DIR = Path(__file__).resolve().parents[1] / "resources"
+
+
+@asynccontextmanager
+async def app_client(settings: Settings) -> AsyncIterator[httpx.AsyncClient]:
+    """Serve a fresh app built from ``settings`` through an in-process ASGI client."""
+    container = make_container(settings=settings)
+    app = APIFactory(container=container, settings=settings).make()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+    finally:
+        await container.close()